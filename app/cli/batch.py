@@ -0,0 +1,406 @@
+"""
+Batch-Analyse großer Adresslisten (CSV/Parquet) – ohne das Adress-Limit von /compare.
+
+    python -m app.cli.batch standorte.csv --out ergebnisse.csv --profile daily --workers 4
+    python -m app.cli.batch kandidaten.parquet --out ergebnisse.geojson --plan pro --multi-time
+    # nach Abbruch/Absturz: derselbe Aufruf setzt fort
+
+Jede Adresse läuft durch run_analysis() (gleiche Ergebnisse wie die API). Fertige Zeilen
+landen sofort im Checkpoint (<out>.checkpoint.sqlite, WAL) und in der Ausgabedatei
+(.csv / .parquet / .geojson). Beim Fortsetzen wird die Ausgabe aus dem Checkpoint neu
+geschrieben und nur der Rest gerechnet. Upstream-Limits: services/ratelimit.py
+(UPSTREAM_RATE_LIMITS oder --rate-limit), gelten für alle Worker gemeinsam.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import signal
+import sqlite3
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.analysis import LocationRequest, run_analysis
+from app.services import ratelimit
+from app.services.geocode import geocode
+from app.services.scoring import decision_label
+
+# Ausgabespalten (Reihenfolge = CSV-Spalten, Typ für Parquet)
+FIELDS: List[Tuple[str, type]] = [
+    ("row_id", str), ("address", str), ("status", str),
+    ("lon", float), ("lat", float), ("minutes", int),
+    ("score", int), ("decision", str), ("confidence", str),
+    ("population", int), ("demand", int), ("stations", int), ("density", str),
+    ("nearest_m", float), ("pressure", float), ("stability", str),
+    ("score_p5", int), ("score_p95", int), ("flip_probability", float),
+    ("osm_base", str), ("error", str), ("seconds", float),
+]
+
+
+# -----------------------------
+# Eingabe
+# -----------------------------
+def _require_parquet(path) -> None:
+    """Parquet braucht pyarrow (optional); ohne sauber abbrechen, bevor ein Checkpoint entsteht."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise SystemExit(f"{path}: Parquet requires the 'pyarrow' package (pip install pyarrow).") from e
+
+
+def read_addresses(path: str, address_col: str, id_col: Optional[str]) -> List[Tuple[str, str]]:
+    """[(row_id, address)] aus CSV oder Parquet; row_id = id_col oder Zeilennummer (ab 1)."""
+    if path.lower().endswith(".parquet"):
+        _require_parquet(path)
+        import pandas as pd   # lazy: nur für Parquet (braucht pyarrow)
+        records = pd.read_parquet(path).to_dict("records")
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            records = list(csv.DictReader(f))
+
+    rows, seen = [], set()
+    for n, rec in enumerate(records, start=1):
+        if address_col not in rec:
+            raise SystemExit(f"column {address_col!r} not found (available: {', '.join(map(str, rec))})")
+        address = str(rec.get(address_col) or "").strip()
+        if not address:
+            continue
+        row_id = str(rec[id_col]) if id_col else str(n)
+        if row_id in seen:
+            raise SystemExit(f"duplicate row id {row_id!r} in column {id_col!r}")
+        seen.add(row_id)
+        rows.append((row_id, address))
+    return rows
+
+
+# -----------------------------
+# Checkpoint
+# -----------------------------
+class Checkpoint:
+    def __init__(self, path: Path, run_key: str, restart: bool = False):
+        if restart:
+            for suffix in ("", "-wal", "-shm"):
+                Path(str(path) + suffix).unlink(missing_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS done (row_id TEXT PRIMARY KEY, seq INTEGER, status TEXT, result TEXT NOT NULL)"
+        )
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'run_key'").fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('run_key', ?)", (run_key,))
+        elif row[0] != run_key:
+            raise SystemExit(f"{path} belongs to a run with different input/options; use --restart to discard it")
+
+    def done(self, retry_errors: bool = False) -> Dict[str, Dict[str, Any]]:
+        q = "SELECT row_id, result FROM done" + (" WHERE status = 'ok'" if retry_errors else "") + " ORDER BY seq"
+        return {rid: json.loads(res) for rid, res in self.conn.execute(q)}
+
+    def save(self, seq: int, row: Dict[str, Any]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO done (row_id, seq, status, result) VALUES (?, ?, ?, ?)",
+            (row["row_id"], seq, row["status"], json.dumps(row, ensure_ascii=False)),
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# -----------------------------
+# Ausgabe
+# -----------------------------
+class CsvOutput:
+    def __init__(self, path: Path):
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.f, fieldnames=[name for name, _ in FIELDS])
+        self.writer.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self.writer.writerow(row)
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class GeoJsonOutput:
+    """FeatureCollection, Feature für Feature geschrieben (erst nach close() gültiges JSON)."""
+
+    def __init__(self, path: Path):
+        self.f = open(path, "w", encoding="utf-8")
+        self.f.write('{"type": "FeatureCollection", "features": [\n')
+        self.first = True
+
+    def write(self, row: Dict[str, Any]) -> None:
+        props = {k: v for k, v in row.items() if k not in ("lon", "lat")}
+        geom = None if row.get("lon") is None else {"type": "Point", "coordinates": [row["lon"], row["lat"]]}
+        self.f.write(("" if self.first else ",\n") + json.dumps(
+            {"type": "Feature", "geometry": geom, "properties": props}, ensure_ascii=False
+        ))
+        self.first = False
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.write("\n]}\n")
+        self.f.close()
+
+
+class ParquetOutput:
+    """Row-Groups à `flush_rows` Zeilen (pyarrow, lazy importiert)."""
+
+    def __init__(self, path: Path, flush_rows: int = 500):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        types = {str: pa.string(), float: pa.float64(), int: pa.int64()}
+        self.pa = pa
+        self.schema = pa.schema([(name, types[t]) for name, t in FIELDS])
+        self.writer = pq.ParquetWriter(str(path), self.schema)
+        self.flush_rows = flush_rows
+        self.buffer: List[Dict[str, Any]] = []
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self.buffer.append(row)
+        if len(self.buffer) >= self.flush_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self.buffer:
+            self.writer.write_table(self.pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+
+    def close(self) -> None:
+        self._flush()
+        self.writer.close()
+
+
+def check_output(path: Path) -> None:
+    """Format (und ggf. pyarrow) prüfen, bevor der Checkpoint angelegt wird."""
+    suffix = path.suffix.lower()
+    if suffix not in (".csv", ".geojson", ".json", ".parquet"):
+        raise SystemExit(f"unsupported output format {suffix!r} (use .csv, .parquet or .geojson)")
+    if suffix == ".parquet":
+        _require_parquet(path)
+
+
+def open_output(path: Path):
+    check_output(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return CsvOutput(path)
+    if suffix in (".geojson", ".json"):
+        return GeoJsonOutput(path)
+    return ParquetOutput(path)
+
+
+# -----------------------------
+# Analyse je Zeile
+# -----------------------------
+def _int(x) -> Optional[int]:
+    return None if x is None else int(x)
+
+
+def result_row(row_id: str, address: str, point, data: Dict[str, Any], seconds: float) -> Dict[str, Any]:
+    comp = data.get("competition") or {}
+    unc = data.get("uncertainty") or {}
+    pct = unc.get("percentiles") or {}
+    return {
+        "row_id": row_id,
+        "address": address,
+        "status": "ok",
+        "lon": point[0],
+        "lat": point[1],
+        "minutes": data["minutes"],
+        "score": data["score"],
+        "decision": decision_label(data["score"]),
+        "confidence": data["confidence"],
+        "population": _int(data.get("population")),
+        "demand": _int(data.get("demand")),
+        "stations": _int(comp.get("stations")),
+        "density": comp.get("density"),
+        "nearest_m": comp.get("nearest_m"),
+        "pressure": comp.get("pressure"),
+        "stability": (data.get("stability") or {}).get("label"),
+        "score_p5": pct.get("p5"),
+        "score_p95": pct.get("p95"),
+        "flip_probability": unc.get("flip_probability"),
+        "osm_base": comp.get("osm_base"),
+        "error": comp.get("error"),
+        "seconds": round(seconds, 3),
+    }
+
+
+def analyze_row(row_id: str, address: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    point = None
+    try:
+        point = geocode(address)
+        data = run_analysis(LocationRequest(address=address, **options), point=point)
+        return result_row(row_id, address, point, data, time.perf_counter() - t0)
+    except Exception as e:
+        row = {name: None for name, _ in FIELDS}
+        row.update({
+            "row_id": row_id, "address": address, "status": "error",
+            "lon": point[0] if point else None, "lat": point[1] if point else None,
+            "error": f"{type(e).__name__}: {e}", "seconds": round(time.perf_counter() - t0, 3),
+        })
+        return row
+
+
+def _run_key(input_path: str, args, options: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"input": str(Path(input_path).resolve()), "address_col": args.address_col, "id_col": args.id_col, **options},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _progress(done: int, total: int, errors: int, started: float, new: int) -> str:
+    elapsed = time.perf_counter() - started
+    rate = new / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate > 0 else float("inf")
+    eta_txt = f"{eta / 60:.1f} min" if eta != float("inf") else "?"
+    return f"[BATCH] {done}/{total} ({100 * done / max(total, 1):.1f}%) {rate:.2f}/s errors={errors} eta {eta_txt}"
+
+
+def run_batch(
+    rows: List[Tuple[str, str]],
+    options: Dict[str, Any],
+    out: Path,
+    checkpoint: Checkpoint,
+    workers: int = 4,
+    retry_errors: bool = False,
+    progress_s: float = 10.0,
+) -> Dict[str, Any]:
+    done = checkpoint.done(retry_errors)
+    order = {rid: i for i, (rid, _) in enumerate(rows)}
+    todo = [(rid, addr) for rid, addr in rows if rid not in done]
+
+    output = open_output(out)
+    # Ausgabe immer vollständig aus dem Checkpoint aufbauen (ein Absturz kann sie halb geschrieben haben)
+    for row in sorted(done.values(), key=lambda r: order.get(r["row_id"], len(order))):
+        output.write(row)
+
+    errors = sum(1 for r in done.values() if r["status"] != "ok")
+    n_done, new = len(done), 0
+    started = last_report = time.perf_counter()
+    interrupted = False
+    pending = iter(todo)
+    in_flight = set()
+
+    def _submit(pool, k: int) -> None:
+        # höchstens 2 x workers Analysen gleichzeitig eingeplant (Speicher, schnelles Abbrechen)
+        for rid, addr in pending:
+            in_flight.add(pool.submit(analyze_row, rid, addr, options))
+            k -= 1
+            if k <= 0:
+                return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            _submit(pool, 2 * workers)
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    in_flight.discard(fut)
+                    row = fut.result()
+                    checkpoint.save(order[row["row_id"]], row)
+                    output.write(row)
+                    n_done += 1
+                    new += 1
+                    errors += row["status"] != "ok"
+                _submit(pool, len(finished))
+                if time.perf_counter() - last_report >= progress_s:
+                    print(_progress(n_done, len(rows), errors, started, new), file=sys.stderr, flush=True)
+                    last_report = time.perf_counter()
+        except KeyboardInterrupt:
+            # laufende Analysen noch abschließen und sichern, keine neuen starten
+            interrupted = True
+            print("[BATCH] interrupted – finishing running analyses, then stopping", file=sys.stderr, flush=True)
+            for fut in in_flight:
+                fut.cancel()
+            for fut in in_flight:
+                if not fut.cancelled():
+                    row = fut.result()
+                    checkpoint.save(order[row["row_id"]], row)
+                    output.write(row)
+                    n_done += 1
+                    new += 1
+                    errors += row["status"] != "ok"
+        finally:
+            output.close()
+
+    print(_progress(n_done, len(rows), errors, started, new), file=sys.stderr, flush=True)
+    return {
+        "rows": len(rows),
+        "done": n_done,
+        "analysed_now": new,
+        "resumed": len(done),
+        "errors": errors,
+        "complete": n_done == len(rows),
+        "interrupted": interrupted,
+        "out": str(out),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Batch site analysis for CSV/Parquet address lists (resumable)")
+    ap.add_argument("input", help=".csv or .parquet with one address per row")
+    ap.add_argument("--out", required=True, help="output file: .csv, .parquet or .geojson")
+    ap.add_argument("--address-col", default="address")
+    ap.add_argument("--id-col", default=None, help="stable row id column (default: row number)")
+    ap.add_argument("--vertical", default="ev_charging")
+    ap.add_argument("--minutes", type=int, default=None)
+    ap.add_argument("--profile", choices=["urban", "daily", "destination", "rural"], default=None)
+    ap.add_argument("--plan", choices=["standard", "express", "pro"], default="standard")
+    ap.add_argument("--multi-time", action="store_true")
+    ap.add_argument("--minute-sweep", action="store_true")
+    ap.add_argument("--uncertainty", action="store_true")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--rate-limit", action="append", default=[], metavar="UPSTREAM=PER_SECOND",
+                    help="e.g. nominatim=1, ors=0.33, overpass=2 (overrides UPSTREAM_RATE_LIMITS)")
+    ap.add_argument("--checkpoint", default=None, help="checkpoint path (default: <out>.checkpoint.sqlite)")
+    ap.add_argument("--restart", action="store_true", help="discard an existing checkpoint")
+    ap.add_argument("--retry-errors", action="store_true", help="re-run rows that failed in an earlier run")
+    ap.add_argument("--progress", type=float, default=10.0, help="seconds between progress lines")
+    args = ap.parse_args(argv)
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt   # SIGTERM (cron, Container-Stop) wie Ctrl-C: sauber abschließen
+    signal.signal(signal.SIGTERM, _terminate)
+
+    for name, rate in ratelimit.parse_limits(",".join(args.rate_limit)).items():
+        ratelimit.set_limit(name, rate)
+
+    options = {
+        "vertical": args.vertical,
+        "minutes": args.minutes,
+        "profile": args.profile,
+        "plan": args.plan,
+        "multi_time": args.multi_time,
+        "minute_sweep": args.minute_sweep,
+        "uncertainty": args.uncertainty,
+    }
+    out = Path(args.out)
+    check_output(out)
+    rows = read_addresses(args.input, args.address_col, args.id_col)
+    checkpoint = Checkpoint(
+        Path(args.checkpoint or f"{out}.checkpoint.sqlite"), _run_key(args.input, args, options), restart=args.restart,
+    )
+    try:
+        t0 = time.perf_counter()
+        result = run_batch(rows, options, out, checkpoint, workers=max(1, args.workers),
+                           retry_errors=args.retry_errors, progress_s=args.progress)
+    finally:
+        checkpoint.close()
+    result["rate_limits"] = ratelimit.limits()
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0 if result["complete"] else 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Gespeicherte Analyse-Features (services/feature_store.py) verwalten und neu bewerten.
+
+    python -m app.cli.features stats
+    python -m app.cli.features compact            # Eingang -> npz-Segment (z. B. nächtlich per cron)
+    # Wirkung geänderter Gewichte auf alle bisherigen Analysen
+    python -m app.cli.features rescore --set pop_saturation=120000 --set station_thresholds=4,12,25 \
+        --out rescore.csv
+"""
+import argparse
+import csv
+import dataclasses
+import json
+import sys
+import time
+from typing import Dict, List
+
+from app.services import feature_store
+from app.services.scoring import ScoringConfig
+from app.services.verticals import VERTICALS
+
+
+def _parse_overrides(items: List[str]) -> Dict[str, object]:
+    """["pop_weight=0.5", "station_thresholds=4,12,25"] -> Felder von ScoringConfig."""
+    fields = {f.name: f for f in dataclasses.fields(ScoringConfig)}
+    out: Dict[str, object] = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep or key not in fields:
+            raise SystemExit(f"--set {item!r}: expected <field>=<value>, fields: {', '.join(fields)}")
+        default = getattr(ScoringConfig(), key)
+        if isinstance(default, bool):
+            out[key] = value.strip().lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, tuple):
+            out[key] = tuple(float(v) for v in value.split(","))
+            if len(out[key]) != len(default):
+                raise SystemExit(f"--set {key}: expected {len(default)} comma-separated values")
+        else:
+            out[key] = float(value)
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Stored analysis features: compaction and bulk re-scoring")
+    ap.add_argument("--dir", default=None, help=f"store directory (default {feature_store.FEATURE_STORE_DIR})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("stats", help="number of stored analyses, segments, pending rows")
+    sub.add_parser("compact", help="move pending analyses into a columnar segment")
+
+    p_rescore = sub.add_parser("rescore", help="recompute scores, decisions and stability for all analyses")
+    p_rescore.add_argument("--set", action="append", default=[], metavar="FIELD=VALUE",
+                           help="override a ScoringConfig field (repeatable)")
+    p_rescore.add_argument("--vertical", default=None, help="apply --set only to this vertical")
+    p_rescore.add_argument("--no-stability", action="store_true", help="skip the per-analysis stability label")
+    p_rescore.add_argument("--out", default=None, help="write one CSV row per analysis")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.cmd == "stats":
+        result = feature_store.store_stats(args.dir)
+    elif args.cmd == "compact":
+        result = feature_store.compact(args.dir)
+    else:
+        overrides = _parse_overrides(args.set)
+        configs = {
+            key: dataclasses.replace(cfg.scoring, **overrides) if args.vertical in (None, key) else cfg.scoring
+            for key, cfg in VERTICALS.items()
+        }
+        cols = feature_store.load_columns(args.dir)
+        t_load = time.perf_counter()
+        new = feature_store.rescore(cols, configs, with_stability=not args.no_stability)
+        result = feature_store.rescore_summary(cols, new)
+        result["load_seconds"] = round(t_load - t0, 3)
+        result["rescore_seconds"] = round(time.perf_counter() - t_load, 3)
+        if args.out:
+            rows = feature_store.rescore_rows(cols, new)
+            with open(args.out, "w", newline="", encoding="utf-8") as f:
+                writer = None
+                for row in rows:
+                    if writer is None:
+                        writer = csv.DictWriter(f, fieldnames=list(row))
+                        writer.writeheader()
+                    writer.writerow(row)
+            result["out"] = args.out
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Caches für bekannte Kandidaten vorwärmen (services/prewarm.py), z. B. nächtlich per cron.
+
+    python -m app.cli.prewarm --addresses kandidaten.csv --rate 0.5
+    python -m app.cli.prewarm --point 11.5755,48.1374 --bbox 11.36,48.06,11.72,48.25 --sweep
+    python -m app.cli.prewarm --addresses kandidaten.txt --report-only   # nur Coverage
+
+--addresses: .csv (Spalte address) oder .txt (eine Adresse pro Zeile).
+Die JSON-Ausgabe enthält die Coverage je Cache vorher/nachher.
+"""
+import argparse
+import csv
+import json
+import sys
+from typing import List
+
+from app.services import prewarm, ratelimit
+from app.services.scan import region_geometry
+
+
+def _read_addresses(path: str, column: str) -> List[str]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.lower().endswith(".csv"):
+            return [str(r.get(column) or "").strip() for r in csv.DictReader(f) if str(r.get(column) or "").strip()]
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _floats(value: str, n: int) -> List[float]:
+    parts = [float(v) for v in value.split(",")]
+    if len(parts) != n:
+        raise argparse.ArgumentTypeError(f"expected {n} comma-separated numbers, got {value!r}")
+    return parts
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Prewarm geocode, isochrone and station caches for candidate sites")
+    ap.add_argument("--addresses", action="append", default=[], metavar="FILE", help=".csv (address column) or .txt")
+    ap.add_argument("--address-col", default="address")
+    ap.add_argument("--address", action="append", default=[], help="single address (repeatable)")
+    ap.add_argument("--point", action="append", default=[], type=lambda v: _floats(v, 2), metavar="LON,LAT")
+    ap.add_argument("--bbox", action="append", default=[], type=lambda v: _floats(v, 4), metavar="W,S,E,N",
+                    help="region: station tiles only")
+    ap.add_argument("--polygon", action="append", default=[], metavar="FILE", help="GeoJSON region: station tiles only")
+    ap.add_argument("--sweep", action="store_true", help="also warm the minute-sweep rings")
+    ap.add_argument("--rate", type=float, default=prewarm.PREWARM_RATE, help="sites / tile queries per second")
+    ap.add_argument("--rate-limit", action="append", default=[], metavar="UPSTREAM=PER_SECOND")
+    ap.add_argument("--report-only", action="store_true", help="only report cache coverage, no upstream calls")
+    args = ap.parse_args(argv)
+
+    for name, rate in ratelimit.parse_limits(",".join(args.rate_limit)).items():
+        ratelimit.set_limit(name, rate)
+
+    addresses = list(args.address)
+    for path in args.addresses:
+        addresses.extend(_read_addresses(path, args.address_col))
+    targets = [prewarm.Target(address=a) for a in dict.fromkeys(addresses)]
+    targets += [prewarm.Target(point=(lon, lat)) for lon, lat in args.point]
+    regions = [region_geometry(bbox=b) for b in args.bbox]
+    for path in args.polygon:
+        with open(path, encoding="utf-8") as f:
+            gj = json.load(f)
+        features = gj.get("features") or [gj]
+        regions += [region_geometry(polygon=feat) for feat in features]
+    if not targets and not regions:
+        ap.error("nothing to prewarm: pass --addresses/--address/--point/--bbox/--polygon")
+
+    def _progress(done: int, total: int, failed: int) -> None:
+        print(f"[PREWARM] {done}/{total} failed={failed}", file=sys.stderr, flush=True)
+
+    result = prewarm.prewarm(
+        targets, regions, prewarm.prewarm_minutes(args.sweep),
+        rate=args.rate, report_only=args.report_only, progress=_progress,
+    )
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
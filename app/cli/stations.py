@@ -0,0 +1,46 @@
+"""
+Pflege des lokalen Ladepunkt-Index (STATION_SOURCE=local).
+
+    # Vollimport aus einem Extrakt (ersetzt den Index atomar)
+    python -m app.cli.stations import app/data/germany-latest.osm.pbf --osm-base 2026-10-01T20:21:00Z
+    # neue Diffs anwenden (z. B. per cron nach osmupdate / Replikations-Download)
+    python -m app.cli.stations update app/data/osm_diffs
+    python -m app.cli.stations stats
+"""
+import argparse
+import json
+import sys
+import time
+
+from app.services import station_index
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Local charging-station index (OSM extract + diffs)")
+    ap.add_argument("--db", default=None, help=f"index path (default {station_index.DB_PATH})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_import = sub.add_parser("import", help="full rebuild from an OSM extract")
+    p_import.add_argument("extract")
+    p_import.add_argument("--osm-base", default=None, help="data timestamp of the extract (default: file mtime)")
+
+    p_update = sub.add_parser("update", help="apply new .osc/.osc.gz files from a directory")
+    p_update.add_argument("diff_dir")
+
+    sub.add_parser("stats", help="show index size and data timestamp")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.cmd == "import":
+        result = station_index.import_extract(args.extract, osm_base=args.osm_base, path=args.db)
+    elif args.cmd == "update":
+        result = station_index.apply_diffs(args.diff_dir, path=args.db)
+    else:
+        result = station_index.index_stats(path=args.db)
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
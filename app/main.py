@@ -2,39 +2,37 @@ from pathlib import Path
 from dotenv import load_dotenv
 import os
 env_path = Path(__file__).resolve().parents[1] / ".env"
-print("ENV PATH:", env_path, "exists:", env_path.exists())
 load_dotenv(dotenv_path=env_path)
-print("STRIPE_SECRET_KEY:", os.getenv("STRIPE_SECRET_KEY"))
 
-import stripe
 from fastapi import FastAPI, HTTPException, Header, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 import uuid
-from typing import Optional, Literal, Dict, Any
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Literal, Dict, Any, Tuple
 
-from shapely.geometry import shape
-from shapely.ops import transform
-import pyproj
 from .services.geocode import geocode
-from .services.isochrone import build_isochrone
-from .services.population import population_in_area
-from .services.competition import charging_competition
-from .services.scoring import score_location
-from .services.interpretation import interpret_score
-from .services.report import build_pdf, compute_customer_stability, build_compare_pdf
-from .services.geocode_cache import get_geocode_meta
-from .services.confidence import compute_confidence
-from .services.stability import compute_stability
-from .services.verticals import get_vertical_config, Vertical
+from .services.isochrone import build_isochrones_many
+from .services import render
+from .services.verticals import get_vertical_config, Vertical, PROFILE_MINUTES, VERTICALS
+from .services.pipeline import extract_features, score_matrix
+from .services.analysis import (
+    LocationRequest, Plan, analysis_minutes, enforce_plan, request_features, resolve_minutes, run_analysis,
+)
+from .services.sweep import SWEEP_MIN_MINUTES, SWEEP_MAX_MINUTES
+from .services.scan import region_geometry, scan_region, to_feature, TopN
+from .services.metrics import collect_timings, stage, render_prometheus
+from .services.profiling import profile_block, save_profile, profile_summary, load_profile
+from .services import warmup
 from pydantic import BaseModel, Field
 
 from .services.report_store import (
     utc_now_iso,
     write_report_meta,
     read_report_meta,
-    update_report_meta,
+    transition_report_status,
     report_pdf_path,
 )
 
@@ -42,20 +40,30 @@ import re
 
 app = FastAPI(title="Charging Location Intelligence")
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
 FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "http://localhost:3000")
-if not stripe.api_key:
+if not STRIPE_SECRET_KEY:
     raise RuntimeError("STRIPE_SECRET_KEY is not set")
 if not STRIPE_WEBHOOK_SECRET:
     print("WARN: STRIPE_WEBHOOK_SECRET is not set (webhook will fail)")
 
+COMPARE_STREAM_WORKERS = int(os.getenv("COMPARE_STREAM_WORKERS", "3"))
+MAX_COMPARE_ADDRESSES = int(os.getenv("MAX_COMPARE_ADDRESSES", "1000"))   # Compare-PDF skaliert linear (Tabellen-Blöcke)
+
 REPORTS_DIR = (Path(__file__).resolve().parents[1] / "reports")
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
+def get_stripe():
+    """stripe erst beim ersten Zahlungs-Request importieren (~150 ms Cold Start)."""
+    import stripe
+    stripe.api_key = STRIPE_SECRET_KEY
+    return stripe
+
 @app.post("/stripe/webhook")
 async def stripe_webhook(request: Request):
+    stripe = get_stripe()
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
 
@@ -80,16 +88,38 @@ async def stripe_webhook(request: Request):
         # hier holen wir uns die report_id aus metadata
         report_id = (session.get("metadata") or {}).get("report_id")
         if report_id:
-            meta = read_report_meta(REPORTS_DIR, report_id)
-            if meta:
-                update_report_meta(REPORTS_DIR, report_id, {
-                    "status": "paid",
-                    "paid_at_utc": utc_now_iso(),
-                    "stripe_session_id": session.get("id"),
-                })
+            # atomar: nur created -> paid (Webhook-Retries setzen "delivered" nicht zurück)
+            transition_report_status(REPORTS_DIR, report_id, ("created",), "paid", {
+                "paid_at_utc": utc_now_iso(),
+                "stripe_session_id": session.get("id"),
+            })
 
     return {"ok": True}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stufen-/Upstream-Latenzen und Cache-Treffer im Prometheus-Textformat."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+def _warmup():
+    # WARMUP_MODE=none|api|render|full (siehe services/warmup.py)
+    warmup.run_warmup()
+
+@app.on_event("shutdown")
+def _shutdown_render_pool():
+    render.shutdown()
+
+def pdf_stream_response(pdf_bytes: bytes, pdf_path: Path, filename: str, on_persisted=None) -> StreamingResponse:
+    return StreamingResponse(
+        render.stream_and_persist(pdf_bytes, pdf_path, on_persisted=on_persisted),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(len(pdf_bytes)),
+        },
+    )
+
 def slugify(text: str) -> str:
     text = text.lower()
     text = re.sub(r"[^a-z0-9äöüß\s-]", "", text)
@@ -111,19 +141,11 @@ app.add_middleware(
 
 ADMIN_TOKEN = "charra"
 
-PROFILE_MINUTES = {
-    "urban": 8,
-    "daily": 15,
-    "destination": 25,
-    "rural": 30,
-}
-
 STRIPE_PRICES = {
     "standard": "price_1SkpBPPSuj2YcTgEzAeRnQhR",
     "express":  "price_1SkpBhPSuj2YcTgESJGEiwNZ",
     "pro":      "price_1SkpByPSuj2YcTgEJ0TlBNhD",
 }
-Plan = Literal["standard", "express", "pro"]
 class CheckoutRequest(BaseModel):
     report_id: str
     plan: Plan  # "standard" | "express" | "pro"
@@ -136,7 +158,7 @@ def create_checkout_session(body: CheckoutRequest):
         raise HTTPException(status_code=400, detail="Unknown plan")
 
     # 2) Checkout Session erstellen + report_id als metadata setzen
-    session = stripe.checkout.Session.create(
+    session = get_stripe().checkout.Session.create(
         mode="payment",
         line_items=[{"price": price_id, "quantity": 1}],
         success_url=f"{FRONTEND_BASE_URL}/success?report_id={body.report_id}",
@@ -145,14 +167,6 @@ def create_checkout_session(body: CheckoutRequest):
     )
 
     return JSONResponse({"url": session.url, "id": session.id})
-class LocationRequest(BaseModel):
-    address: str
-    vertical: str = "ev_charging"   # ⬅️ DAS ist die Zeile
-    minutes: Optional[int] = None
-    profile: Optional[Literal["urban", "daily", "destination", "rural"]] = None
-    multi_time: bool = False
-    plan: Plan = "standard"
-
  # falls Field noch nicht importiert ist
 
 class CompareRequest(BaseModel):
@@ -161,151 +175,99 @@ class CompareRequest(BaseModel):
     minutes: Optional[int] = None
     profile: Optional[Literal["urban", "daily", "destination", "rural"]] = None
     multi_time: bool = False
+    minute_sweep: bool = False   # Score-Kurve SWEEP_MIN..SWEEP_MAX min statt 10/15/20 (impliziert multi_time)
+    uncertainty: bool = False    # Monte-Carlo-Bänder für den Score (services/uncertainty.py)
     plan: Plan = "standard"
 
-def isochrone_area_km2(isochrone_geojson) -> float:
-    geom = shape(isochrone_geojson["features"][0]["geometry"])
-    project = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True).transform
-    geom_m = transform(project, geom)
-    return geom_m.area / 1_000_000.0
-
-
-def enforce_plan(req: LocationRequest) -> LocationRequest:
-    """
-    Plan/Enforcement (MVP) + vertical-aware:
-    - Multi-Time ist nur erlaubt, wenn der Plan das im Vertical erlaubt
-    """
-    cfg = get_vertical_config(req.vertical)
-
-    # Multi-Time nur wenn Plan erlaubt
-    if req.plan not in cfg.allow_multi_time_plans:
-        req.multi_time = False
-
-    return req
-
-
-def resolve_minutes(req: LocationRequest) -> int:
-    if req.minutes is not None:
-        return int(req.minutes)
-    if req.profile is not None:
-        return PROFILE_MINUTES[req.profile]
-    return 15
-
-
-def safe_competition(isochrone) -> Dict[str, Any]:
-    try:
-        return charging_competition(isochrone)
-    except Exception as e:
-        return {
-            "stations": None,
-            "density": "unknown",
-            "osm_base": None,
-            "queried_at": None,
-            "error": str(e),
-        }
-
-
-def compute_multi_results(point) -> list[dict]:
-    results = []
-    for m in [10, 15, 20]:
-        try:
-            iso_m = build_isochrone(point, minutes=m)
-            pop_m = population_in_area(iso_m)
-            comp_m = safe_competition(iso_m)
-            score_m = score_location(pop_m, comp_m)
-
-            results.append({
-                "minutes": m,
-                "population": pop_m,
-                "stations": comp_m.get("stations"),
-                "density": comp_m.get("density"),
-                "osm_base": comp_m.get("osm_base"),
-                "queried_at": comp_m.get("queried_at"),
-                "score": score_m,
-                "error": comp_m.get("error"),
-            })
-        except Exception as e:
-            results.append({
-                "minutes": m,
-                "population": None,
-                "stations": None,
-                "density": "unknown",
-                "osm_base": None,
-                "queried_at": None,
-                "score": 0,
-                "error": f"multi-time failed for {m}min: {e}",
-            })
-    return results
-
-
-def run_analysis(req: LocationRequest) -> Dict[str, Any]:
-    req = enforce_plan(req)
-    minutes = resolve_minutes(req)
-
-    point = geocode(req.address)
-    geocode_meta = get_geocode_meta(req.address)
-
-    isochrone = build_isochrone(point, minutes=minutes)
-
-    area_km2 = isochrone_area_km2(isochrone)
-    population = population_in_area(isochrone)
-    density = (population / area_km2) if area_km2 > 0 else None
+class MatrixRequest(BaseModel):
+    address: str
+    verticals: Optional[list[str]] = None   # Default: alle aus VERTICALS
+    profiles: Optional[list[Literal["urban", "daily", "destination", "rural"]]] = None
 
-    competition = safe_competition(isochrone)
+class ScanRequest(BaseModel):
+    bbox: Optional[list[float]] = Field(None, min_length=4, max_length=4)  # [west, south, east, north]
+    polygon: Optional[Dict[str, Any]] = None                                # GeoJSON Geometry/Feature
+    spacing_m: int = Field(1000, ge=200, le=20000)
+    minutes: Optional[int] = None
+    profile: Optional[Literal["urban", "daily", "destination", "rural"]] = None
+    top_n: int = Field(20, ge=1, le=500)
+    format: Literal["ndjson", "geojson"] = "ndjson"
 
-    confidence = compute_confidence(area_km2, density, competition, geocode_meta)
+def profiling_requested(x_profile: Optional[str], x_admin_token: Optional[str]) -> bool:
+    """X-Profile: 1 -> Request unter dem Sampling-Profiler ausführen (nur mit Admin-Token)."""
+    if not x_profile or x_profile.strip().lower() in ("0", "false", "no", "off"):
+        return False
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Profiling requires admin token")
+    return True
 
-    score = score_location(population, competition)
-    explanation = interpret_score(score, population, competition, minutes)
 
-    multi_results = None
-    stability_pack = None
-    stability = None
+def finish_profile(profiler, label: str) -> Optional[Dict[str, Any]]:
+    if profiler is None:
+        return None
+    return profile_summary(profiler, save_profile(profiler, label))
 
-    if req.multi_time:
-        multi_results = compute_multi_results(point)
-        stability_pack = compute_customer_stability(multi_results, baseline_minutes=15, far_minutes=20)
-        stability = compute_stability(multi_results) if multi_results else None
 
-    return {
-        "req": req.model_dump(),
-        "minutes": minutes,
-        "geocode_meta": geocode_meta,
-        "area_km2": area_km2,
-        "population": population,
-        "density": density,
-        "competition": competition,
-        "confidence": confidence,
-        "score": score,
-        "explanation": explanation,
-        "multi_results": multi_results,
-        "stability_pack": stability_pack,
-        "stability": stability,
-    }
-def analyze_one_for_compare(address: str, base_req: CompareRequest) -> Dict[str, Any]:
-    req = LocationRequest(
+def _compare_location_request(address: str, base_req: CompareRequest) -> LocationRequest:
+    return LocationRequest(
         address=address,
         vertical=base_req.vertical,
         minutes=base_req.minutes,
         profile=base_req.profile,
         multi_time=base_req.multi_time,
+        minute_sweep=base_req.minute_sweep,
+        uncertainty=base_req.uncertainty,
         plan=base_req.plan,
     )
-    data = run_analysis(req)
+
+
+def _compare_row(address: str, data: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "address": address,
         "minutes": data["minutes"],
         "score": data["score"],
         "population": data["population"],
+        "demand": data.get("demand"),
         "stations": (data["competition"] or {}).get("stations"),
         "density": (data["competition"] or {}).get("density"),
+        "nearest_m": (data["competition"] or {}).get("nearest_m"),
+        "pressure": (data["competition"] or {}).get("pressure"),
         "confidence": data["confidence"],
         "competition": data["competition"],
         "explanation": data["explanation"],
         "geocode_meta": data["geocode_meta"],
         "multi_results": data["multi_results"],
+        "uncertainty": data.get("uncertainty"),
     }
 
+
+def analyze_one_for_compare(address: str, base_req: CompareRequest) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(Compare-Zeile, timings) – timings bleiben außerhalb der Zeile (Render-Cache-Key)."""
+    req = _compare_location_request(address, base_req)
+    data = run_analysis(req)
+    return _compare_row(address, data), data["timings"]
+
+
+def analyze_many_for_compare(addresses: list[str], base_req: CompareRequest) -> list[Dict[str, Any]]:
+    """
+    Compare-Lauf mit gebatchten Isochronen: erst alle Adressen geocoden,
+    dann alle Ringe aller Standorte in einem Provider-Aufruf bauen
+    (lokal: gemeinsame Graph-Traversierung je Origin-Gruppe).
+    """
+    reqs = [enforce_plan(_compare_location_request(a, base_req)) for a in addresses]
+    with stage("geocode"):
+        points = [geocode(r.address) for r in reqs]
+    try:
+        with stage("isochrone"):
+            rings = build_isochrones_many(points, analysis_minutes(reqs[0])) if reqs else []
+    except Exception:
+        rings = [None] * len(reqs)   # Fallback: pro Standort einzeln (wie analyze_one_for_compare)
+
+    return [
+        _compare_row(r.address, run_analysis(r, point=p, isochrones=iso))
+        for r, p, iso in zip(reqs, points, rings)
+    ]
+
 # -----------------------------
 # SALES FLOW (MVP)
 # -----------------------------
@@ -326,6 +288,15 @@ def create_report(req: LocationRequest):
 
     return JSONResponse({"report_id": report_id, "status": meta["status"], "plan": req.plan})
 
+def clean_compare_addresses(addresses: list[str]) -> list[str]:
+    """Leere Einträge entfernen, dann 2..MAX_COMPARE_ADDRESSES erzwingen (HTTP 400)."""
+    addresses = [a.strip() for a in addresses if a and a.strip()]
+    if len(addresses) < 2:
+        raise HTTPException(status_code=400, detail="Bitte mindestens 2 Adressen angeben.")
+    if len(addresses) > MAX_COMPARE_ADDRESSES:
+        raise HTTPException(status_code=400, detail=f"Maximal {MAX_COMPARE_ADDRESSES} Adressen pro Vergleich.")
+    return addresses
+
 @app.post("/create_compare_report")
 def create_compare_report(req: CompareRequest):
     # Plan/Vertical Enforcement (wie in /compare)
@@ -333,14 +304,7 @@ def create_compare_report(req: CompareRequest):
     if req.plan not in cfg.allow_multi_time_plans:
         req.multi_time = False
 
-    # sanitize / limit
-    addresses = [a.strip() for a in req.addresses if a and a.strip()]
-    if len(addresses) < 2:
-        raise HTTPException(status_code=400, detail="Bitte mindestens 2 Adressen angeben.")
-    if len(addresses) > 50:
-        raise HTTPException(status_code=400, detail="Maximal 50 Adressen pro Vergleich.")
-
-    req.addresses = addresses
+    req.addresses = clean_compare_addresses(req.addresses)
 
     report_id = str(uuid.uuid4())
     meta = {
@@ -363,7 +327,7 @@ def mark_paid(report_id: str, x_admin_token: str | None = Header(default=None)):
     if not meta:
         raise HTTPException(status_code=404, detail="Report not found")
 
-    meta = update_report_meta(REPORTS_DIR, report_id, {"status": "paid", "paid_at_utc": utc_now_iso()})
+    meta = transition_report_status(REPORTS_DIR, report_id, ("created",), "paid", {"paid_at_utc": utc_now_iso()}) or meta
     return JSONResponse({"ok": True, "report_id": report_id, "status": meta["status"]})
 
 
@@ -381,61 +345,85 @@ def get_report(report_id: str):
     payload = meta.get("payload") or {}
     kind = meta.get("kind") or ("compare" if "addresses" in payload else "single")
 
-    if not pdf_path.exists():
-        if kind == "compare":
-            creq = CompareRequest(**payload)
-
-            results = [analyze_one_for_compare(a, creq) for a in creq.addresses]
-            results_sorted = sorted(results, key=lambda r: int(r.get("score") or 0), reverse=True)
-
-            effective_minutes = creq.minutes if creq.minutes is not None else (
-                PROFILE_MINUTES.get(creq.profile) if creq.profile else 15
-            )
-
-            build_compare_pdf(
-                path=pdf_path,
-                compare_results=results_sorted,   # ✅ richtig
-                minutes=effective_minutes,
-                vertical=creq.vertical,
-                plan=creq.plan,
-                profile=creq.profile,
-                multi_time=creq.multi_time,
-            )
-        else:
-            req = LocationRequest(**payload)
-            data = run_analysis(req)
-
-            build_pdf(
-                pdf_path,
-                req.address,
-                data["score"],
-                data["explanation"],
-                data["population"],
-                data["competition"],
-                data["minutes"],
-                multi_results=data["multi_results"],
-                confidence=data["confidence"],
-                geocode_meta=data["geocode_meta"],
-            )
-
-        if not pdf_path.exists():
-            raise HTTPException(status_code=500, detail=f"PDF generation failed: {pdf_path}")
-
-        update_report_meta(REPORTS_DIR, report_id, {"status": "delivered", "delivered_at_utc": utc_now_iso()})
-
-    return FileResponse(str(pdf_path), filename=f"report_{report_id}.pdf")
+    if pdf_path.exists():
+        return FileResponse(str(pdf_path), filename=f"report_{report_id}.pdf")
+
+    from .services.report import report_inputs, compare_report_inputs
+
+    if kind == "compare":
+        creq = CompareRequest(**payload)
+
+        results = analyze_many_for_compare(creq.addresses, creq)
+        results_sorted = sorted(results, key=lambda r: int(r.get("score") or 0), reverse=True)
+
+        effective_minutes = creq.minutes if creq.minutes is not None else (
+            PROFILE_MINUTES.get(creq.profile) if creq.profile else 15
+        )
+
+        inputs = compare_report_inputs(
+            compare_results=results_sorted,   # ✅ richtig
+            minutes=effective_minutes,
+            vertical=creq.vertical,
+            plan=creq.plan,
+            profile=creq.profile,
+            multi_time=creq.multi_time,
+        )
+    else:
+        req = LocationRequest(**payload)
+        data = run_analysis(req)
+
+        inputs = report_inputs(
+            req.address,
+            data["score"],
+            data["explanation"],
+            data["population"],
+            data["competition"],
+            data["minutes"],
+            multi_results=data["multi_results"],
+            confidence=data["confidence"],
+            geocode_meta=data["geocode_meta"],
+            demand=data.get("demand"),
+            uncertainty=data.get("uncertainty"),
+        )
+
+    try:
+        pdf_bytes = render.render_pdf(inputs)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {e}")
+
+    def _mark_delivered():
+        transition_report_status(REPORTS_DIR, report_id, ("paid",), "delivered", {"delivered_at_utc": utc_now_iso()})
+
+    # an den Client streamen und gleichzeitig im Reports-Ordner ablegen
+    return pdf_stream_response(pdf_bytes, pdf_path, f"report_{report_id}.pdf", on_persisted=_mark_delivered)
 
 # -----------------------------
 # LEGACY (optional): direct analyze
 # Keep for dev/testing. Make it admin-only.
 # -----------------------------
 @app.post("/analyze", response_class=FileResponse)
-def analyze(req: LocationRequest, x_admin_token: str | None = Header(default=None)):
+def analyze(
+    req: LocationRequest,
+    x_admin_token: str | None = Header(default=None),
+    x_profile: str | None = Header(default=None),
+):
     if x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    req = enforce_plan(req)          # ✅ wichtig (Plan-Regeln auch hier)
-    data = run_analysis(req)
+    with profile_block(profiling_requested(x_profile, x_admin_token)) as profiler:
+        req = enforce_plan(req)          # ✅ wichtig (Plan-Regeln auch hier)
+        data = run_analysis(req)
+        pdf_bytes, pdf_path, filename = _analyze_pdf(req, data)
+    profile = finish_profile(profiler, f"/analyze {req.address}")
+
+    response = pdf_stream_response(pdf_bytes, pdf_path, filename)
+    if profile:
+        response.headers["X-Profile-Id"] = profile["id"]
+        response.headers["X-Profile-Url"] = profile["url"]
+    return response
+
+def _analyze_pdf(req: LocationRequest, data: Dict[str, Any]):
+    from .services.report import report_inputs
 
     place = slugify(req.address)
 
@@ -446,12 +434,13 @@ def analyze(req: LocationRequest, x_admin_token: str | None = Header(default=Non
     # Optional: Multi-Time im Dateinamen markieren
     if req.plan == "pro" and req.multi_time:
         area = "multitime-10-15-20"
+    if req.minute_sweep:
+        area = f"sweep-{SWEEP_MIN_MINUTES}-{SWEEP_MAX_MINUTES}"
 
     filename = f"Feasibility_{req.vertical}_{place}_{area}_{req.plan.capitalize()}.pdf"
     pdf_path = REPORTS_DIR / filename
 
-    build_pdf(
-        pdf_path,
+    inputs = report_inputs(
         req.address,
         data["score"],
         data["explanation"],
@@ -461,26 +450,190 @@ def analyze(req: LocationRequest, x_admin_token: str | None = Header(default=Non
         multi_results=data["multi_results"],
         confidence=data["confidence"],
         geocode_meta=data["geocode_meta"],
+        demand=data.get("demand"),
+        uncertainty=data.get("uncertainty"),
     )
-
-    return FileResponse(str(pdf_path), filename=filename)
+    pdf_bytes = render.render_pdf(inputs)
+    return pdf_bytes, pdf_path, filename
 
 @app.post("/compare")
-def compare(req: CompareRequest):
+def compare(
+    req: CompareRequest,
+    x_admin_token: str | None = Header(default=None),
+    x_profile: str | None = Header(default=None),
+):
     # Multi-Time nur wenn Plan im Vertical erlaubt
     cfg = get_vertical_config(req.vertical)
     if req.plan not in cfg.allow_multi_time_plans:
         req.multi_time = False
 
-    results = [analyze_one_for_compare(a, req) for a in req.addresses]
+    with profile_block(profiling_requested(x_profile, x_admin_token)) as profiler, collect_timings() as timings:
+        results = analyze_many_for_compare(req.addresses, req)
+    profile = finish_profile(profiler, f"/compare n={len(req.addresses)}")
     results_sorted = sorted(results, key=lambda r: int(r.get("score") or 0), reverse=True)
 
     effective_minutes = req.minutes if req.minutes is not None else (PROFILE_MINUTES.get(req.profile) if req.profile else 15)
 
-    return JSONResponse({
+    body = {
         "vertical": req.vertical,
         "minutes": effective_minutes,
         "profile": req.profile,
         "plan": req.plan,
-        "results": results_sorted
-    })
\ No newline at end of file
+        "results": results_sorted,
+        "timings": timings,
+    }
+    if profile:
+        body["profiling"] = profile   # "profile" ist bereits das Fahrprofil
+    return JSONResponse(body, headers={"X-Profile-Id": profile["id"]} if profile else None)
+
+@app.post("/analyze/matrix")
+def analyze_matrix(req: MatrixRequest, x_admin_token: str | None = Header(default=None)):
+    """
+    Alle Verticals x Fahrprofile für eine Adresse: Features (Geocoding, Ringe,
+    Bevölkerung, Wettbewerb) werden EINMAL berechnet, danach nur noch gescort.
+    """
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    unknown = [v for v in req.verticals or [] if v not in VERTICALS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown vertical(s): {', '.join(unknown)}")
+
+    profiles = req.profiles or list(PROFILE_MINUTES)
+    ring_minutes = sorted({PROFILE_MINUTES[p] for p in profiles})
+    with collect_timings() as timings:
+        features = extract_features(req.address, ring_minutes[0], multi_minutes=ring_minutes[1:])
+        with stage("scoring"):
+            results = score_matrix(features, req.verticals, profiles)
+
+    return {
+        "address": req.address,
+        "point": list(features.point),
+        "geocode_meta": features.geocode_meta,
+        "results": results,
+        "timings": timings,
+    }
+
+@app.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str, x_admin_token: str | None = Header(default=None)):
+    """Gespeichertes Profil als folded stacks (flamegraph.pl / speedscope)."""
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    folded = load_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded)
+
+@app.post("/compare/stream")
+def compare_stream(req: CompareRequest):
+    """
+    Wie /compare, aber als NDJSON-Stream:
+      {"type": "start", ...}
+      {"type": "result", "index": i, "result": {...}}   # sobald eine Adresse fertig ist
+      {"type": "error", "index": i, "address": ..., "error": ...}
+      {"type": "summary", "ranking": [...]}             # kompakte Rangliste am Ende
+    Vollständige Einzelergebnisse werden nach dem Senden nicht behalten.
+    """
+    # Multi-Time nur wenn Plan im Vertical erlaubt
+    cfg = get_vertical_config(req.vertical)
+    if req.plan not in cfg.allow_multi_time_plans:
+        req.multi_time = False
+
+    addresses = clean_compare_addresses(req.addresses)   # vor dem Stream: Fehler als HTTP 400
+    effective_minutes = req.minutes if req.minutes is not None else (PROFILE_MINUTES.get(req.profile) if req.profile else 15)
+
+    def _line(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, default=str) + "\n"
+
+    def stream():
+        yield _line({
+            "type": "start",
+            "vertical": req.vertical,
+            "minutes": effective_minutes,
+            "profile": req.profile,
+            "plan": req.plan,
+            "total": len(addresses),
+        })
+
+        ranking = []
+        with ThreadPoolExecutor(max_workers=max(1, COMPARE_STREAM_WORKERS)) as pool:
+            pending = {pool.submit(analyze_one_for_compare, a, req): i for i, a in enumerate(addresses)}
+            for fut in as_completed(list(pending)):
+                i = pending.pop(fut)
+                try:
+                    r, timings = fut.result()
+                except Exception as e:
+                    yield _line({"type": "error", "index": i, "address": addresses[i], "error": str(e)})
+                    continue
+
+                ranking.append({
+                    "index": i,
+                    "address": r["address"],
+                    "score": r["score"],
+                    "population": r["population"],
+                    "stations": r["stations"],
+                    "confidence": r["confidence"],
+                })
+                yield _line({"type": "result", "index": i, "result": r, "timings": timings})
+
+        ranking.sort(key=lambda r: int(r.get("score") or 0), reverse=True)
+        yield _line({
+            "type": "summary",
+            "completed": len(ranking),
+            "failed": len(addresses) - len(ranking),
+            "ranking": [{"rank": n, **r} for n, r in enumerate(ranking, start=1)],
+        })
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/scan")
+def scan(req: ScanRequest, x_admin_token: str | None = Header(default=None)):
+    """
+    Site Hunting: alle Rasterpunkte einer Region bewerten (Isochronen-Näherung,
+    Batch-Population, eine Overpass-Abfrage). Ergebnisse werden gestreamt:
+      - ndjson:  eine GeoJSON-Feature-Zeile pro Punkt, am Ende {"type": "summary", "top": [...]}
+      - geojson: FeatureCollection mit zusätzlichem "top"-Member
+    """
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    try:
+        region = region_geometry(bbox=req.bbox, polygon=req.polygon)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scan region: {e}")
+
+    minutes = resolve_minutes(req)
+    rows = scan_region(region, req.spacing_m, minutes)
+
+    # Validierung (Punktanzahl) vor dem Streamen, damit Fehler als 400 ankommen
+    try:
+        first = next(rows, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def _rows():
+        if first is not None:
+            yield first
+            yield from rows
+
+    def ndjson_stream():
+        top = TopN(req.top_n)
+        count = 0
+        for row in _rows():
+            top.push(row)
+            count += 1
+            yield json.dumps(to_feature(row), ensure_ascii=False) + "\n"
+        yield json.dumps({"type": "summary", "minutes": minutes, "count": count, "top": top.ranked()}, ensure_ascii=False) + "\n"
+
+    def geojson_stream():
+        top = TopN(req.top_n)
+        yield '{"type": "FeatureCollection", "features": ['
+        sep = ""
+        for row in _rows():
+            top.push(row)
+            yield sep + json.dumps(to_feature(row), ensure_ascii=False)
+            sep = ","
+        yield '], "minutes": ' + json.dumps(minutes) + ', "top": ' + json.dumps(top.ranked(), ensure_ascii=False) + "}"
+
+    if req.format == "geojson":
+        return StreamingResponse(geojson_stream(), media_type="application/geo+json")
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
@@ -0,0 +1,96 @@
+"""
+Analyse eines Standorts unabhängig von der API (FastAPI/Stripe): Request-Modell,
+Plan-Enforcement und run_analysis(). Genutzt von app/main.py und den CLIs (app/cli/batch.py).
+"""
+from typing import Any, Dict, Literal, Optional
+
+from pydantic import BaseModel
+
+from .feature_store import record_analysis
+from .metrics import collect_timings, stage
+from .pipeline import MULTI_TIME_MINUTES, extract_features, score_features
+from .sweep import sweep_minutes
+from .verticals import PROFILE_MINUTES, get_vertical_config
+
+Plan = Literal["standard", "express", "pro"]
+
+
+class LocationRequest(BaseModel):
+    address: str
+    vertical: str = "ev_charging"
+    minutes: Optional[int] = None
+    profile: Optional[Literal["urban", "daily", "destination", "rural"]] = None
+    multi_time: bool = False
+    minute_sweep: bool = False   # Score-Kurve SWEEP_MIN..SWEEP_MAX min statt 10/15/20 (impliziert multi_time)
+    uncertainty: bool = False    # Monte-Carlo-Bänder für den Score (services/uncertainty.py)
+    plan: Plan = "standard"
+
+
+def enforce_plan(req: LocationRequest) -> LocationRequest:
+    """
+    Plan/Enforcement (MVP) + vertical-aware:
+    - Multi-Time ist nur erlaubt, wenn der Plan das im Vertical erlaubt
+    """
+    cfg = get_vertical_config(req.vertical)
+
+    if req.minute_sweep:
+        req.multi_time = True
+
+    # Multi-Time (und Sweep) nur wenn Plan erlaubt
+    if req.plan not in cfg.allow_multi_time_plans:
+        req.multi_time = False
+        req.minute_sweep = False
+
+    return req
+
+
+def resolve_minutes(req) -> int:
+    if req.minutes is not None:
+        return int(req.minutes)
+    if req.profile is not None:
+        return PROFILE_MINUTES[req.profile]
+    return 15
+
+
+def analysis_minutes(req: LocationRequest) -> list[int]:
+    """Alle Ringe, die eine Analyse braucht (Basis + ggf. Multi-Time) – werden gemeinsam gebaut."""
+    minutes = resolve_minutes(req)
+    if req.minute_sweep:
+        return sorted({minutes, *MULTI_TIME_MINUTES, *sweep_minutes()})
+    return sorted({minutes, *MULTI_TIME_MINUTES}) if req.multi_time else [minutes]
+
+
+def request_features(req: LocationRequest, point=None, isochrones: Optional[Dict[int, Any]] = None):
+    """Vertical-unabhängige Features für einen (bereits enforce_plan-geprüften) Request."""
+    return extract_features(
+        req.address,
+        resolve_minutes(req),
+        multi_minutes=MULTI_TIME_MINUTES if req.multi_time and not req.minute_sweep else (),
+        sweep_minutes=sweep_minutes() if req.minute_sweep else (),
+        point=point,
+        isochrones=isochrones,
+    )
+
+
+def run_analysis(
+    req: LocationRequest,
+    point=None,
+    isochrones: Optional[Dict[int, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    point / isochrones können vorab (gebatcht) berechnet übergeben werden,
+    z.B. für Compare-Läufe; sonst werden alle Ringe hier in einem Aufruf gebaut.
+    """
+    with collect_timings() as timings:
+        req = enforce_plan(req)
+        minutes = resolve_minutes(req)
+        features = request_features(req, point, isochrones)
+
+        with stage("scoring"):
+            data = score_features(
+                features, minutes, get_vertical_config(req.vertical),
+                multi_time=req.multi_time, minute_sweep=req.minute_sweep, uncertainty=req.uncertainty,
+            )
+        record_analysis(req.model_dump(), data, features.point)
+
+    return {"req": req.model_dump(), **data, "timings": timings}
@@ -1,11 +1,40 @@
+import math
+import os
 import requests
+import numpy as np
+import shapely
 from datetime import datetime, timezone
-from shapely.geometry import shape, Point
+from typing import Dict
+from shapely import STRtree
+from shapely.geometry import Point, box
+
+from .isochrone import as_isochrone
+from .metrics import cache_event, upstream
+from . import ratelimit
+from .mirrors import call_mirrors
+from . import swr_cache
+
+# overpass (Default) | local: lokaler Index aus OSM-Extrakt + Diffs (services/station_index.py)
+STATION_SOURCE = os.getenv("STATION_SOURCE", "overpass").strip().lower()
 
 OVERPASS_URLS = [
     "https://overpass-api.de/api/interpreter",
     "https://overpass.kumi.systems/api/interpreter",
 ]
+# (connect, read): ein nicht erreichbarer Mirror kostet nur den Connect-Timeout
+OVERPASS_TIMEOUT = (
+    float(os.getenv("OVERPASS_CONNECT_TIMEOUT_S", "5")),
+    float(os.getenv("OVERPASS_READ_TIMEOUT_S", "60")),
+)
+
+# SWR-Cache für Ladepunkte in festen Kacheln (STATIONS_TILE_DEG): benachbarte Standorte und
+# der Prewarm-Job (services/prewarm.py) teilen sich die Einträge. Ausgeliefert wird wie bisher
+# die auf STATIONS_CACHE_GRID_DEG erweiterte BBox (gezählt wird ohnehin gegen das Polygon).
+STATIONS_CACHE_GRID_DEG = 0.02
+STATIONS_TILE_DEG = float(os.getenv("STATIONS_TILE_DEG", "0.1"))
+STATIONS_FETCH_MAX_TILES = int(os.getenv("STATIONS_FETCH_MAX_TILES", "16"))   # Kacheln je Overpass-Abfrage (Prewarm)
+STATIONS_SOFT_TTL_S = float(os.getenv("STATIONS_SOFT_TTL_S", str(6 * 3600)))
+STATIONS_HARD_TTL_S = float(os.getenv("STATIONS_HARD_TTL_S", str(7 * 24 * 3600)))
 
 # optional: stabiler Header (manche Overpass-Instanzen mögen User-Agent)
 HEADERS = {
@@ -13,9 +42,8 @@ HEADERS = {
 }
 
 
-def _bbox_from_featurecollection(geojson_fc):
-    geom = shape(geojson_fc["features"][0]["geometry"])
-    minx, miny, maxx, maxy = geom.bounds  # lon/lat bounds
+def _bbox_from_isochrone(iso):
+    minx, miny, maxx, maxy = iso.bounds  # lon/lat bounds
     return miny, minx, maxy, maxx  # south, west, north, east
 
 
@@ -42,12 +70,8 @@ def _point_from_element(el):
     return None
 
 
-def charging_competition(isochrone_geojson):
-    # Fetch via bbox (stable), then filter strictly inside isochrone polygon (accurate)
-    s, w, n, e = _bbox_from_featurecollection(isochrone_geojson)
-    iso_poly = shape(isochrone_geojson["features"][0]["geometry"])
-
-    query = f"""
+def _overpass_query(s, w, n, e):
+    return f"""
     [out:json][timeout:40];
     (
       node["amenity"="charging_station"]({s},{w},{n},{e});
@@ -57,70 +81,280 @@ def charging_competition(isochrone_geojson):
     out center tags;
     """
 
-    last_err = None
 
-    for url in OVERPASS_URLS:
-        try:
-            resp = requests.post(url, data=query, headers=HEADERS, timeout=60)
-            resp.raise_for_status()
+def _fetch_from(url, query):
+    with upstream("overpass"):
+        ratelimit.acquire("overpass")
+        resp = requests.post(url, data=query, headers=HEADERS, timeout=OVERPASS_TIMEOUT)
+        resp.raise_for_status()
+
+        ctype = (resp.headers.get("Content-Type") or "").lower()
+        # Overpass liefert manchmal HTML bei Rate-Limit/Wartung -> das fangen wir ab
+        if ("json" not in ctype) and ("application/geo+json" not in ctype):
+            raise RuntimeError(f"Overpass non-JSON response: {ctype}")
+
+        data = resp.json()
+
+    osm_base = (
+        data.get("osm3s", {}).get("timestamp_osm_base")
+        or data.get("osm_base")
+        or "unknown"
+    )
+    queried_at = datetime.now(timezone.utc).isoformat()
 
-            ctype = (resp.headers.get("Content-Type") or "").lower()
-            # Overpass liefert manchmal HTML bei Rate-Limit/Wartung -> das fangen wir ab
-            if ("json" not in ctype) and ("application/geo+json" not in ctype):
-                raise RuntimeError(f"Overpass non-JSON response: {ctype}")
+    elements = _dedup(data.get("elements", []))
 
-            data = resp.json()
+    coords = []
+    for el in elements:
+        tags = el.get("tags", {}) or {}
 
-            osm_base = (
-                data.get("osm3s", {}).get("timestamp_osm_base")
-                or data.get("osm_base")
-                or "unknown"
-            )
-            queried_at = datetime.now(timezone.utc).isoformat()
+        # filter private / no if tagged
+        access = (tags.get("access") or "").lower()
+        if access in {"private", "no"}:
+            continue
 
-            elements = _dedup(data.get("elements", []))
+        pt = _point_from_element(el)
+        if pt is None:
+            continue
 
-            filtered = []
-            for el in elements:
-                tags = el.get("tags", {}) or {}
+        coords.append((pt.x, pt.y))
 
-                # filter private / no if tagged
-                access = (tags.get("access") or "").lower()
-                if access in {"private", "no"}:
-                    continue
+    return {
+        "points": np.array(coords, dtype=np.float64).reshape(-1, 2),
+        "osm_base": osm_base,
+        "queried_at": queried_at,
+    }
 
-                pt = _point_from_element(el)
-                if pt is None:
-                    continue
 
-                # strict: must lie inside isochrone polygon
-                if not (iso_poly.contains(pt) or iso_poly.touches(pt)):
-                    continue
+def fetch_stations(s, w, n, e):
+    """
+    Holt alle öffentlich zugänglichen Ladepunkte in der BBox (eine Overpass-Abfrage).
+    Rückgabe: {"points": ndarray (n, 2) lon/lat, "osm_base": str, "queried_at": str}
+    Mirrors werden nach Gesundheit/Latenz gewählt (services/mirrors.py: Circuit Breaker,
+    optional Hedging). Wirft RuntimeError, wenn alle Overpass-Instanzen fehlschlagen.
+    """
+    query = _overpass_query(s, w, n, e)
+    return call_mirrors(OVERPASS_URLS, lambda url: _fetch_from(url, query))
 
-                filtered.append(el)
 
-            stations = len(filtered)
+def _snap_bbox(s, w, n, e, grid=STATIONS_CACHE_GRID_DEG):
+    # round() gegen Float-Rauschen (48.06/0.02 = 2402.9999...)
+    down = lambda v: math.floor(round(v / grid, 6)) * grid
+    up = lambda v: math.ceil(round(v / grid, 6)) * grid
+    return round(down(s), 6), round(down(w), 6), round(up(n), 6), round(up(e), 6)
 
-            # Density buckets (based on polygon-filtered count)
-            density = "low" if stations < 10 else "medium" if stations < 30 else "high"
 
-            return {
-                "stations": stations,
-                "density": density,
-                "osm_base": osm_base,
-                "queried_at": queried_at,
-            }
+def _tiles(s, w, n, e, size=STATIONS_TILE_DEG):
+    """Kacheln (Zeile, Spalte), die die BBox überdecken."""
+    i0, i1 = math.floor(round(s / size, 6)), math.ceil(round(n / size, 6))
+    j0, j1 = math.floor(round(w / size, 6)), math.ceil(round(e / size, 6))
+    return [(i, j) for i in range(i0, max(i1, i0 + 1)) for j in range(j0, max(j1, j0 + 1))]
 
-        except Exception as e:
-            last_err = f"{url}: {e}"
-            continue
 
-    # ✅ Fallback: lieber Report erzeugen als API crashen lassen
-    print("[WARN] Overpass failed, returning stations=None. Last error:", last_err)
+def _tile_key(tile, size=STATIONS_TILE_DEG) -> str:
+    return f"{size:g}:{tile[0]},{tile[1]}"
+
+
+def _tiles_bbox(tiles, size=STATIONS_TILE_DEG):
+    rows, cols = [t[0] for t in tiles], [t[1] for t in tiles]
+    return (round(min(rows) * size, 6), round(min(cols) * size, 6),
+            round((max(rows) + 1) * size, 6), round((max(cols) + 1) * size, 6))
+
+
+def _fetch_tiles(tiles, size=STATIONS_TILE_DEG):
+    """
+    Eine Overpass-Abfrage für die BBox der Kacheln, Ergebnis je Kachel speichern
+    (auch Kacheln, die nur in der BBox liegen, werden mit erneuert).
+    """
+    s, w, n, e = _tiles_bbox(tiles, size)
+    fetched = fetch_stations(s, w, n, e)
+    pts = fetched["points"]
+    ti = np.floor(pts[:, 1] / size).astype(np.int64)
+    tj = np.floor(pts[:, 0] / size).astype(np.int64)
+    values = {}
+    for tile in _tiles(s, w, n, e, size):
+        mask = (ti == tile[0]) & (tj == tile[1])
+        values[tile] = {"points": pts[mask].tolist(), "osm_base": fetched["osm_base"], "queried_at": fetched["queried_at"]}
+    swr_cache.store_many("stations", {_tile_key(t, size): v for t, v in values.items()})
+    return values
+
+
+_LEGACY_PURGED = False
+
+
+def _purge_legacy_keys() -> None:
+    """
+    Einmal je Prozess: Ladepunkt-Einträge im alten BBox-Schlüsselformat bzw. mit anderer
+    Kachelgröße löschen – sie würden nie mehr gelesen und blieben sonst für immer liegen.
+    """
+    global _LEGACY_PURGED
+    if _LEGACY_PURGED:
+        return
+    _LEGACY_PURGED = True
+    n = swr_cache.purge_other_keys("stations", f"{STATIONS_TILE_DEG:g}:")
+    if n:
+        print(f"[SWR] removed {n} stations cache entries with outdated keys")
+
+
+def _tile_states(tiles):
+    _purge_legacy_keys()
+    entries = swr_cache.lookup_many("stations", [_tile_key(t) for t in tiles])
+    entries = {t: entries[_tile_key(t)] for t in tiles}
+    states = {t: swr_cache.classify(e, STATIONS_SOFT_TTL_S, STATIONS_HARD_TTL_S) for t, e in entries.items()}
+    return entries, states
+
+
+def fetch_stations_cached(s, w, n, e):
+    """
+    fetch_stations() über den SWR-Kachel-Cache: fehlende/abgelaufene Kacheln in EINER
+    Abfrage holen, veraltete sofort liefern und im Hintergrund erneuern.
+    osm_base/queried_at: ältester Stand der beteiligten Kacheln.
+    """
+    s, w, n, e = _snap_bbox(s, w, n, e)
+    if not swr_cache.ENABLED:
+        return fetch_stations(s, w, n, e)
+    tiles = _tiles(s, w, n, e)
+    entries, states = _tile_states(tiles)
+
+    need = [t for t in tiles if states[t] in ("missing", "expired")]
+    stale = [t for t in tiles if states[t] == "stale"]
+    cache_event("stations", not need, stale=bool(stale) and not need)
+
+    values = {t: entries[t].value for t in tiles if t not in need}
+    if need:
+        try:
+            fetched = _fetch_tiles(need)
+        except Exception as err:
+            if any(entries[t] is None for t in need):
+                raise
+            print(f"[WARN] stations upstream failed, serving expired cache tiles: {err}")
+            fetched = {t: entries[t].value for t in need}
+        values.update({t: fetched[t] for t in need})
+    if stale:
+        swr_cache.refresh_async("stations", ";".join(_tile_key(t) for t in stale), lambda: _fetch_tiles(stale))
+
+    parts = [np.array(values[t]["points"], dtype=np.float64).reshape(-1, 2) for t in tiles]
+    pts = np.concatenate(parts) if parts else np.zeros((0, 2))
+    inside = (pts[:, 1] >= s) & (pts[:, 1] <= n) & (pts[:, 0] >= w) & (pts[:, 0] <= e)
     return {
-        "stations": None,
-        "density": "unknown",
-        "osm_base": None,
-        "queried_at": None,
-        "error": str(last_err),
+        "points": pts[inside],
+        "osm_base": min(str(values[t]["osm_base"]) for t in tiles),
+        "queried_at": min(str(values[t]["queried_at"]) for t in tiles),
+    }
+
+
+def _region_tiles(s, w, n, e, geometry=None):
+    """Kacheln der BBox; mit geometry (lon/lat) nur die, die sie schneiden."""
+    tiles = _tiles(*_snap_bbox(s, w, n, e))
+    if geometry is None:
+        return tiles
+    boxes = []
+    for t in tiles:
+        ts, tw, tn, te = _tiles_bbox([t])
+        boxes.append(box(tw, ts, te, tn))
+    hit = shapely.intersects(geometry, boxes)
+    return [t for t, h in zip(tiles, hit) if h]
+
+
+def warm_stations(s, w, n, e, geometry=None, throttle=None) -> Dict[str, int]:
+    """
+    Prewarm: alle nicht frischen Kacheln der BBox (optional nur die, die geometry schneiden)
+    synchron holen, in Blöcken à STATIONS_FETCH_MAX_TILES Kacheln je Abfrage.
+    throttle(): wird vor jeder Abfrage aufgerufen (Tempo-Begrenzung des Aufrufers).
+    """
+    tiles = _region_tiles(s, w, n, e, geometry)
+    _, states = _tile_states(tiles)
+    todo = sorted(t for t in tiles if states[t] != "fresh")
+    side = max(1, int(math.sqrt(STATIONS_FETCH_MAX_TILES)))
+    blocks: Dict[tuple, list] = {}
+    for t in todo:
+        blocks.setdefault((t[0] // side, t[1] // side), []).append(t)
+    for block in blocks.values():
+        if throttle is not None:
+            throttle()
+        _fetch_tiles(block)
+    return {"tiles": len(tiles), "fetched": len(todo), "queries": len(blocks)}
+
+
+def stations_coverage(s, w, n, e, geometry=None) -> Dict[str, int]:
+    """Kachel-Zustände (fresh/stale/expired/missing) für die BBox, ohne Upstream-Aufruf."""
+    _, states = _tile_states(_region_tiles(s, w, n, e, geometry))
+    out: Dict[str, int] = {}
+    for state in states.values():
+        out[state] = out.get(state, 0) + 1
+    return out
+
+
+def load_stations(s, w, n, e, cached=True):
+    """
+    Ladepunkte in der BBox aus der konfigurierten Quelle (STATION_SOURCE).
+    Der lokale Index ist selbst der Cache und wird direkt gelesen.
+    """
+    if STATION_SOURCE == "local":
+        from .station_index import stations_in_bbox
+        return stations_in_bbox(s, w, n, e)
+    return fetch_stations_cached(s, w, n, e) if cached else fetch_stations(s, w, n, e)
+
+
+def count_stations_in_areas(geometries, points):
+    """
+    Zählt Ladepunkte je Polygon (strikt innerhalb oder auf dem Rand, wie bisher).
+    points: ndarray (n, 2) lon/lat. Rückgabe: int-Array, eins pro Polygon.
+    """
+    geoms = list(geometries)
+    if len(points) == 0 or not geoms:
+        return np.zeros(len(geoms), dtype=np.int64)
+
+    tree = STRtree(shapely.points(points))
+    geom_idx, _ = tree.query(geoms, predicate="intersects")
+    return np.bincount(geom_idx, minlength=len(geoms)).astype(np.int64)
+
+
+def density_bucket(stations):
+    # Density buckets (based on polygon-filtered count)
+    return "low" if stations < 10 else "medium" if stations < 30 else "high"
+
+
+def competition_bbox(isochrone, point=None):
+    """(south, west, north, east): Isochronen-BBox, mit point vereinigt mit dem Kennzahlen-Radius."""
+    s, w, n, e = _bbox_from_isochrone(as_isochrone(isochrone))
+    if point is None:
+        return s, w, n, e
+    from .competition_metrics import radius_bbox
+    ps, pw, pn, pe = radius_bbox(point)
+    return min(s, ps), min(w, pw), max(n, pn), max(e, pe)
+
+
+def charging_competition(isochrone, point=None):
+    # Fetch via bbox (stable), then filter strictly inside isochrone polygon (accurate)
+    # point (lon, lat): zusätzlich Distanz-Kennzahlen (services/competition_metrics.py);
+    # die BBox umfasst dann auch den Kreis PRESSURE_RADIUS_M um den Standort
+    iso = as_isochrone(isochrone)
+    s, w, n, e = competition_bbox(iso, point)
+    iso_poly = iso.analysis_geom
+
+    try:
+        fetched = load_stations(s, w, n, e)
+    except RuntimeError as err:
+        # ✅ Fallback: lieber Report erzeugen als API crashen lassen
+        print(f"[WARN] station source {STATION_SOURCE} failed, returning stations=None. Last error:", err)
+        return {
+            "stations": None,
+            "density": "unknown",
+            "osm_base": None,
+            "queried_at": None,
+            "error": str(err),
+        }
+
+    stations = int(count_stations_in_areas([iso_poly], fetched["points"])[0])
+
+    out = {
+        "stations": stations,
+        "density": density_bucket(stations),
+        "osm_base": fetched["osm_base"],
+        "queried_at": fetched["queried_at"],
     }
+    if point is not None:
+        from .competition_metrics import site_metrics
+        out.update(site_metrics(point, fetched["points"]))
+    return out
@@ -0,0 +1,92 @@
+"""
+Wettbewerbskennzahlen je Standort über einen KD-Tree der Ladepunkte (EPSG:3035, Meter).
+
+  nearest_m  Distanz zum nächsten Ladepunkt (NaN: keiner innerhalb PRESSURE_RADIUS_M)
+  knn_m      Distanzen zu den K_NEAREST nächsten Ladepunkten (NaN-aufgefüllt)
+  pressure   Wettbewerbsdruck: Σ exp(-d / DECAY_M) über Ladepunkte im Radius
+             (ein Ladepunkt direkt am Standort zählt 1, in DECAY_M Entfernung ~0.37)
+
+competition_metrics() bewertet alle übergebenen Standorte in einem Durchlauf (k-NN-Abfrage +
+Paarsuche Tree gegen Tree) – genutzt vom Scan je Batch; Analyse/Compare rufen site_metrics()
+je Standort auf. Luftlinie, kein Routing.
+"""
+import math
+import os
+from functools import lru_cache
+from typing import Any, Dict
+
+import numpy as np
+import pyproj
+
+K_NEAREST = int(os.getenv("COMPETITION_K_NEAREST", "3"))
+DECAY_M = float(os.getenv("COMPETITION_DECAY_M", "1500"))
+PRESSURE_RADIUS_M = float(os.getenv("COMPETITION_RADIUS_M", "5000"))
+
+
+@lru_cache(maxsize=None)
+def _to_metric() -> pyproj.Transformer:
+    return pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3035", always_xy=True)
+
+
+def _xy(lonlat) -> np.ndarray:
+    pts = np.asarray(lonlat, dtype=np.float64).reshape(-1, 2)
+    x, y = _to_metric().transform(pts[:, 0], pts[:, 1])
+    return np.column_stack([x, y])
+
+
+def radius_bbox(point, radius_m: float = PRESSURE_RADIUS_M):
+    """
+    (south, west, north, east) um einen Standort (lon, lat), die den Kreis radius_m sicher enthält
+    (2 % Reserve für die Abweichung der EPSG:3035-Distanzen von der Kugel).
+    """
+    lon, lat = float(point[0]), float(point[1])
+    r = radius_m * 1.02
+    dlat = math.degrees(r / 6_371_000.0)
+    dlon = dlat / max(math.cos(math.radians(min(abs(lat) + dlat, 89.0))), 1e-6)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def competition_metrics(sites, stations, k: int = K_NEAREST, decay_m: float = DECAY_M,
+                        radius_m: float = PRESSURE_RADIUS_M) -> Dict[str, np.ndarray]:
+    """
+    sites, stations: (n, 2) / (m, 2) lon/lat.
+    Rückgabe: {"nearest_m": (n,), "knn_m": (n, k), "pressure": (n,)} als float64-Arrays.
+    """
+    from scipy.spatial import cKDTree   # lazy: scipy.spatial kostet ~240 ms beim Import
+
+    sites_xy = _xy(sites)
+    n = len(sites_xy)
+    st = np.asarray(stations, dtype=np.float64).reshape(-1, 2)
+    if len(st) == 0 or n == 0:
+        return {
+            "nearest_m": np.full(n, np.nan),
+            "knn_m": np.full((n, k), np.nan),
+            "pressure": np.zeros(n),
+        }
+
+    tree = cKDTree(_xy(st))
+    kq = min(k, len(st))
+    dist, _ = tree.query(sites_xy, k=kq, distance_upper_bound=radius_m)
+    knn = np.full((n, k), np.nan)
+    knn[:, :kq] = dist.reshape(n, kq)   # k=1 liefert 1-D
+    knn[np.isinf(knn)] = np.nan         # außerhalb des Radius
+
+    # alle Paare im Radius (exakt, ohne Nachbar-Limit), Summe je Standort
+    pairs = cKDTree(sites_xy).sparse_distance_matrix(tree, radius_m, output_type="ndarray")
+    pressure = np.bincount(pairs["i"], weights=np.exp(-pairs["v"] / decay_m), minlength=n)
+    return {"nearest_m": knn[:, 0].copy(), "knn_m": knn, "pressure": pressure}
+
+
+def metrics_row(metrics: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    """JSON-taugliche Kennzahlen eines Standorts (NaN -> None, Meter gerundet)."""
+    nearest = metrics["nearest_m"][i]
+    return {
+        "nearest_m": None if np.isnan(nearest) else int(round(nearest)),
+        "knn_m": [int(round(d)) for d in metrics["knn_m"][i] if not np.isnan(d)],
+        "pressure": round(float(metrics["pressure"][i]), 3),
+    }
+
+
+def site_metrics(point, stations) -> Dict[str, Any]:
+    """Kennzahlen für einen Standort (lon, lat)."""
+    return metrics_row(competition_metrics([point], stations), 0)
@@ -1,3 +1,45 @@
+import numpy as np
+
+# plausibility guards (very broad on purpose)
+DENSITY_RANGE = (300, 6000)   # Personen / km²
+AREA_RANGE = (1, 2000)        # km²
+
+
+def as_float_array(values) -> np.ndarray:
+    """None -> NaN, alles andere -> float64 (für fehlende Werte wie stations=None)."""
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return values.astype(np.float64, copy=False)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def compute_confidence_batch(area_km2, pop_density, stations, fallback_used=None) -> np.ndarray:
+    """
+    Vectorized compute_confidence() for many sites at once.
+    Missing values are None/NaN; fallback_used is a sequence of True/False/None
+    (only an explicit True downgrades, like the scalar version).
+    """
+    area = as_float_array(area_km2)
+    density = as_float_array(pop_density)
+    st = as_float_array(stations)
+
+    if fallback_used is None:
+        fallback = np.zeros(len(area), dtype=bool)
+    else:
+        fallback = np.array([f is True or f is np.True_ for f in fallback_used], dtype=bool)
+
+    missing = np.isnan(st) | np.isnan(area) | (area <= 0) | np.isnan(density)
+    implausible = (
+        (density < DENSITY_RANGE[0]) | (density > DENSITY_RANGE[1])
+        | (area < AREA_RANGE[0]) | (area > AREA_RANGE[1])
+    )
+
+    return np.select(
+        [missing, fallback, implausible],
+        ["LOW", "MEDIUM", "MEDIUM"],
+        default="HIGH",
+    ).astype(object)
+
+
 def compute_confidence(area_km2, pop_density, competition, geocode_meta=None) -> str:
     """
     VERY simple + transparent confidence:
@@ -8,20 +50,4 @@ def compute_confidence(area_km2, pop_density, competition, geocode_meta=None) ->
     stations = competition.get("stations")
     fallback_used = (geocode_meta or {}).get("fallback_used")
 
-    # hard failures / missing signals
-    if stations is None:
-        return "LOW"
-    if area_km2 is None or area_km2 <= 0 or pop_density is None:
-        return "LOW"
-
-    # conservative downgrade if fallback was needed
-    if fallback_used is True:
-        return "MEDIUM"
-
-    # plausibility guards (very broad on purpose)
-    if pop_density < 300 or pop_density > 6000:
-        return "MEDIUM"
-    if area_km2 < 1 or area_km2 > 2000:
-        return "MEDIUM"
-
-    return "HIGH"
+    return str(compute_confidence_batch([area_km2], [pop_density], [stations], [fallback_used])[0])
@@ -0,0 +1,339 @@
+"""
+Rohdaten-Speicher aller Analysen (Features statt Scores) für schnelles Nach-Scoren.
+
+Jede run_analysis() legt ihre Eingaben ab: Bevölkerung, Nachfrage, Ladepunkte, Fläche,
+Geocode-Meta und die Multi-Time/Sweep-Ringe. Gespeichert wird zweistufig:
+
+  pending.sqlite   Eingang, eine Zeile (JSON) je Analyse; WAL, mehrere Worker gleichzeitig
+  seg-*.npz        spaltenweise Segmente (compact()); Ringe als flache Arrays + Offsets
+
+rescore() lädt alle Segmente (+ Eingang) als Spalten und bewertet alles in zwei
+score_batch_scores()-Aufrufen neu (Basisring + alle Ringe), nur die Stabilität je
+Analyse läuft in Python. Damit sind geänderte Gewichte (ScoringConfig) für den
+gesamten Bestand in Sekunden sichtbar, ohne Geocoder/Isochronen/Overpass.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .scoring import DEFAULT_SCORING, ScoringConfig, decision_labels, score_batch_scores
+from .stability import compute_stability
+
+FEATURE_STORE = os.getenv("FEATURE_STORE", "1").strip().lower() in ("1", "true", "yes", "on")
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "app/data/features")
+PENDING_DB = "pending.sqlite"
+
+# Spalten je Analyse (Strings als numpy-Unicode, damit np.load ohne Pickle auskommt)
+STR_COLUMNS = ("id", "created_at", "address", "vertical", "curve", "osm_base", "geocode_meta", "decision")
+FLOAT_COLUMNS = ("lon", "lat", "area_km2", "population", "demand", "stations", "nearest_m", "pressure")
+INT_COLUMNS = ("minutes", "fallback_used", "score")   # fallback_used: 1/0, -1 = unbekannt
+RING_COLUMNS = ("ring_minutes", "ring_population", "ring_demand", "ring_stations")
+
+_INIT_LOCK = threading.Lock()
+_INITIALIZED: set = set()
+
+
+def _store_dir(path=None) -> Path:
+    return Path(path or FEATURE_STORE_DIR)
+
+
+def _conn(path=None) -> sqlite3.Connection:
+    d = _store_dir(path)
+    key = str(d.resolve())
+    if key not in _INITIALIZED:
+        with _INIT_LOCK:
+            d.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(d / PENDING_DB), timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS pending (seq INTEGER PRIMARY KEY, payload TEXT NOT NULL)")
+            conn.close()
+            _INITIALIZED.add(key)
+    conn = sqlite3.connect(str(d / PENDING_DB), timeout=10, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 10000")
+    return conn
+
+
+def _num(x) -> Optional[float]:
+    try:
+        return None if x is None else float(x)
+    except (TypeError, ValueError):
+        return None
+
+
+# -----------------------------
+# Schreiben
+# -----------------------------
+def analysis_record(req: Dict[str, Any], data: Dict[str, Any], point) -> Dict[str, Any]:
+    """Ein Datensatz aus Request (model_dump) und Ergebnis von score_features()."""
+    comp = data.get("competition") or {}
+    meta = data.get("geocode_meta") or {}
+    fallback = meta.get("fallback_used")
+    rings = [
+        [r.get("minutes"), _num(r.get("population")), _num(r.get("demand")), _num(r.get("stations"))]
+        for r in data.get("multi_results") or []
+    ]
+    return {
+        "id": uuid.uuid4().hex,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "address": req.get("address") or "",
+        "vertical": req.get("vertical") or "ev_charging",
+        "curve": "sweep" if req.get("minute_sweep") else ("multi" if rings else ""),
+        "osm_base": comp.get("osm_base") or "",
+        "geocode_meta": json.dumps(meta, ensure_ascii=False, sort_keys=True, default=str),
+        "decision": str(decision_labels([data.get("score") or 0])[0]),
+        "lon": _num(point[0]) if point else None,
+        "lat": _num(point[1]) if point else None,
+        "area_km2": _num(data.get("area_km2")),
+        "population": _num(data.get("population")),
+        "demand": _num(data.get("demand")),
+        "stations": _num(comp.get("stations")),
+        "nearest_m": _num(comp.get("nearest_m")),
+        "pressure": _num(comp.get("pressure")),
+        "minutes": int(data.get("minutes") or 0),
+        "fallback_used": -1 if fallback is None else int(bool(fallback)),
+        "score": int(data.get("score") or 0),
+        "rings": rings,
+    }
+
+
+def record_analysis(req: Dict[str, Any], data: Dict[str, Any], point, path=None) -> Optional[str]:
+    """Analyse in den Eingang schreiben (Fehler nur als Warnung – die Analyse selbst zählt)."""
+    if not FEATURE_STORE:
+        return None
+    try:
+        rec = analysis_record(req, data, point)
+        conn = _conn(path)
+        try:
+            conn.execute("INSERT INTO pending (payload) VALUES (?)", (json.dumps(rec, ensure_ascii=False),))
+        finally:
+            conn.close()
+        return rec["id"]
+    except Exception as e:
+        print("[WARN] feature store write failed:", e)
+        return None
+
+
+def _columns(records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    cols: Dict[str, np.ndarray] = {}
+    for c in STR_COLUMNS:
+        cols[c] = np.array([r.get(c) or "" for r in records], dtype=str)
+    for c in FLOAT_COLUMNS:
+        cols[c] = np.array([np.nan if r.get(c) is None else r[c] for r in records], dtype=np.float64)
+    for c in INT_COLUMNS:
+        cols[c] = np.array([r.get(c) or 0 for r in records], dtype=np.int32)
+    rings = [ring for r in records for ring in r.get("rings") or []]
+    counts = np.array([len(r.get("rings") or []) for r in records], dtype=np.int64)
+    cols["ring_offsets"] = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    ring_arr = np.array([[np.nan if v is None else v for v in ring] for ring in rings], dtype=np.float64).reshape(-1, 4)
+    cols["ring_minutes"] = ring_arr[:, 0].astype(np.int32)
+    for k, c in enumerate(RING_COLUMNS[1:], start=1):
+        cols[c] = ring_arr[:, k]
+    return cols
+
+
+def compact(path=None) -> Dict[str, Any]:
+    """Eingang -> neues npz-Segment (atomar: Segment schreiben, dann Zeilen löschen)."""
+    d = _store_dir(path)
+    conn = _conn(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")   # parallele compact()-Läufe serialisieren; Schreiber warten kurz
+        try:
+            rows = conn.execute("SELECT seq, payload FROM pending ORDER BY seq").fetchall()
+            if not rows:
+                conn.execute("ROLLBACK")
+                return {"compacted": 0, "segment": None}
+            last_seq = rows[-1][0]
+            cols = _columns([json.loads(p) for _, p in rows])
+            name = f"seg-{time.strftime('%Y%m%dT%H%M%S')}-{last_seq:010d}.npz"
+            tmp = d / (name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, **cols)
+            os.replace(tmp, d / name)
+            conn.execute("DELETE FROM pending WHERE seq <= ?", (last_seq,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {"compacted": len(rows), "segment": name}
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# Lesen
+# -----------------------------
+def _concat(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    if not parts:
+        return _columns([])
+    out = {}
+    for c in parts[0]:
+        if c == "ring_offsets":
+            shifted, base = [np.zeros(1, dtype=np.int64)], 0
+            for p in parts:
+                shifted.append(p[c][1:] + base)
+                base += int(p[c][-1])
+            out[c] = np.concatenate(shifted)
+        else:
+            out[c] = np.concatenate([p[c] for p in parts])
+    return out
+
+
+def load_columns(path=None, include_pending: bool = True) -> Dict[str, np.ndarray]:
+    """Alle Analysen als Spalten (Segmente in Schreibreihenfolge, danach der Eingang)."""
+    d = _store_dir(path)
+    parts = []
+    for seg in sorted(d.glob("seg-*.npz")):
+        with np.load(seg, allow_pickle=False) as z:
+            parts.append({k: z[k] for k in z.files})
+    if include_pending and (d / PENDING_DB).exists():
+        conn = _conn(path)
+        try:
+            rows = conn.execute("SELECT payload FROM pending ORDER BY seq").fetchall()
+        finally:
+            conn.close()
+        if rows:
+            parts.append(_columns([json.loads(p) for (p,) in rows]))
+    cols = _concat(parts)
+    # Abbruch zwischen Segment-Rename und DELETE hinterlässt Dubletten -> erste Kopie gilt
+    _, first = np.unique(cols["id"], return_index=True)
+    if len(first) < len(cols["id"]):
+        cols = _take(cols, np.sort(first))
+    return cols
+
+
+def _take(cols: Dict[str, np.ndarray], idx: np.ndarray) -> Dict[str, np.ndarray]:
+    """Teilmenge von Analysen (inkl. ihrer Ringe)."""
+    offsets = cols["ring_offsets"]
+    ring_idx = np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in idx]) if len(idx) else np.zeros(0, dtype=np.int64)
+    out = {c: v[idx] for c, v in cols.items() if c != "ring_offsets" and not c.startswith("ring_")}
+    out.update({c: cols[c][ring_idx.astype(np.int64)] for c in RING_COLUMNS})
+    out["ring_offsets"] = np.concatenate([[0], np.cumsum(np.diff(offsets)[idx])]).astype(np.int64)
+    return out
+
+
+def store_stats(path=None) -> Dict[str, Any]:
+    d = _store_dir(path)
+    cols = load_columns(path)
+    pending = 0
+    if (d / PENDING_DB).exists():
+        conn = _conn(path)
+        try:
+            pending = conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+        finally:
+            conn.close()
+    segments = sorted(d.glob("seg-*.npz"))
+    return {
+        "dir": str(d),
+        "analyses": int(len(cols["id"])),
+        "rings": int(len(cols["ring_minutes"])),
+        "pending": int(pending),
+        "segments": len(segments),
+        "segment_bytes": sum(s.stat().st_size for s in segments),
+        "first": str(np.sort(cols["created_at"])[0]) if len(cols["id"]) else None,
+        "last": str(np.sort(cols["created_at"])[-1]) if len(cols["id"]) else None,
+    }
+
+
+# -----------------------------
+# Nach-Scoren
+# -----------------------------
+def rescore(
+    cols: Dict[str, np.ndarray],
+    configs: Optional[Dict[str, ScoringConfig]] = None,
+    default: ScoringConfig = DEFAULT_SCORING,
+    with_stability: bool = True,
+) -> Dict[str, Any]:
+    """
+    Neue Scores/Entscheidungen (+ Stabilität) für alle Analysen in cols.
+    configs: Gewichte je Vertical (fehlende -> default).
+    """
+    n = len(cols["id"])
+    score = np.zeros(n, dtype=np.int64)
+    offsets = cols["ring_offsets"]
+    ring_owner = np.repeat(np.arange(n), np.diff(offsets))
+    ring_score = np.zeros(len(cols["ring_minutes"]), dtype=np.int64)
+
+    for vertical in np.unique(cols["vertical"]) if n else []:
+        cfg = (configs or {}).get(str(vertical), default)
+        sel = cols["vertical"] == vertical
+        score[sel] = score_batch_scores(
+            cols["population"][sel], cols["stations"][sel],
+            cols["demand"][sel] if cfg.use_demand else None, cfg,
+        )
+        rsel = sel[ring_owner]
+        ring_score[rsel] = score_batch_scores(
+            cols["ring_population"][rsel], cols["ring_stations"][rsel],
+            cols["ring_demand"][rsel] if cfg.use_demand else None, cfg,
+        )
+    # Multi-Time-Ringe ohne Bevölkerung sind fehlgeschlagen und zählten schon immer als 0
+    ring_score[np.isnan(cols["ring_population"])] = 0
+
+    stability = np.full(n, "", dtype=object)
+    if with_stability:
+        # Das Ampel-Label hängt nur von (Minuten, Scores) ab -> gleiche Kurven nur einmal auswerten
+        minutes, scores = cols["ring_minutes"].tolist(), ring_score.tolist()
+        labels: Dict[tuple, str] = {}
+        for i in np.flatnonzero(np.diff(offsets) >= 2):
+            a, b = int(offsets[i]), int(offsets[i + 1])
+            key = (tuple(minutes[a:b]), tuple(scores[a:b]))
+            if key not in labels:
+                st = compute_stability([{"minutes": mm, "score": sc} for mm, sc in zip(*key)])
+                labels[key] = st["label"] if st else ""
+            stability[i] = labels[key]
+
+    return {
+        "score": score,
+        "decision": decision_labels(score),
+        "ring_score": ring_score,
+        "stability": stability,
+    }
+
+
+def rescore_summary(cols: Dict[str, np.ndarray], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Vorher/Nachher: Entscheidungen, Wechsel (z.B. "GO->CHECK") und mittlere Score-Änderung."""
+    old_dec, new_dec = cols["decision"].astype(object), new["decision"]
+    changed = old_dec != new_dec
+    transitions: Dict[str, int] = {}
+    for a, b in zip(old_dec[changed], new_dec[changed]):
+        key = f"{a}->{b}"
+        transitions[key] = transitions.get(key, 0) + 1
+    delta = new["score"] - cols["score"]
+
+    def _counts(dec) -> Dict[str, int]:
+        labels, counts = np.unique(dec.astype(str), return_counts=True)
+        return {str(k): int(v) for k, v in zip(labels, counts)}
+
+    return {
+        "analyses": int(len(cols["id"])),
+        "decisions_before": _counts(old_dec) if len(old_dec) else {},
+        "decisions_after": _counts(new_dec) if len(new_dec) else {},
+        "changed": int(changed.sum()),
+        "transitions": dict(sorted(transitions.items(), key=lambda kv: -kv[1])),
+        "mean_score_delta": round(float(delta.mean()), 2) if len(delta) else 0.0,
+        "max_abs_score_delta": int(np.abs(delta).max()) if len(delta) else 0,
+    }
+
+
+def rescore_rows(cols: Dict[str, np.ndarray], new: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """Je Analyse eine flache Zeile (für CSV-Export)."""
+    for i in range(len(cols["id"])):
+        yield {
+            "id": cols["id"][i],
+            "created_at": cols["created_at"][i],
+            "address": cols["address"][i],
+            "vertical": cols["vertical"][i],
+            "minutes": int(cols["minutes"][i]),
+            "score_before": int(cols["score"][i]),
+            "score_after": int(new["score"][i]),
+            "decision_before": cols["decision"][i],
+            "decision_after": new["decision"][i],
+            "stability_after": new["stability"][i],
+        }
@@ -1,4 +1,6 @@
 from .geocode_cache import get_conn, init_cache
+from .metrics import cache_event, upstream
+from . import ratelimit
 import requests
 import re
 
@@ -6,6 +8,11 @@ URL = "https://nominatim.openstreetmap.org/search"
 HEADERS = {"User-Agent": "charging-location-intelligence"}
 
 def _query(q: str):
+    with upstream("nominatim"):
+        ratelimit.acquire("nominatim")
+        return _request(q)
+
+def _request(q: str):
     r = requests.get(
         URL,
         params={
@@ -31,6 +38,7 @@ def geocode(address: str):
             "SELECT lon, lat FROM geocode_cache WHERE address = ?",
             (cache_key,),
         ).fetchone()
+        cache_event("geocode", row is not None)
         if row:
             print("[GEOCODE CACHE HIT]", cache_key)
             return row[0], row[1]
@@ -48,3 +48,13 @@ def get_geocode_meta(address: str):
         "matched_query": row[0],
         "fallback_used": bool(row[1]) if row[1] is not None else None,
     }
+
+def get_cached_point(address: str):
+    """(lon, lat) aus dem Cache oder None – ohne Nominatim (Prewarm-Coverage)."""
+    init_cache()
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT lon, lat FROM geocode_cache WHERE address = ?",
+            (address.strip(),),
+        ).fetchone()
+    return (row[0], row[1]) if row else None
@@ -1,25 +1,283 @@
 import os
 import requests
+import numpy as np
+import pyproj
+import shapely
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Any, Callable, Dict, List, Union
+from shapely.geometry import shape
+
+from .metrics import cache_event, upstream
+from . import ratelimit
+from . import swr_cache
 
 ORS_URL = "https://api.openrouteservice.org/v2/isochrones/driving-car"
+ORS_MAX_RANGES = 10   # ORS-Limit pro Request
+
+# SWR-Cache je Ring (Straßennetz ändert sich langsam)
+ISOCHRONE_SOFT_TTL_S = float(os.getenv("ISOCHRONE_SOFT_TTL_S", str(7 * 24 * 3600)))
+ISOCHRONE_HARD_TTL_S = float(os.getenv("ISOCHRONE_HARD_TTL_S", str(90 * 24 * 3600)))
+
+# Vereinfachung für Analyse-Schritte (Meter, topologie-erhaltend); 0 = exakte Geometrie (Default),
+# > 0 ändert Population/Nachfrage/Ladepunkte gegenüber dem exakten Polygon geringfügig
+SIMPLIFY_TOLERANCE_M = float(os.getenv("ISOCHRONE_SIMPLIFY_M", "0"))
+_M_PER_DEG = 111_320.0
+
+
+@lru_cache(maxsize=None)
+def _to_web_mercator() -> pyproj.Transformer:
+    # lazy: Transformer-Aufbau erst bei der ersten Flächenberechnung
+    return pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+
+
+class Isochrone:
+    """
+    Einmal geparste Isochrone.
+
+    ORS-Isochronen haben oft tausende Stützpunkte; statt das GeoJSON in jedem
+    Schritt (Population, Wettbewerb, Fläche) neu zu parsen, hält das Objekt:
+      - geom:          exakte shapely-Geometrie (prepared)
+      - simplified:    topologie-erhaltend vereinfacht (SIMPLIFY_TOLERANCE_M, Default 0 = exakt), prepared
+      - analysis_geom: die Geometrie für Population/Wettbewerb (= geom, solange nicht vereinfacht)
+      - bounds / area_km2: gecacht
+    Dict-Zugriff (iso["features"]) bleibt für bestehenden Code erhalten.
+    """
+
+    def __init__(self, geojson: Dict[str, Any], tolerance_m: float | None = None):
+        self.geojson = geojson
+        self.tolerance_m = SIMPLIFY_TOLERANCE_M if tolerance_m is None else tolerance_m
+        self.geom = shape(geojson["features"][0]["geometry"])
+        shapely.prepare(self.geom)
+
+    def __getitem__(self, key):
+        return self.geojson[key]
+
+    def get(self, key, default=None):
+        return self.geojson.get(key, default)
 
-def build_isochrone(point, minutes=15):
+    @property
+    def properties(self) -> Dict[str, Any]:
+        return self.geojson["features"][0].get("properties") or {}
+
+    @cached_property
+    def simplified(self):
+        if self.tolerance_m <= 0:
+            return self.geom
+        # Längengrade auf Meter-Verhältnis stauchen, damit die Toleranz in beiden Richtungen gilt
+        _, miny, _, maxy = self.bounds
+        scale = np.array([np.cos(np.radians((miny + maxy) / 2.0)), 1.0])
+        geom = shapely.transform(self.geom, lambda c: c * scale)
+        geom = geom.simplify(self.tolerance_m / _M_PER_DEG, preserve_topology=True)
+        geom = shapely.transform(geom, lambda c: c / scale)
+        if geom.is_empty:
+            return self.geom
+        shapely.prepare(geom)
+        return geom
+
+    @property
+    def analysis_geom(self):
+        return self.simplified
+
+    @cached_property
+    def bounds(self):
+        return self.geom.bounds   # lon/lat: minx, miny, maxx, maxy
+
+    @cached_property
+    def area_km2(self) -> float:
+        geom_m = shapely.transform(
+            self.geom, lambda c: np.column_stack(_to_web_mercator().transform(c[:, 0], c[:, 1]))
+        )
+        return geom_m.area / 1_000_000.0
+
+
+IsochroneLike = Union[Isochrone, Dict[str, Any]]
+
+
+def as_isochrone(obj: IsochroneLike) -> Isochrone:
+    return obj if isinstance(obj, Isochrone) else Isochrone(obj)
+
+def ors_isochrones(point, minutes_list):
+    """Mehrere Ringe in EINEM ORS-Request (range-Liste, max. ORS_MAX_RANGES)."""
     api_key = os.environ.get("ORS_API_KEY")
     if not api_key:
         raise RuntimeError("Missing ORS_API_KEY env var. Set it before starting uvicorn.")
 
     lon, lat = point
-    body = {
-        "locations": [[lon, lat]],
-        "range": [minutes * 60],   # seconds
-        "attributes": ["area"]
+    ranges = sorted({int(m) * 60 for m in minutes_list})   # seconds
+    features = []
+    for i in range(0, len(ranges), ORS_MAX_RANGES):
+        body = {
+            "locations": [[lon, lat]],
+            "range": ranges[i:i + ORS_MAX_RANGES],
+            "attributes": ["area"]
+        }
+
+        with upstream("ors"):
+            ratelimit.acquire("ors")
+            r = requests.post(
+                ORS_URL,
+                json=body,
+                headers={"Authorization": api_key, "Content-Type": "application/json"},
+                timeout=30,
+            )
+            r.raise_for_status()
+            features.extend(r.json().get("features", []))
+
+    return {"type": "FeatureCollection", "features": features}  # <- GeoJSON FeatureCollection with 'features'
+
+def ors_isochrones_many(points, minutes_list):
+    return [ors_isochrones(p, minutes_list) for p in points]
+
+def local_isochrones(point, minutes_list):
+    # lazy: scipy + Graph nur laden, wenn der lokale Provider wirklich genutzt wird
+    from .routing import local_isochrones as _local
+    return _local(point, minutes_list)
+
+def local_isochrones_many(points, minutes_list):
+    from .routing import local_isochrones_many as _local_many
+    return _local_many(points, minutes_list)
+
+
+@dataclass(frozen=True)
+class IsochroneProvider:
+    key: str
+    label: str
+    build_multi: Callable[..., dict]   # (point, minutes_list) -> FeatureCollection, ein Feature pro Ring
+    build_many: Callable[..., list]    # (points, minutes_list) -> [FeatureCollection, ...]
+    cacheable: bool = False            # Ringe im SWR-Cache halten (lohnt nur bei externen Diensten)
+
+PROVIDERS: Dict[str, IsochroneProvider] = {
+    "ors": IsochroneProvider(
+        key="ors", label="OpenRouteService",
+        build_multi=ors_isochrones, build_many=ors_isochrones_many,
+        cacheable=True,
+    ),
+    "local": IsochroneProvider(
+        key="local", label="Local road graph (OSM)",
+        build_multi=local_isochrones, build_many=local_isochrones_many,
+    ),
+}
+
+def get_provider(name: str | None = None) -> IsochroneProvider:
+    key = (name or os.getenv("ISOCHRONE_PROVIDER", "ors")).strip().lower()
+    if key not in PROVIDERS:
+        raise ValueError(f"Unknown isochrone provider: {key} (available: {sorted(PROVIDERS)})")
+    return PROVIDERS[key]
+
+def split_rings(feature_collection, minutes_list) -> Dict[int, Isochrone]:
+    """Multi-Ring-FeatureCollection -> {minutes: Isochrone (genau ein Feature)}."""
+    by_seconds = {
+        int(round(float(f.get("properties", {}).get("value", 0)))): f
+        for f in feature_collection.get("features", [])
     }
+    out = {}
+    for m in minutes_list:
+        f = by_seconds.get(int(m) * 60)
+        if f is None:
+            raise RuntimeError(f"Isochrone provider returned no ring for {m} min.")
+        out[int(m)] = Isochrone({"type": "FeatureCollection", "features": [f]})
+    return out
+
+def ring_cache_key(provider_key: str, point, minutes: int) -> str:
+    lon, lat = point
+    return f"{provider_key}:{float(lon):.5f},{float(lat):.5f}:{int(minutes)}"
+
+def _fetch_ring_features(prov: IsochroneProvider, point, minutes_list) -> Dict[int, dict]:
+    rings = split_rings(prov.build_multi(point, minutes_list), minutes_list)
+    return {m: iso.geojson["features"][0] for m, iso in rings.items()}
 
-    r = requests.post(
-        ORS_URL,
-        json=body,
-        headers={"Authorization": api_key, "Content-Type": "application/json"},
-        timeout=30,
-    )
-    r.raise_for_status()
-    return r.json()  # <- GeoJSON FeatureCollection with 'features'
+def _store_rings(prov: IsochroneProvider, point, features: Dict[int, dict]) -> None:
+    for m, feature in features.items():
+        swr_cache.store("isochrone", ring_cache_key(prov.key, point, m), feature)
+
+def _cached_ring_features(prov: IsochroneProvider, point, minutes_list) -> Dict[int, dict]:
+    """
+    Ringe aus dem SWR-Cache: fehlende/abgelaufene werden in EINEM Provider-Aufruf
+    geholt, veraltete sofort geliefert und im Hintergrund erneuert.
+    """
+    entries = {m: swr_cache.lookup("isochrone", ring_cache_key(prov.key, point, m)) for m in minutes_list}
+    states = {m: swr_cache.classify(e, ISOCHRONE_SOFT_TTL_S, ISOCHRONE_HARD_TTL_S) for m, e in entries.items()}
+
+    features = {}
+    need, stale = [], []
+    for m, state in states.items():
+        cache_event("isochrone", state in ("fresh", "stale"), stale=state == "stale")
+        if state in ("fresh", "stale"):
+            features[m] = entries[m].value
+            if state == "stale":
+                stale.append(m)
+        else:
+            need.append(m)
+
+    if need:
+        try:
+            fetched = _fetch_ring_features(prov, point, need)
+        except Exception as e:
+            if any(entries[m] is None for m in need):
+                raise
+            print(f"[WARN] isochrone provider failed, serving expired cache entries: {e}")
+            fetched = {m: entries[m].value for m in need}
+        else:
+            _store_rings(prov, point, fetched)
+        features.update(fetched)
+
+    if stale:
+        refresh_key = ring_cache_key(prov.key, point, stale[0]) + "".join(f",{m}" for m in stale[1:])
+        swr_cache.refresh_async(
+            "isochrone", refresh_key,
+            lambda: _store_rings(prov, point, _fetch_ring_features(prov, point, stale)),
+        )
+    return features
+
+def build_isochrones(point, minutes_list: List[int], provider: str | None = None) -> Dict[int, Isochrone]:
+    """Alle Ringe eines Standorts in einem Provider-Aufruf (lokal: eine Graph-Traversierung)."""
+    minutes_list = sorted({int(m) for m in minutes_list})
+    prov = get_provider(provider)
+    if prov.cacheable and swr_cache.ENABLED:
+        features = _cached_ring_features(prov, point, minutes_list)
+        return {m: Isochrone({"type": "FeatureCollection", "features": [features[m]]}) for m in minutes_list}
+    fc = prov.build_multi(point, minutes_list)
+    return split_rings(fc, minutes_list)
+
+def build_isochrones_many(points, minutes_list: List[int], provider: str | None = None) -> List[Dict[int, Isochrone]]:
+    """Batch über viele Standorte (lokal: gemeinsame Traversierung je Origin-Gruppe)."""
+    minutes_list = sorted({int(m) for m in minutes_list})
+    prov = get_provider(provider)
+    if prov.cacheable and swr_cache.ENABLED:
+        # externe Provider rechnen ohnehin pro Standort -> Cache je Standort nutzen
+        return [build_isochrones(p, minutes_list, provider=prov.key) for p in points]
+    fcs = prov.build_many(points, minutes_list)
+    return [split_rings(fc, minutes_list) for fc in fcs]
+
+def build_isochrone(point, minutes=15, provider: str | None = None) -> Isochrone:
+    return build_isochrones(point, [minutes], provider=provider)[int(minutes)]
+
+def warm_isochrones(point, minutes_list: List[int], provider: str | None = None) -> Dict[int, Isochrone]:
+    """Prewarm: nicht frische Ringe synchron holen (statt Hintergrund-Refresh), alle Ringe liefern."""
+    minutes_list = sorted({int(m) for m in minutes_list})
+    prov = get_provider(provider)
+    if not (prov.cacheable and swr_cache.ENABLED):
+        return build_isochrones(point, minutes_list, provider=prov.key)
+    states = isochrone_coverage(point, minutes_list, provider=prov.key)
+    todo = [m for m in minutes_list if states[m] != "fresh"]
+    features = {}
+    if todo:
+        features = _fetch_ring_features(prov, point, todo)
+        _store_rings(prov, point, features)
+    for m in minutes_list:
+        if m not in features:
+            features[m] = swr_cache.lookup("isochrone", ring_cache_key(prov.key, point, m)).value
+    return {m: Isochrone({"type": "FeatureCollection", "features": [features[m]]}) for m in minutes_list}
+
+def isochrone_coverage(point, minutes_list: List[int], provider: str | None = None) -> Dict[int, str]:
+    """Cache-Zustand je Ring (fresh/stale/expired/missing; "uncached" bei lokalem Provider)."""
+    prov = get_provider(provider)
+    if not (prov.cacheable and swr_cache.ENABLED):
+        return {int(m): "uncached" for m in minutes_list}
+    return {
+        int(m): swr_cache.classify(
+            swr_cache.lookup("isochrone", ring_cache_key(prov.key, point, m)), ISOCHRONE_SOFT_TTL_S, ISOCHRONE_HARD_TTL_S,
+        )
+        for m in minutes_list
+    }
@@ -0,0 +1,192 @@
+"""
+Latenz-Instrumentierung (ohne Zusatzpaket).
+
+- stage(name):       misst eine Pipeline-Stufe (geocode, isochrone, population, ...)
+- upstream(name):    misst einen externen Aufruf (nominatim, ors, overpass) inkl. Ergebnis ok/error
+- cache_event(...):  zählt Cache-Treffer/-Fehlschläge
+- collect_timings(): sammelt alle Messungen des aktuellen Requests als `timings`-Block
+- render_prometheus(): Prometheus-Textformat für /metrics
+
+Die Werte gelten pro Prozess (bei mehreren uvicorn-Workern jeden Worker scrapen).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+METRIC_PREFIX = "charging"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Kumulative Buckets je Label-Kombination (wie prometheus_client)."""
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.doc = doc
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}   # labels -> [bucket_counts, count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, le in enumerate(self.buckets):
+                if value <= le:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for key, (counts, count, total) in items:
+            base = _labels(self.labelnames, key)
+            for le, c in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + (_fmt(le),))} {c}"
+            yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + ('+Inf',))} {count}"
+            yield f"{self.name}_sum{base} {_fmt(total)}"
+            yield f"{self.name}_count{base} {count}"
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str, ...]):
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.doc = doc
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+def _fmt(v: float) -> str:
+    v = float(v)
+    return str(int(v)) if v.is_integer() and abs(v) < 1e15 else repr(v)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+STAGE_SECONDS = Histogram("stage_seconds", "Dauer je Pipeline-Stufe in Sekunden.", ("stage",))
+UPSTREAM_SECONDS = Histogram("upstream_request_seconds", "Dauer externer Aufrufe in Sekunden.", ("upstream", "outcome"))
+CACHE_EVENTS = Counter("cache_events_total", "Cache-Treffer (hit/stale) und -Fehlschläge (miss).", ("cache", "result"))
+
+REGISTRY = [STAGE_SECONDS, UPSTREAM_SECONDS, CACHE_EVENTS]
+
+# Messungen des laufenden Requests (None = niemand sammelt)
+_TIMINGS: ContextVar[Optional[Dict[str, Any]]] = ContextVar("timings", default=None)
+
+
+def _new_timings() -> Dict[str, Any]:
+    return {"total_ms": 0.0, "stages": {}, "upstream": {}, "cache": {}}
+
+
+def _merge_timings(into: Dict[str, Any], part: Dict[str, Any]) -> None:
+    for name, ms in part["stages"].items():
+        into["stages"][name] = round(into["stages"].get(name, 0.0) + ms, 2)
+    for name, entry in part["upstream"].items():
+        target = into["upstream"].setdefault(name, {"calls": 0, "errors": 0, "ms": 0.0})
+        target["calls"] += entry["calls"]
+        target["errors"] += entry["errors"]
+        target["ms"] = round(target["ms"] + entry["ms"], 2)
+    for name, entry in part["cache"].items():
+        target = into["cache"].setdefault(name, {"hit": 0, "stale": 0, "miss": 0})
+        for result, n in entry.items():
+            target[result] += n
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, Any]]:
+    """
+    Sammelt alle stage()/upstream()/cache_event()-Messungen im aktuellen Kontext (Thread).
+    Verschachtelt (z.B. run_analysis je Compare-Zeile) fließen die Messungen zusätzlich
+    in den äußeren Block, der damit auch gebatchte Stufen außerhalb der Zeilen enthält.
+    """
+    parent = _TIMINGS.get()
+    timings = _new_timings()
+    token = _TIMINGS.set(timings)
+    t0 = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings["total_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+        _TIMINGS.reset(token)
+        if parent is not None:
+            _merge_timings(parent, timings)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, stage=name)
+        timings = _TIMINGS.get()
+        if timings is not None:
+            stages = timings["stages"]
+            stages[name] = round(stages.get(name, 0.0) + dt * 1000.0, 2)
+
+
+@contextmanager
+def upstream(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        UPSTREAM_SECONDS.observe(dt, upstream=name, outcome=outcome)
+        timings = _TIMINGS.get()
+        if timings is not None:
+            entry = timings["upstream"].setdefault(name, {"calls": 0, "errors": 0, "ms": 0.0})
+            entry["calls"] += 1
+            entry["errors"] += outcome == "error"
+            entry["ms"] = round(entry["ms"] + dt * 1000.0, 2)
+
+
+def cache_event(cache: str, hit: bool, stale: bool = False) -> None:
+    """stale=True: Treffer, aber veraltet (wird im Hintergrund erneuert)."""
+    result = ("stale" if stale else "hit") if hit else "miss"
+    CACHE_EVENTS.inc(cache=cache, result=result)
+    timings = _TIMINGS.get()
+    if timings is not None:
+        entry = timings["cache"].setdefault(cache, {"hit": 0, "stale": 0, "miss": 0})
+        entry[result] += 1
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,167 @@
+"""
+Mirror-Auswahl für redundante Upstreams (Overpass).
+
+Pro Mirror wird Gesundheit mitgeführt:
+  - Circuit Breaker: nach BREAKER_FAILURES Fehlern in Folge wird der Mirror
+    BREAKER_COOLDOWN_S lang übersprungen, danach ein Probe-Request (half-open)
+  - Latenz: EWMA für die Reihenfolge, p95 als Hedge-Verzögerung
+
+call_mirrors(urls, fn) probiert die Mirrors in dieser Reihenfolge. Mit Hedging
+startet der nächste Mirror bereits, wenn der aktuelle länger als seine p95
+braucht; das erste erfolgreiche Ergebnis gewinnt. (Der langsamere Request läuft
+bis zu seinem Timeout im Hintergrund weiter, requests lässt sich nicht abbrechen.)
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+BREAKER_FAILURES = int(os.getenv("MIRROR_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_S = float(os.getenv("MIRROR_BREAKER_COOLDOWN_S", "60"))
+HEDGE_ENABLED = os.getenv("MIRROR_HEDGE", "0").strip().lower() in ("1", "true", "yes", "on")
+HEDGE_DEFAULT_DELAY_S = float(os.getenv("MIRROR_HEDGE_DELAY_S", "2.0"))   # bis genug Messwerte da sind
+HEDGE_MIN_SAMPLES = 5
+LATENCY_WINDOW = 50
+EWMA_ALPHA = 0.3
+
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mirror-hedge")
+
+
+class MirrorHealth:
+    def __init__(self, url: str):
+        self.url = url
+        self.consecutive_failures = 0
+        self.open_until = 0.0          # > now: Circuit offen, Mirror wird übersprungen
+        self.ewma_s: Optional[float] = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record_success(self, latency_s: float) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+            self.latencies.append(latency_s)
+            self.ewma_s = latency_s if self.ewma_s is None else EWMA_ALPHA * latency_s + (1 - EWMA_ALPHA) * self.ewma_s
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= BREAKER_FAILURES:
+                self.open_until = time.monotonic() + BREAKER_COOLDOWN_S
+
+    def is_open(self, now: Optional[float] = None) -> bool:
+        return self.open_until > (time.monotonic() if now is None else now)
+
+    def p95_s(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            return float(np.percentile(np.fromiter(self.latencies, dtype=np.float64), 95))
+
+    def snapshot(self) -> Dict:
+        return {
+            "url": self.url,
+            "state": "open" if self.is_open() else "closed",
+            "consecutive_failures": self.consecutive_failures,
+            "ewma_s": None if self.ewma_s is None else round(self.ewma_s, 3),
+            "p95_s": self.p95_s(),
+        }
+
+
+_HEALTH: Dict[str, MirrorHealth] = {}
+_HEALTH_LOCK = threading.Lock()
+
+
+def health(url: str) -> MirrorHealth:
+    with _HEALTH_LOCK:
+        h = _HEALTH.get(url)
+        if h is None:
+            h = _HEALTH[url] = MirrorHealth(url)
+        return h
+
+
+def mirror_status(urls: List[str]) -> List[Dict]:
+    return [health(u).snapshot() for u in urls]
+
+
+def ordered_mirrors(urls: List[str]) -> List[str]:
+    """
+    Geschlossene Mirrors nach EWMA-Latenz (unbekannt zuerst in Konfig-Reihenfolge,
+    damit neue Mirrors gemessen werden). Sind alle offen, werden sie trotzdem
+    versucht (frühestes Cooldown-Ende zuerst), statt sofort zu scheitern.
+    """
+    now = time.monotonic()
+    closed = [u for u in urls if not health(u).is_open(now)]
+    if not closed:
+        return sorted(urls, key=lambda u: health(u).open_until)
+
+    def key(item):
+        pos, url = item
+        ewma = health(url).ewma_s
+        return (ewma is not None, ewma or 0.0, pos)
+
+    return [u for _, u in sorted(enumerate(closed), key=key)]
+
+
+def _attempt(url: str, fn: Callable[[str], T]) -> T:
+    t0 = time.perf_counter()
+    try:
+        result = fn(url)
+    except Exception:
+        health(url).record_failure()
+        raise
+    health(url).record_success(time.perf_counter() - t0)
+    return result
+
+
+def call_mirrors(urls: List[str], fn: Callable[[str], T], hedge: Optional[bool] = None) -> T:
+    """
+    fn(url) -> Ergebnis (wirft bei Fehler). Gibt das erste erfolgreiche Ergebnis zurück,
+    sonst RuntimeError mit dem letzten Fehler.
+    """
+    order = ordered_mirrors(list(urls))
+    hedge = HEDGE_ENABLED if hedge is None else hedge
+    if not hedge or len(order) < 2:
+        last_err = None
+        for url in order:
+            try:
+                return _attempt(url, fn)
+            except Exception as e:
+                last_err = f"{url}: {e}"
+        raise RuntimeError(str(last_err))
+    return _call_hedged(order, fn)
+
+
+def _call_hedged(order: List[str], fn: Callable[[str], T]) -> T:
+    pending = {}
+    last_err = None
+    queue = list(order)
+
+    def launch():
+        url = queue.pop(0)
+        # Kontext mitgeben, damit metrics.collect_timings() auch Hedge-Requests sieht
+        ctx = contextvars.copy_context()
+        pending[_HEDGE_POOL.submit(ctx.run, _attempt, url, fn)] = url
+        return url
+
+    current = launch()
+    while pending:
+        # nächster Mirror startet nach der p95 des aktuellen (oder sofort, wenn er scheitert)
+        delay = health(current).p95_s() or HEDGE_DEFAULT_DELAY_S
+        done, _ = wait(list(pending), timeout=delay if queue else None, return_when=FIRST_COMPLETED)
+        for fut in done:
+            url = pending.pop(fut)
+            try:
+                return fut.result()
+            except Exception as e:
+                last_err = f"{url}: {e}"
+        if queue:   # Hedge-Verzögerung abgelaufen oder Fehlschlag -> nächster Mirror
+            current = launch()
+    raise RuntimeError(str(last_err))
@@ -0,0 +1,331 @@
+"""
+Analyse-Pipeline in zwei Stufen:
+
+  1) extract_features()  Vertical-unabhängig: Geocoding, Isochronen, Bevölkerung/Nachfrage
+                         und Wettbewerb je Ring (+ Minuten-Sweep). Teuer, erzeugt die
+                         Upstream-Last; Ergebnis im Prozess gecacht (FEATURE_CACHE_*).
+  2) score_features()    Score, Entscheidung, Confidence, Stabilität, Unsicherheit für
+                         EIN Vertical (Gewichte aus VerticalConfig.scoring). Reine CPU-Arbeit.
+
+score_matrix() bewertet dieselben Features für alle Verticals x Fahrprofile; neue
+Verticals brauchen damit keine zusätzlichen Upstream-Aufrufe.
+"""
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .competition import STATION_SOURCE, charging_competition
+from .confidence import compute_confidence
+from .geocode import geocode
+from .geocode_cache import get_geocode_meta
+from .interpretation import interpret_score
+from .isochrone import as_isochrone, build_isochrone, build_isochrones, get_provider
+from .metrics import cache_event, stage
+from .population import DEMAND_DECAY_M, population_and_demand
+from .scoring import decision_label, score_location
+from .stability import compute_stability
+from .sweep import score_sweep, sweep_features
+from .uncertainty import score_uncertainty
+from .verticals import PROFILE_MINUTES, VERTICALS, VerticalConfig
+
+MULTI_TIME_MINUTES = [10, 15, 20]
+
+FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", "512"))
+FEATURE_CACHE_TTL_S = float(os.getenv("FEATURE_CACHE_TTL_S", "600"))
+
+
+@dataclass
+class RingFeatures:
+    minutes: int
+    area_km2: Optional[float] = None
+    population: Optional[int] = None
+    demand: Optional[int] = None
+    competition: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def density(self) -> Optional[float]:
+        if self.population is None or not self.area_km2:
+            return None
+        return self.population / self.area_km2
+
+    def row(self) -> Dict[str, Any]:
+        """Multi-Time-Zeile ohne Score (Form wie sweep_features())."""
+        comp = self.competition or {}
+        return {
+            "minutes": self.minutes,
+            "population": self.population,
+            "demand": self.demand,
+            "stations": comp.get("stations"),
+            "density": comp.get("density", "unknown"),
+            "osm_base": comp.get("osm_base"),
+            "queried_at": comp.get("queried_at"),
+            "error": self.error or comp.get("error"),
+        }
+
+
+@dataclass
+class SiteFeatures:
+    address: str
+    point: Tuple[float, float]
+    geocode_meta: Optional[Dict[str, Any]]
+    rings: Dict[int, RingFeatures]
+    sweep: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def complete(self) -> bool:
+        """Ohne Fehler (nur vollständige Features werden gecacht)."""
+        return all(r.error is None and not (r.competition or {}).get("error") for r in self.rings.values()) and not any(
+            row.get("error") for row in self.sweep or []
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# -----------------------------
+# Feature-Cache (LRU + TTL, pro Prozess)
+# -----------------------------
+class _FeatureCache:
+    def __init__(self, size: int, ttl_s: float):
+        self.size = size
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[tuple, Tuple[float, SiteFeatures]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[SiteFeatures]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if time.monotonic() - item[0] > self.ttl_s:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+        return copy.deepcopy(item[1])   # Aufrufer dürfen das Ergebnis verändern
+
+    def put(self, key, features: SiteFeatures) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic(), copy.deepcopy(features))
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_CACHE = _FeatureCache(FEATURE_CACHE_SIZE, FEATURE_CACHE_TTL_S)
+
+
+def _feature_key(address: str, minutes: int, multi_minutes, sweep_minutes) -> tuple:
+    return (
+        " ".join(address.lower().split()),
+        int(minutes), tuple(sorted(multi_minutes)), tuple(sorted(sweep_minutes)),
+        get_provider().key, STATION_SOURCE, DEMAND_DECAY_M,
+    )
+
+
+# -----------------------------
+# Stufe 1: Features
+# -----------------------------
+def safe_competition(isochrone, point=None) -> Dict[str, Any]:
+    try:
+        return charging_competition(isochrone, point)
+    except Exception as e:
+        return {
+            "stations": None,
+            "density": "unknown",
+            "osm_base": None,
+            "queried_at": None,
+            "error": str(e),
+        }
+
+
+def ring_features(point, isochrone, minutes: int, with_metrics: bool = False) -> RingFeatures:
+    iso = as_isochrone(isochrone)
+    population, demand = population_and_demand(iso, point)
+    return RingFeatures(
+        minutes=int(minutes),
+        area_km2=iso.area_km2,
+        population=population,
+        demand=demand,
+        competition=safe_competition(iso, point if with_metrics else None),
+    )
+
+
+def extract_features(
+    address: str,
+    minutes: int,
+    multi_minutes: Sequence[int] = (),
+    sweep_minutes: Sequence[int] = (),
+    point=None,
+    isochrones: Optional[Dict[int, Any]] = None,
+) -> SiteFeatures:
+    """
+    Alle Vertical-unabhängigen Eingaben eines Standorts.
+    point / isochrones können vorab (gebatcht) berechnet übergeben werden.
+    Der Basis-Ring muss gelingen; Multi-Time-Ringe dürfen einzeln scheitern.
+    """
+    key = _feature_key(address, minutes, multi_minutes, sweep_minutes)
+    cached = _CACHE.get(key)
+    cache_event("features", cached is not None)
+    if cached is not None:
+        return cached
+
+    if point is None:
+        with stage("geocode"):
+            point = geocode(address)
+    geocode_meta = get_geocode_meta(address)
+
+    wanted = sorted({int(minutes), *multi_minutes, *sweep_minutes})
+    if isochrones is None:
+        with stage("isochrone"):
+            try:
+                isochrones = build_isochrones(point, wanted)
+            except Exception:
+                if wanted == [int(minutes)]:
+                    raise
+                isochrones = build_isochrones(point, [minutes])
+
+    iso = as_isochrone(isochrones[minutes])
+    with stage("population"):
+        area_km2 = iso.area_km2
+        population, demand = population_and_demand(iso, point)
+    with stage("competition"):
+        competition = safe_competition(iso, point)
+    rings = {int(minutes): RingFeatures(int(minutes), area_km2, population, demand, competition)}
+
+    sweep = None
+    if multi_minutes or sweep_minutes:
+        with stage("multi_time"):
+            for m in multi_minutes:
+                if m in rings:
+                    continue
+                try:
+                    rings[m] = ring_features(point, isochrones.get(m) or build_isochrone(point, minutes=m), m)
+                except Exception as e:
+                    rings[m] = RingFeatures(m, error=f"multi-time failed for {m}min: {e}")
+            if sweep_minutes:
+                available = {m: isochrones[m] for m in sweep_minutes if m in isochrones}
+                sweep = sweep_features(point, available) if len(available) > 1 else []
+
+    features = SiteFeatures(address, tuple(point), geocode_meta, rings, sweep)
+    if features.complete:
+        _CACHE.put(key, features)
+    return features
+
+
+# -----------------------------
+# Stufe 2: Scoring je Vertical
+# -----------------------------
+def _score_ring(ring: RingFeatures, cfg: VerticalConfig) -> int:
+    demand = ring.demand if cfg.scoring.use_demand else None
+    return score_location(ring.population, ring.competition or {}, demand, cfg.scoring)
+
+
+def multi_time_rows(features: SiteFeatures, cfg: VerticalConfig, minutes_list: Iterable[int] = MULTI_TIME_MINUTES) -> List[Dict]:
+    rows = []
+    for m in minutes_list:
+        ring = features.rings.get(m)
+        if ring is None or ring.error is not None:
+            rows.append({**RingFeatures(m).row(), "density": "unknown", "score": 0,
+                         "error": ring.error if ring else f"multi-time failed for {m}min: ring missing"})
+            continue
+        rows.append({**ring.row(), "score": _score_ring(ring, cfg)})
+    return rows
+
+
+def score_features(
+    features: SiteFeatures,
+    minutes: int,
+    cfg: VerticalConfig,
+    multi_time: bool = False,
+    minute_sweep: bool = False,
+    uncertainty: bool = False,
+) -> Dict[str, Any]:
+    """Bewertung eines Standorts für ein Vertical (Felder wie in run_analysis())."""
+    ring = features.rings[minutes]
+    competition = ring.competition or {}
+    density = ring.density
+
+    confidence = compute_confidence(ring.area_km2, density, competition, features.geocode_meta)
+    score = _score_ring(ring, cfg)
+    explanation = interpret_score(score, ring.population, competition, minutes)
+
+    multi_results = stability_pack = stability = None
+    if multi_time:
+        from .report import compute_customer_stability
+        if minute_sweep:
+            multi_results = score_sweep(features.sweep or [], cfg.scoring)
+        else:
+            multi_results = multi_time_rows(features, cfg)
+        stability_pack = compute_customer_stability(multi_results, baseline_minutes=15, far_minutes=20)
+        stability = compute_stability(multi_results) if multi_results else None
+
+    unc = None
+    if uncertainty:
+        with stage("uncertainty"):
+            unc = score_uncertainty(
+                ring.population, competition.get("stations"), minutes,
+                demand=ring.demand if cfg.scoring.use_demand else None,
+                multi_results=multi_results,
+                geocode_meta=features.geocode_meta,
+                osm_base=competition.get("osm_base"),
+                as_of=competition.get("queried_at"),
+                cfg=cfg.scoring,
+            )
+
+    return {
+        "minutes": minutes,
+        "geocode_meta": features.geocode_meta,
+        "area_km2": ring.area_km2,
+        "population": ring.population,
+        "demand": ring.demand,
+        "density": density,
+        "competition": competition,
+        "confidence": confidence,
+        "score": score,
+        "explanation": explanation,
+        "multi_results": multi_results,
+        "stability_pack": stability_pack,
+        "stability": stability,
+        "uncertainty": unc,
+    }
+
+
+def score_matrix(
+    features: SiteFeatures,
+    verticals: Optional[Iterable[str]] = None,
+    profiles: Optional[Iterable[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Score/Entscheidung für alle Verticals x Fahrprofile aus denselben Features."""
+    out = []
+    for v in verticals or VERTICALS:
+        cfg = VERTICALS[v]
+        for p in profiles or PROFILE_MINUTES:
+            m = PROFILE_MINUTES[p]
+            ring = features.rings.get(m)
+            if ring is None or ring.error is not None:
+                out.append({"vertical": v, "profile": p, "minutes": m, "score": None, "decision": None,
+                            "confidence": None, "error": ring.error if ring else "ring missing"})
+                continue
+            score = _score_ring(ring, cfg)
+            out.append({
+                "vertical": v,
+                "profile": p,
+                "minutes": m,
+                "score": score,
+                "decision": decision_label(score),
+                "confidence": compute_confidence(ring.area_km2, ring.density, ring.competition or {}, features.geocode_meta),
+                "stations": (ring.competition or {}).get("stations"),
+                "population": ring.population,
+            })
+    return out
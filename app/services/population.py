@@ -1,63 +1,133 @@
 import os
-import geopandas as gpd
-from shapely.geometry import shape
+from functools import lru_cache
+import numpy as np
+import pyproj
+import shapely
 
-DATA_GPKG = "app/data/population_grid.gpkg"
+from .isochrone import as_isochrone
+
+DATA_GPKG = os.getenv("POPULATION_GPKG", "app/data/population_grid.gpkg")
 LAYER_NAME = "population"   # so wie du es bei gdal_polygonize angegeben hast
 POP_COL = "pop"             # so wie du es bei gdal_polygonize angegeben hast
+METRIC_CRS = "EPSG:3857"    # Flächenverhältnisse (wie bisher)
+DISTANCE_CRS = "EPSG:3035"  # Distanzen Standort -> Zelle (längentreu in Europa)
+
+# Nachfrage: Personen werden mit exp(-d / DEMAND_DECAY_M) zur Distanz Standort -> Zellmitte gewichtet
+DEMAND_DECAY_M = float(os.getenv("DEMAND_DECAY_M", "5000"))
 
 # Cache: Grid nur einmal laden (schneller)
 _GRID = None
+_CELL_AREA = None   # Zellflächen in METRIC_CRS (m²), gleiche Reihenfolge wie _GRID
+_CELL_XY = None     # Zellmittelpunkte in DISTANCE_CRS (n, 2)
 
 def _load_grid():
     global _GRID
     if _GRID is None:
         if not os.path.exists(DATA_GPKG):
             raise FileNotFoundError(f"Missing {DATA_GPKG}. Did you create it with gdal_polygonize.py?")
-        _GRID = gpd.read_file(DATA_GPKG, layer=LAYER_NAME)
-        if _GRID.crs is None:
+        import geopandas as gpd   # lazy: geopandas/pandas erst beim ersten Laden (Cold Start)
+        grid = gpd.read_file(DATA_GPKG, layer=LAYER_NAME)
+        if grid.crs is None:
             raise ValueError("Population grid has no CRS. Please ensure the GPKG has a CRS.")
+        if POP_COL not in grid.columns:
+            raise KeyError(f"Column '{POP_COL}' not found. Available columns: {list(grid.columns)}")
+        _GRID = grid.reset_index(drop=True)
     return _GRID
 
-def population_in_area(isochrone_geojson) -> int:
-    iso_geom = shape(isochrone_geojson["features"][0]["geometry"])
-    iso = gpd.GeoDataFrame([{"geometry": iso_geom}], crs="EPSG:4326")
+def _cell_areas():
+    global _CELL_AREA
+    if _CELL_AREA is None:
+        _CELL_AREA = _load_grid().geometry.to_crs(METRIC_CRS).area.to_numpy()
+    return _CELL_AREA
+
+def _cell_xy():
+    global _CELL_XY
+    if _CELL_XY is None:
+        c = _load_grid().geometry.to_crs(DISTANCE_CRS).centroid
+        _CELL_XY = np.column_stack([c.x.to_numpy(), c.y.to_numpy()])
+    return _CELL_XY
+
+@lru_cache(maxsize=None)
+def _to_distance_crs() -> pyproj.Transformer:
+    return pyproj.Transformer.from_crs("EPSG:4326", DISTANCE_CRS, always_xy=True)
+
+def _cell_parts(geoms):
+    """
+    Kandidatenzellen aus dem räumlichen Index, Überlappung vektorisiert:
+    Rückgabe (iso_idx, cell_idx, Personen je Paar) – flächenanteilig gewichtet.
+    """
+    import geopandas as gpd
 
     grid = _load_grid()
+    isos = gpd.GeoSeries(geoms, crs="EPSG:4326")
 
     # CRS angleichen
-    if grid.crs != iso.crs:
-        iso = iso.to_crs(grid.crs)
+    if grid.crs != isos.crs:
+        isos = isos.to_crs(grid.crs)
+
+    # Schnell vorfiltern (Spatial Index)
+    iso_idx, cell_idx = grid.sindex.query(isos.values, predicate="intersects")
+    if len(cell_idx) == 0:
+        return iso_idx, cell_idx, np.zeros(0, dtype=np.float64)
 
-    # Schnell vorfiltern
-    iso_poly = iso.geometry.iloc[0]
-    cand = grid[grid.intersects(iso_poly)].copy()
-    if cand.empty:
-        return 0
+    # Zellen komplett innerhalb zählen voll, nur Randzellen brauchen eine Intersection
+    shapely.prepare(isos.values)
+    inside = shapely.contains(isos.values[iso_idx], grid.geometry.values[cell_idx])
+    edge = ~inside
 
-    # Exakte Überlappung (Intersection)
-    inter = gpd.overlay(cand, iso, how="intersection")
+    # Exakte Überlappung (Intersection) der Randzellen, Flächen metrisch
+    inter = shapely.intersection(grid.geometry.values[cell_idx[edge]], isos.values[iso_idx[edge]])
+    inter_area = gpd.GeoSeries(inter, crs=grid.crs).to_crs(METRIC_CRS).area.to_numpy()
 
     # Bei polygonize entspricht "pop" dem Pixelwert (Personen pro Pixel)
     # Für verlässliche Summen: proportional nach Fläche gewichten
-    metric = "EPSG:3857"
-    cand_m = cand.to_crs(metric)
-    inter_m = inter.to_crs(metric)
+    share = np.ones(len(cell_idx), dtype=np.float64)
+    share[edge] = inter_area / _cell_areas()[cell_idx[edge]]
+    pop_part = grid[POP_COL].to_numpy(dtype=np.float64)[cell_idx] * share
+    return iso_idx, cell_idx, pop_part
+
+def population_in_areas(geometries) -> np.ndarray:
+    """
+    Batch-Variante: Bevölkerung für viele Polygone (EPSG:4326) in einem Durchlauf.
+    Kandidatenzellen kommen aus dem räumlichen Index, die Überlappung wird
+    vektorisiert berechnet und flächenanteilig gewichtet.
+    """
+    geoms = list(geometries)
+    if not geoms:
+        return np.zeros(0, dtype=np.int64)
+    iso_idx, _, pop_part = _cell_parts(geoms)
+    totals = np.bincount(iso_idx, weights=pop_part, minlength=len(geoms))
+    return np.rint(totals).astype(np.int64)
 
-    # stabiler cell_id Ansatz
-    cand = cand.reset_index(drop=True)
-    cand["cell_id"] = cand.index
-    inter = gpd.overlay(cand, iso, how="intersection")
-    cand_m = cand.to_crs(metric)
-    inter_m = inter.to_crs(metric)
+def population_and_demand_in_areas(geometries, sites, decay_m: float = DEMAND_DECAY_M, rounded: bool = True):
+    """
+    Wie population_in_areas(), zusätzlich distanzgewichtete Nachfrage je Standort:
+    Σ Personen · exp(-d / decay_m), d = Luftlinie Standort (lon, lat) -> Zellmitte.
+    Gleiche Kandidatenzellen, nur ein zusätzlicher Gather + exp je Paar.
+    Rückgabe: (population int64[], demand int64[]); rounded=False -> float64 (zum Aufsummieren)
+    """
+    geoms = list(geometries)
+    if not geoms:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    iso_idx, cell_idx, pop_part = _cell_parts(geoms)
 
-    cell_area = cand_m.set_index("cell_id").geometry.area.to_dict()
-    inter_m["cell_area"] = inter_m["cell_id"].map(cell_area)
-    inter_m["inter_area"] = inter_m.geometry.area
+    pts = np.asarray(sites, dtype=np.float64).reshape(-1, 2)
+    sx, sy = _to_distance_crs().transform(pts[:, 0], pts[:, 1])
+    cells = _cell_xy()[cell_idx]
+    dist = np.hypot(cells[:, 0] - np.asarray(sx)[iso_idx], cells[:, 1] - np.asarray(sy)[iso_idx])
 
-    if POP_COL not in inter_m.columns:
-        raise KeyError(f"Column '{POP_COL}' not found. Available columns: {list(inter_m.columns)}")
+    population = np.bincount(iso_idx, weights=pop_part, minlength=len(geoms))
+    demand = np.bincount(iso_idx, weights=pop_part * np.exp(-dist / decay_m), minlength=len(geoms))
+    if not rounded:
+        return population, demand
+    return np.rint(population).astype(np.int64), np.rint(demand).astype(np.int64)
 
-    inter_m["pop_part"] = inter_m[POP_COL] * (inter_m["inter_area"] / inter_m["cell_area"])
+def population_in_area(isochrone) -> int:
+    iso = as_isochrone(isochrone)
+    return int(population_in_areas([iso.analysis_geom])[0])
 
-    return int(round(float(inter_m["pop_part"].sum())))
+def population_and_demand(isochrone, point):
+    """(Bevölkerung, distanzgewichtete Nachfrage) für eine Isochrone um point (lon, lat)."""
+    iso = as_isochrone(isochrone)
+    population, demand = population_and_demand_in_areas([iso.analysis_geom], [point])
+    return int(population[0]), int(demand[0])
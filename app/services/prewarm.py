@@ -0,0 +1,172 @@
+"""
+Prewarm der Upstream-Caches für bekannte Kandidaten, damit Kundenanfragen dort
+vollständig aus dem Cache bedient werden.
+
+  Adresse / Koordinate  Geocoding (geocode_cache), Isochronen aller Fahrprofile
+                        (PROFILE_MINUTES) + Multi-Time-Ringe (+ optional Minuten-Sweep),
+                        Ladepunkt-Kacheln über alle Ringe
+  Region (BBox/Polygon) Ladepunkt-Kacheln der Region. Isochronen sind je Standort
+                        gecacht und lassen sich nur über Adressen/Koordinaten vorwärmen.
+
+Nicht frische Einträge (fehlend, veraltet, abgelaufen) werden synchron erneuert.
+Tempo: PREWARM_RATE Standorte bzw. Kachel-Abfragen pro Sekunde, zusätzlich gelten die
+Upstream-Limits aus services/ratelimit.py. coverage() zählt Cache-Zustände ohne Upstream.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .competition import STATION_SOURCE, competition_bbox, stations_coverage, warm_stations
+from .geocode import geocode
+from .geocode_cache import get_cached_point
+from .isochrone import build_isochrones, get_provider, isochrone_coverage, ring_cache_key, warm_isochrones
+from .pipeline import MULTI_TIME_MINUTES
+from .ratelimit import TokenBucket
+from .sweep import sweep_minutes
+from .verticals import PROFILE_MINUTES
+from . import swr_cache
+
+PREWARM_RATE = float(os.getenv("PREWARM_RATE", "0.5"))
+
+
+@dataclass
+class Target:
+    """Adresse oder Koordinate (lon, lat)."""
+    address: Optional[str] = None
+    point: Optional[Tuple[float, float]] = None
+
+    @property
+    def label(self) -> str:
+        return self.address if self.address is not None else f"{self.point[0]:.5f},{self.point[1]:.5f}"
+
+
+def prewarm_minutes(sweep: bool = False) -> List[int]:
+    minutes = set(PROFILE_MINUTES.values()) | set(MULTI_TIME_MINUTES)
+    if sweep:
+        minutes |= set(sweep_minutes())
+    return sorted(minutes)
+
+
+def _rings_bounds(rings, point) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) über alle Ringe inkl. Kennzahlen-Radius – wie charging_competition()."""
+    bounds = [competition_bbox(r, point) for r in rings]
+    return (min(b[0] for b in bounds), min(b[1] for b in bounds),
+            max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+
+def _cached_rings(point, minutes: List[int]):
+    """Ringe ohne Upstream: aus dem Cache (externer Provider) bzw. lokal gerechnet; sonst None."""
+    prov = get_provider()
+    if not (prov.cacheable and swr_cache.ENABLED):
+        return list(build_isochrones(point, minutes).values())
+    rings = []
+    for m in minutes:
+        entry = swr_cache.lookup("isochrone", ring_cache_key(prov.key, point, m))
+        if entry is None:
+            return None
+        rings.append({"type": "FeatureCollection", "features": [entry.value]})
+    return rings
+
+
+def _add(counts: Dict[str, int], key: str, n: int = 1) -> None:
+    counts[key] = counts.get(key, 0) + n
+
+
+def coverage(targets: List[Target], regions: List[Any], minutes: List[int]) -> Dict[str, Any]:
+    """
+    Cache-Zustände: geocode (cached/missing), isochrone je Ring und stations je Kachel
+    (fresh/stale/expired/missing; "unknown", solange die Ringe eines Standorts fehlen).
+    """
+    geo: Dict[str, int] = {}
+    iso: Dict[str, int] = {}
+    st: Dict[str, int] = {}
+    for t in targets:
+        point = t.point
+        if t.address is not None:
+            point = get_cached_point(t.address)
+            _add(geo, "cached" if point else "missing")
+        if point is None:
+            _add(iso, "missing", len(minutes))
+            continue
+        for state in isochrone_coverage(point, minutes).values():
+            _add(iso, state)
+        if STATION_SOURCE == "local":   # lokaler Index braucht keinen Cache
+            continue
+        rings = _cached_rings(point, minutes)
+        if rings is None:
+            _add(st, "unknown")
+            continue
+        for state, n in stations_coverage(*_rings_bounds(rings, point)).items():
+            _add(st, state, n)
+    for region in regions if STATION_SOURCE != "local" else []:
+        minx, miny, maxx, maxy = region.bounds
+        for state, n in stations_coverage(miny, minx, maxy, maxx, geometry=region).items():
+            _add(st, state, n)
+    return {"geocode": geo, "isochrone": iso, "stations": st}
+
+
+def _pct(counts: Dict[str, int], good=("fresh", "cached", "uncached")) -> Optional[float]:
+    total = sum(counts.values())
+    return round(100.0 * sum(counts.get(k, 0) for k in good) / total, 1) if total else None
+
+
+def warm_target(target: Target, minutes: List[int]) -> Dict[str, Any]:
+    point = target.point or geocode(target.address)
+    rings = warm_isochrones(point, minutes)
+    out: Dict[str, Any] = {"point": list(point), "rings": len(rings)}
+    if STATION_SOURCE != "local":   # lokaler Index braucht keinen Cache
+        out["stations"] = warm_stations(*_rings_bounds(rings.values(), point))
+    return out
+
+
+def prewarm(
+    targets: List[Target],
+    regions: List[Any],
+    minutes: List[int],
+    rate: float = PREWARM_RATE,
+    report_only: bool = False,
+    progress: Optional[Callable[[int, int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Alle Ziele nacheinander vorwärmen (höchstens `rate` Standorte/Kachel-Abfragen pro Sekunde).
+    Rückgabe: Coverage vorher/nachher, Fehler je Ziel, Dauer.
+    """
+    t0 = time.perf_counter()
+    before = coverage(targets, regions, minutes)
+    failed: List[Dict[str, str]] = []
+    if not report_only:
+        bucket = TokenBucket(rate) if rate > 0 else None
+        throttle = bucket.acquire if bucket is not None else None
+        total = len(targets) + len(regions)
+        for k, target in enumerate(targets, start=1):
+            if throttle:
+                throttle()
+            try:
+                warm_target(target, minutes)
+            except Exception as e:
+                failed.append({"target": target.label, "error": f"{type(e).__name__}: {e}"})
+            if progress:
+                progress(k, total, len(failed))
+        if STATION_SOURCE != "local":
+            for k, region in enumerate(regions, start=len(targets) + 1):
+                minx, miny, maxx, maxy = region.bounds
+                try:
+                    warm_stations(miny, minx, maxy, maxx, geometry=region, throttle=throttle)
+                except Exception as e:
+                    failed.append({"target": f"region {region.bounds}", "error": f"{type(e).__name__}: {e}"})
+                if progress:
+                    progress(k, total, len(failed))
+    after = before if report_only else coverage(targets, regions, minutes)
+
+    return {
+        "targets": len(targets),
+        "regions": len(regions),
+        "minutes": minutes,
+        "swr_cache": swr_cache.ENABLED,
+        "before": before,
+        "after": after,
+        "coverage_pct": {k: _pct(v) for k, v in after.items()},
+        "failed": failed,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
@@ -0,0 +1,123 @@
+"""
+Sampling-Profiler für einzelne Requests (nur Standardbibliothek).
+
+Ein Hintergrund-Thread liest alle PROFILE_INTERVAL_MS die Stack-Frames des
+Request-Threads (sys._current_frames) und zählt sie als "folded stacks":
+
+    main.analyze (main.py:612);main.run_analysis (main.py:286);... 17
+
+Das Format versteht flamegraph.pl, speedscope.app und inferno direkt.
+Kosten: ein Stack-Walk pro Intervall, der Request selbst läuft unverändert.
+PDF-Rendering im Prozess-Pool taucht nur als Warten auf das Future auf.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(Path(__file__).resolve().parents[2] / "reports" / "_profiles")))
+PROFILE_INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0
+PROFILE_MAX_S = float(os.getenv("PROFILE_MAX_S", "300"))   # Sampler stoppt spätestens danach
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id: Optional[int] = None, interval_s: float = PROFILE_INTERVAL_S):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval_s = max(0.001, interval_s)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration_s = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + PROFILE_MAX_S
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+            if time.monotonic() > deadline:
+                break
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration_s = time.perf_counter() - self.started_at
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+@contextmanager
+def profile_block(enabled: bool = True) -> Iterator[Optional[SamplingProfiler]]:
+    """Profilt den umschlossenen Block im aktuellen Thread (enabled=False -> None, kein Overhead)."""
+    if not enabled:
+        yield None
+        return
+    profiler = SamplingProfiler().start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def save_profile(profiler: SamplingProfiler, label: str = "") -> str:
+    """Legt das Profil als <id>.folded ab und gibt die id zurück."""
+    profile_id = uuid.uuid4().hex
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    header = (
+        f"# {label} samples={profiler.samples} interval_ms={profiler.interval_s * 1000:.1f} "
+        f"duration_s={profiler.duration_s:.3f}\n"
+    )
+    (PROFILE_DIR / f"{profile_id}.folded").write_text(header + profiler.folded(), encoding="utf-8")
+    return profile_id
+
+
+def profile_summary(profiler: SamplingProfiler, profile_id: str) -> dict:
+    return {
+        "id": profile_id,
+        "samples": profiler.samples,
+        "interval_ms": round(profiler.interval_s * 1000, 2),
+        "duration_s": round(profiler.duration_s, 3),
+        "url": f"/profiles/{profile_id}",
+    }
+
+
+def load_profile(profile_id: str) -> Optional[str]:
+    if not PROFILE_ID_RE.match(profile_id or ""):
+        return None
+    path = PROFILE_DIR / f"{profile_id}.folded"
+    if not path.exists():
+        return None
+    # Kommentarzeile entfernen: flamegraph.pl erwartet nur "stack count"-Zeilen
+    return "".join(line for line in path.read_text(encoding="utf-8").splitlines(keepends=True) if not line.startswith("#"))
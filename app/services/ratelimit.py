@@ -0,0 +1,80 @@
+"""
+Ratenbegrenzung je Upstream (Token-Bucket, pro Prozess, thread-sicher).
+
+UPSTREAM_RATE_LIMITS="nominatim=1,ors=0.33,overpass=2"  (Aufrufe pro Sekunde, 0/leer = unbegrenzt)
+Default: nominatim=1 (Nutzungsrichtlinie von nominatim.openstreetmap.org).
+
+acquire(name) wartet, bis der nächste Aufruf erlaubt ist; Aufruf direkt vor dem
+Request (innerhalb von metrics.upstream(), damit Wartezeit als Upstream-Latenz zählt).
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+UPSTREAM_RATE_LIMITS = os.getenv("UPSTREAM_RATE_LIMITS", "nominatim=1")
+RATE_BURST = float(os.getenv("UPSTREAM_RATE_BURST", "1"))   # Aufrufe ohne Wartezeit nach Leerlauf
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = RATE_BURST):
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Einen Aufruf reservieren; gibt die gewartete Zeit (s) zurück."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def parse_limits(spec: str) -> Dict[str, float]:
+    """"nominatim=1, ors=0.5" -> {"nominatim": 1.0, "ors": 0.5}"""
+    out: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            out[name.strip().lower()] = float(value)
+        except ValueError:
+            print(f"[WARN] ignoring invalid rate limit {part.strip()!r}")
+    return out
+
+
+_LOCK = threading.Lock()
+_BUCKETS: Dict[str, Optional[TokenBucket]] = {}
+_LIMITS = parse_limits(UPSTREAM_RATE_LIMITS)
+
+
+def set_limit(name: str, rate: Optional[float]) -> None:
+    """Limit zur Laufzeit setzen (z.B. CLI-Optionen); None/0 = unbegrenzt."""
+    with _LOCK:
+        _LIMITS[name.lower()] = float(rate or 0)
+        _BUCKETS.pop(name.lower(), None)
+
+
+def limits() -> Dict[str, float]:
+    with _LOCK:
+        return {k: v for k, v in _LIMITS.items() if v > 0}
+
+
+def acquire(name: str) -> float:
+    key = name.lower()
+    bucket = _BUCKETS.get(key)
+    if bucket is None and key not in _BUCKETS:
+        with _LOCK:
+            if key not in _BUCKETS:
+                rate = _LIMITS.get(key, 0.0)
+                _BUCKETS[key] = TokenBucket(rate) if rate > 0 else None
+            bucket = _BUCKETS[key]
+    return bucket.acquire() if bucket is not None else 0.0
@@ -0,0 +1,120 @@
+"""
+PDF-Render-Service.
+
+ReportLab ist reine CPU-Arbeit und hält das GIL. Damit API-Threads nicht
+blockiert werden, rendert ein Prozess-Pool in einen In-Memory-Buffer; die
+Bytes werden an den Client gestreamt und gleichzeitig im Reports-Ordner
+abgelegt (tmp-Datei + atomarer Rename am Ende).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+from .metrics import stage
+
+RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))   # 0 = im Request-Thread rendern
+RENDER_TIMEOUT_S = float(os.getenv("PDF_RENDER_TIMEOUT_S", "120"))
+STREAM_CHUNK = 64 * 1024
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn statt fork: der API-Prozess ist multi-threaded
+            _POOL = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=get_context("spawn"))
+        return _POOL
+
+
+def _reset_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+def shutdown() -> None:
+    _reset_pool()
+
+
+def _render_pdf_bytes(inputs: Dict) -> bytes:
+    # lazy: reportlab wird erst im Worker bzw. beim ersten Inline-Render importiert
+    from .report import render_pdf_bytes
+    return render_pdf_bytes(inputs)
+
+
+def _ping() -> int:
+    from . import report  # noqa: F401  (Styles/Fonts im Worker vorladen)
+    return os.getpid()
+
+
+def warm_pool() -> int:
+    """Startet die Render-Worker vorab (inkl. reportlab-Import); gibt die Anzahl Worker-PIDs zurück."""
+    if RENDER_WORKERS <= 0:
+        _ping()
+        return 0
+    pool = _pool()
+    futures = [pool.submit(_ping) for _ in range(RENDER_WORKERS)]
+    return len({f.result(timeout=RENDER_TIMEOUT_S) for f in futures})
+
+
+def _render_in_pool(inputs: Dict) -> bytes:
+    if RENDER_WORKERS <= 0:
+        return _render_pdf_bytes(inputs)
+    try:
+        return _pool().submit(_render_pdf_bytes, inputs).result(timeout=RENDER_TIMEOUT_S)
+    except BrokenProcessPool:
+        # Worker abgestürzt (z.B. OOM) -> Pool neu aufsetzen, einmal wiederholen
+        _reset_pool()
+        return _pool().submit(_render_pdf_bytes, inputs).result(timeout=RENDER_TIMEOUT_S)
+
+
+def render_pdf(inputs: Dict) -> bytes:
+    """Render-Cache, sonst Prozess-Pool. inputs = report_inputs(...) / compare_report_inputs(...)."""
+    from .report import render_pdf_cached
+    with stage("pdf_render"):
+        return render_pdf_cached(inputs, render=_render_in_pool)
+
+
+def stream_and_persist(
+    data: bytes,
+    path,
+    on_persisted: Optional[Callable[[], None]] = None,
+) -> Iterator[bytes]:
+    """
+    Liefert die PDF-Bytes in Chunks und schreibt dieselben Chunks parallel nach `path`.
+    Bricht der Client ab, wird die Datei trotzdem vollständig geschrieben.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+
+    written = 0
+    persisted = False
+    try:
+        with open(tmp, "wb") as f:
+            try:
+                for start in range(0, len(data), STREAM_CHUNK):
+                    chunk = data[start:start + STREAM_CHUNK]
+                    f.write(chunk)
+                    written = start + len(chunk)
+                    yield chunk
+            finally:
+                if written < len(data):
+                    f.write(data[written:])
+                persisted = True
+    finally:
+        if persisted:
+            os.replace(tmp, path)
+            if on_persisted is not None:
+                on_persisted()
+        else:
+            tmp.unlink(missing_ok=True)
@@ -1,13 +1,25 @@
+import io
+import os
+import json
+import hashlib
+import threading
+
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER
 
+import copy
+from functools import lru_cache
 from typing import Dict, List, Optional
 from reportlab.lib.colors import HexColor
 
+from .scoring import decision_label as _decision_label, GO_THRESHOLD, CHECK_THRESHOLD
+from .metrics import cache_event
+from .stability import curve_summary
+
 # --- Theme (modern dark, not too dark) ---
 PAGE_BG   = HexColor("#12121A")
 CARD_BG   = HexColor("#1A1A24")
@@ -34,6 +46,7 @@ def _draw_page_bg(canvas, doc):
     canvas.restoreState()
 
 
+@lru_cache(maxsize=None)
 def card_table_style(bg=CARD_BG, border=BORDER, pad=10):
     return TableStyle([
         ("BACKGROUND", (0,0), (-1,-1), bg),
@@ -46,6 +59,195 @@ def card_table_style(bg=CARD_BG, border=BORDER, pad=10):
         ("VALIGN", (0,0), (-1,-1), "TOP"),
     ])
 
+# -----------------------------
+# Styles (einmal pro Prozess statt pro Render)
+# -----------------------------
+_SAMPLE = getSampleStyleSheet()
+
+H1 = ParagraphStyle(
+    "H1", parent=_SAMPLE["Heading1"],
+    fontName="Helvetica-Bold", fontSize=22, leading=26,
+    textColor=TEXT, spaceAfter=6
+)
+H2 = ParagraphStyle(
+    "H2", parent=_SAMPLE["Heading2"],
+    fontName="Helvetica-Bold", fontSize=12.5, leading=16,
+    textColor=TEXT, spaceBefore=10, spaceAfter=6
+)
+BODY = ParagraphStyle(
+    "BODY", parent=_SAMPLE["BodyText"],
+    fontName="Helvetica", fontSize=10.8, leading=15,
+    textColor=TEXT
+)
+MUTED = ParagraphStyle("MUTED", parent=BODY, textColor=MUTED_TXT)
+SMALL = ParagraphStyle("SMALL", parent=BODY, fontSize=9.6, leading=13, textColor=MUTED_TXT)
+CENTER = ParagraphStyle("CENTER", parent=BODY, alignment=TA_CENTER)
+
+CHIP = ParagraphStyle("chip", parent=CENTER, textColor=colors.white, fontSize=9.5, leading=11)
+BANNER_LABEL = ParagraphStyle("b1", parent=BODY, textColor=MUTED_TXT, fontSize=9)
+BANNER_SCORE = ParagraphStyle("b2", parent=BODY, fontName="Helvetica-Bold", fontSize=30, leading=32, textColor=TEXT)
+KPI_MIX = ParagraphStyle("KPI_MIX", parent=CENTER, leading=18)
+KPI_HEADER = ParagraphStyle("KM", parent=BODY, textColor=MUTED_TXT, fontName="Helvetica-Bold", fontSize=9)
+
+KPI_TABLE_STYLE = TableStyle([
+    ("SPAN", (0,0), (-1,0)),
+    ("BACKGROUND", (0,0), (-1,0), CARD_BG_2),
+    ("TEXTCOLOR", (0,0), (-1,0), MUTED_TXT),
+    ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+    ("FONTSIZE", (0,0), (-1,0), 9),
+    ("ALIGN", (0,0), (-1,0), "LEFT"),
+    ("LEFTPADDING", (0,0), (-1,0), 12),
+    ("TOPPADDING", (0,0), (-1,0), 10),
+    ("BOTTOMPADDING", (0,0), (-1,0), 8),
+
+    ("BACKGROUND", (0,1), (-1,-1), CARD_BG),
+    ("TEXTCOLOR", (0,1), (-1,-1), TEXT),
+
+    ("BOX", (0,0), (-1,-1), 1, BORDER),
+    ("INNERGRID", (0,0), (-1,-1), 0, BORDER),
+
+    ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+    ("LEFTPADDING", (0,1), (-1,-1), 12),
+    ("RIGHTPADDING", (0,1), (-1,-1), 12),
+    ("TOPPADDING", (0,1), (-1,-1), 14),
+    ("BOTTOMPADDING", (0,1), (-1,-1), 14),
+])
+
+COMPARE_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0,0), (-1,0), CARD_BG_2),
+    ("TEXTCOLOR", (0,0), (-1,0), TEXT),
+    ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+    ("BACKGROUND", (0,1), (-1,-1), CARD_BG),
+    ("TEXTCOLOR", (0,1), (-1,-1), TEXT),
+    ("BOX", (0,0), (-1,-1), 1, BORDER),
+    ("INNERGRID", (0,0), (-1,-1), 0, BORDER),
+    ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+    ("ALIGN", (0,0), (0,-1), "CENTER"),
+    ("ALIGN", (2,0), (-1,-1), "CENTER"),
+    ("LEFTPADDING", (0,0), (-1,-1), 8),
+    ("RIGHTPADDING", (0,0), (-1,-1), 8),
+    ("TOPPADDING", (0,0), (-1,-1), 6),
+    ("BOTTOMPADDING", (0,0), (-1,-1), 6),
+])
+
+MULTI_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0,0), (-1,0), CARD_BG_2),
+    ("TEXTCOLOR", (0,0), (-1,0), TEXT),
+    ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+    ("BACKGROUND", (0,1), (-1,-1), CARD_BG),
+    ("TEXTCOLOR", (0,1), (-1,-1), TEXT),
+    ("BOX", (0,0), (-1,-1), 1, BORDER),
+    ("INNERGRID", (0,0), (-1,-1), 0, BORDER),
+    ("ALIGN", (0,0), (-1,-1), "CENTER"),
+])
+
+
+@lru_cache(maxsize=None)
+def _ampel_table_style(color_hex: str) -> TableStyle:
+    return TableStyle([
+        ("BOX", (0, 0), (-1, -1), 1, BORDER),
+        ("BACKGROUND", (0, 0), (0, 0), colors.HexColor(color_hex)),
+        ("TEXTCOLOR", (0, 0), (0, 0), colors.white),
+        ("LEFTPADDING", (0, 0), (-1, -1), 8),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+        ("TOPPADDING", (0, 0), (-1, -1), 7),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 7),
+    ])
+
+
+# Statische Flowables: Markup einmal parsen, pro Render nur eine flache Kopie
+# (wrap() setzt Layout-Attribute auf der Kopie -> thread-safe).
+_STATIC_FLOWABLES = {
+    "kpi_header": Paragraph("KEY METRICS", KPI_HEADER),
+    "banner_label": Paragraph("<b>RESULT</b>", BANNER_LABEL),
+    "next_steps_title": Paragraph("Empfehlung (nächste Schritte)", H2),
+    "next_steps": Paragraph(
+        "• Netzanschluss & Leistungsprüfung<br/>"
+        "• Flächenverfügbarkeit vor Ort<br/>"
+        "• Genehmigungsfähigkeit prüfen<br/>"
+        "• Betreiber- und Partnerauswahl",
+        BODY,
+    ),
+    "why_title": Paragraph("Warum diese Entscheidung?", H2),
+    "details_title": Paragraph("Begründung & Details", H1),
+    "summary_title": Paragraph("Executive Summary", H2),
+    "note_title": Paragraph("Hinweis", H2),
+    "note": Paragraph(
+        "Die Analyse basiert auf öffentlich verfügbaren Daten (OSM, WorldPop) "
+        "und ersetzt keine technische oder rechtliche Vor-Ort-Prüfung.",
+        SMALL,
+    ),
+    "multi_title": Paragraph("Multi-Time Vergleich", H1),
+    "multi_sub": Paragraph("Wie robust ist der Standort bei unterschiedlichen Fahrzeiten?", MUTED),
+    "compare_title": Paragraph("Location Comparison", H1),
+    "compare_sub": Paragraph("Ranked results for the selected locations.", MUTED),
+    "compare_details_title": Paragraph("Location Details", H2),
+    "title": Paragraph("Charging Location Check", H1),
+    "subtitle": Paragraph("Professionelle Standortbewertung für Ladeinfrastruktur", MUTED),
+}
+
+
+def _static(name: str):
+    return copy.copy(_STATIC_FLOWABLES[name])
+
+
+# Große Tabellen in Blöcke fester Größe teilen: ReportLab re-wrapped beim
+# Seitenumbruch den gesamten Rest einer Tabelle (superlinear); Blöcke halten
+# den Aufwand pro Seite konstant -> Renderzeit wächst linear mit der Zeilenzahl.
+TABLE_CHUNK_ROWS = 30
+
+
+def _chunked_tables(header, rows, colWidths, style=None, chunk_rows=TABLE_CHUNK_ROWS):
+    """rows: beliebiges Iterable (wird blockweise konsumiert). Jeder Block = LongTable mit Kopfzeile."""
+    style = style or COMPARE_TABLE_STYLE
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield _long_table(header, chunk, colWidths, style)
+            chunk = []
+    if chunk:
+        yield _long_table(header, chunk, colWidths, style)
+
+
+def _long_table(header, rows, colWidths, style):
+    t = LongTable([header] + rows, colWidths=colWidths, repeatRows=1)
+    t.setStyle(style)
+    return t
+
+
+def _curve_chart(curve: Dict, width=162 * mm, height=55 * mm):
+    """Score über Fahrzeit (Minuten-Sweep) mit CHECK-/GO-Schwelle als Linien."""
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.graphics.shapes import Drawing
+
+    mins, scores = curve["minutes"], curve["scores"]
+    lo, hi = mins[0], mins[-1]
+
+    plot = LinePlot()
+    plot.x, plot.y = 10 * mm, 8 * mm
+    plot.width, plot.height = width - 14 * mm, height - 12 * mm
+    plot.data = [
+        list(zip(mins, scores)),
+        [(lo, CHECK_THRESHOLD), (hi, CHECK_THRESHOLD)],
+        [(lo, GO_THRESHOLD), (hi, GO_THRESHOLD)],
+    ]
+    plot.lines[0].strokeColor, plot.lines[0].strokeWidth = ACCENT, 2
+    plot.lines[1].strokeColor, plot.lines[1].strokeDashArray = HexColor("#FFCC00"), (3, 3)
+    plot.lines[2].strokeColor, plot.lines[2].strokeDashArray = HexColor("#34C759"), (3, 3)
+    plot.xValueAxis.valueMin, plot.xValueAxis.valueMax = lo, hi
+    plot.xValueAxis.valueStep = 5 if hi - lo > 10 else 1
+    plot.yValueAxis.valueMin, plot.yValueAxis.valueMax, plot.yValueAxis.valueStep = 0, 100, 25
+    for axis in (plot.xValueAxis, plot.yValueAxis):
+        axis.labels.fillColor = MUTED_TXT
+        axis.labels.fontSize = 8
+        axis.strokeColor = BORDER
+
+    drawing = Drawing(width, height)
+    drawing.add(plot)
+    return drawing
+
+
 def _i(x, default=0) -> int:
     try:
         return int(x)
@@ -53,15 +255,6 @@ def _i(x, default=0) -> int:
         return default
 
 
-def _decision_label(score: int) -> str:
-    score = _i(score, 0)
-    if score >= 70:
-        return "GO"
-    if score >= 50:
-        return "CHECK"
-    return "NO-GO"
-
-
 def _ampel_from_swing(min_score_ok: bool, swing: int) -> Dict[str, str]:
     """
     Ampel-Logik nur für Kernbereich (z.B. 15→20):
@@ -228,6 +421,25 @@ def _safe(s, default="unbekannt"):
     return s if (s is not None and str(s).strip() != "") else default
 
 
+def _uncertainty_band(u: Optional[Dict]) -> str:
+    if not u:
+        return "-"
+    p = u.get("percentiles") or {}
+    return f"{p.get('p5')}–{p.get('p95')} ({round(100 * float(u.get('flip_probability') or 0))} %)"
+
+
+def _uncertainty_text(u: Dict) -> str:
+    p = u.get("percentiles") or {}
+    probs = u.get("decision_probabilities") or {}
+    return (
+        f"<b>Unsicherheit</b> ({_fmt_int(u.get('draws'))} Szenarien): Score <b>{p.get('p5')}–{p.get('p95')}</b>/100 "
+        f"(90-%-Band, Median {p.get('p50')}). Wahrscheinlichkeit einer anderen Entscheidung: "
+        f"<b>{round(100 * float(u.get('flip_probability') or 0))} %</b> "
+        f"<font size=9>(GO {round(100 * probs.get('GO', 0))} % · CHECK {round(100 * probs.get('CHECK', 0))} % · "
+        f"NO-GO {round(100 * probs.get('NO-GO', 0))} %)</font>"
+    )
+
+
 def _confidence_explain(conf: str) -> str:
     conf = (conf or "").upper()
     if conf == "HIGH":
@@ -244,8 +456,106 @@ def _confidence_explain(conf: str) -> str:
 # -----------------------------
 from pathlib import Path  # oben in der Datei ergänzen
 
+# -----------------------------
+# Render-Cache (Content-Hash -> fertige PDF-Bytes)
+# -----------------------------
+RENDER_CACHE_DIR = Path(os.getenv(
+    "PDF_RENDER_CACHE_DIR",
+    str(Path(__file__).resolve().parents[2] / "reports" / "_render_cache"),
+))
+RENDER_CACHE_MAX_FILES = int(os.getenv("PDF_RENDER_CACHE_MAX_FILES", "500"))
+
+# Layout-Änderungen in dieser Datei invalidieren den Cache automatisch
+_TEMPLATE_HASH = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+
+def render_cache_key(kind: str, **inputs) -> str:
+    payload = json.dumps(
+        {"kind": kind, "template": _TEMPLATE_HASH, "inputs": inputs},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_file(key: str) -> Path:
+    return RENDER_CACHE_DIR / f"{key}.pdf"
+
+
+def render_cache_get(key: str) -> Optional[bytes]:
+    p = _cache_file(key)
+    try:
+        data = p.read_bytes()
+    except FileNotFoundError:
+        return None
+    os.utime(p)  # LRU: zuletzt benutzt
+    return data
+
+
+def render_cache_put(key: str, data: bytes) -> None:
+    write_pdf_atomic(_cache_file(key), data)
+
+    files = []
+    for f in RENDER_CACHE_DIR.glob("*.pdf"):
+        try:
+            files.append((f.stat().st_mtime, f))
+        except FileNotFoundError:
+            continue
+    files.sort()
+    for _, old in files[:max(0, len(files) - RENDER_CACHE_MAX_FILES)]:
+        old.unlink(missing_ok=True)
+
+
+def report_inputs(
+    address,
+    score,
+    text,
+    population,
+    competition,
+    minutes,
+    multi_results=None,
+    confidence=None,
+    geocode_meta=None,
+    stability=None,
+    compare_results=None,
+    demand=None,
+    uncertainty=None,
+) -> Dict:
+    """Alle Render-Eingaben als (picklebares) Dict – für Cache-Key und Render-Worker."""
+    return dict(
+        address=address, score=score, text=text, population=population,
+        competition=competition, minutes=minutes, multi_results=multi_results,
+        confidence=confidence, geocode_meta=geocode_meta, stability=stability,
+        compare_results=compare_results, demand=demand, uncertainty=uncertainty,
+    )
+
+
+def render_pdf_bytes(inputs: Dict) -> bytes:
+    """Rendert in einen In-Memory-Buffer (ohne Cache, reine CPU-Arbeit)."""
+    buf = io.BytesIO()
+    _render_pdf(buf, **inputs)
+    return buf.getvalue()
+
+
+def render_pdf_cached(inputs: Dict, render=render_pdf_bytes) -> bytes:
+    """Cache-Lookup, sonst render(inputs) und Ergebnis ablegen."""
+    key = render_cache_key("report", **inputs)
+    cached = render_cache_get(key)
+    cache_event("pdf_render", cached is not None)
+    if cached is not None:
+        return cached
+    data = render(inputs)
+    render_cache_put(key, data)
+    return data
+
+
+def write_pdf_atomic(path, data: bytes) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
 
-    
 def build_pdf(
     path,
     address,
@@ -258,13 +568,44 @@ def build_pdf(
     confidence=None,
     geocode_meta=None,
     stability=None,
-    compare_results=None,   # ✅ NEU
+    compare_results=None,
+    demand=None,
+    uncertainty=None,
 ):
-    path = Path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
+    """
+    Rendert den Report nach `path`. Identische Eingaben (gleiche Zahlen, Texte,
+    Datenstände) werden aus dem Render-Cache bedient, ohne ReportLab erneut laufen zu lassen.
+    """
+    data = render_pdf_cached(report_inputs(
+        address, score, text, population, competition, minutes,
+        multi_results=multi_results, confidence=confidence, geocode_meta=geocode_meta,
+        stability=stability, compare_results=compare_results, demand=demand,
+        uncertainty=uncertainty,
+    ))
+    write_pdf_atomic(path, data)
+    if not Path(path).exists():
+        raise RuntimeError(f"PDF was not created: {path}")
+
 
+def _render_pdf(
+    target,
+    address,
+    score,
+    text,
+    population,
+    competition,
+    minutes,
+    multi_results=None,
+    confidence=None,
+    geocode_meta=None,
+    stability=None,
+    compare_results=None,   # ✅ NEU
+    demand=None,
+    uncertainty=None,
+):
+    # target: Dateipfad oder file-like (BytesIO)
     doc = SimpleDocTemplate(
-        str(path),
+        str(target) if isinstance(target, (str, Path)) else target,
         pagesize=A4,
         leftMargin=18 * mm,
         rightMargin=18 * mm,
@@ -273,51 +614,6 @@ def build_pdf(
         title="Charging Location Check",
     )
 
-    styles = getSampleStyleSheet()
-
-    H1 = ParagraphStyle(
-    "H1", parent=styles["Heading1"],
-    fontName="Helvetica-Bold", fontSize=22, leading=26,
-    textColor=TEXT, spaceAfter=6
-)
-    H2 = ParagraphStyle(
-    "H2", parent=styles["Heading2"],
-    fontName="Helvetica-Bold", fontSize=12.5, leading=16,
-    textColor=TEXT, spaceBefore=10, spaceAfter=6
-)
-    BODY = ParagraphStyle(
-    "BODY", parent=styles["BodyText"],
-    fontName="Helvetica", fontSize=10.8, leading=15,
-    textColor=TEXT
-)
-    MUTED = ParagraphStyle("MUTED", parent=BODY, textColor=MUTED_TXT)
-    SMALL = ParagraphStyle("SMALL", parent=BODY, fontSize=9.6, leading=13, textColor=MUTED_TXT)
-    CENTER = ParagraphStyle("CENTER", parent=BODY, alignment=TA_CENTER)
-
-    KPI_TITLE = ParagraphStyle(
-    "KPI_TITLE", parent=CENTER,
-    fontName="Helvetica-Bold",
-    fontSize=11.5,
-    leading=14,
-    textColor=TEXT
-)
-
-    KPI_VALUE = ParagraphStyle(
-    "KPI_VALUE", parent=CENTER,
-    fontName="Helvetica-Bold",
-    fontSize=26,          # <- “knackiger”
-    leading=28,           # <- Zeilenabstand für die Zahl
-    textColor=TEXT
-)
-
-    KPI_SUB = ParagraphStyle(
-    "KPI_SUB", parent=CENTER,
-    fontName="Helvetica",
-    fontSize=10.5,
-    leading=14,           # <- mehr Luft unter der Zahl
-    textColor=MUTED_TXT
-)
-
     score_int = max(0, min(_i(score, 0), 100))
     decision = _decision_long(score_int)
     decision_color = _badge_color(score_int)
@@ -347,8 +643,8 @@ def build_pdf(
     # Page 1: Executive
     # -----------------------------
    
-    story.append(Paragraph("Charging Location Check", H1))
-    story.append(Paragraph("Professionelle Standortbewertung für Ladeinfrastruktur", MUTED))
+    story.append(_static("title"))
+    story.append(_static("subtitle"))
     story.append(Spacer(1, 6))
 
     meta_tbl = Table(
@@ -363,23 +659,15 @@ def build_pdf(
     story.append(meta_tbl)
     story.append(Spacer(1, 10))
 
-    chip_style = ParagraphStyle(
-        "chip", parent=CENTER,
-        textColor=colors.white, fontSize=9.5, leading=11
-    )
-
     chip = Paragraph(
         f'<font backcolor="#{decision_color.hexval()[2:]}">&nbsp;&nbsp;<b>{decision}</b>&nbsp;&nbsp;</font>',
-        chip_style
+        CHIP
     )
 
     banner = Table(
         [[
-            Paragraph("<b>RESULT</b>", ParagraphStyle("b1", parent=BODY, textColor=MUTED_TXT, fontSize=9)),
-            Paragraph(
-                f"<b>{score_int}</b><font size=10>/100</font>",
-                ParagraphStyle("b2", parent=BODY, fontName="Helvetica-Bold", fontSize=30, leading=32, textColor=TEXT),
-            ),
+            _static("banner_label"),
+            Paragraph(f"<b>{score_int}</b><font size=10>/100</font>", BANNER_SCORE),
             chip
         ]],
         colWidths=[30*mm, 80*mm, 52*mm],
@@ -388,6 +676,12 @@ def build_pdf(
     story.append(banner)
     story.append(Spacer(1, 10))
 
+    if uncertainty:
+        unc_tbl = Table([[Paragraph(_uncertainty_text(uncertainty), BODY)]], colWidths=[162 * mm])
+        unc_tbl.setStyle(card_table_style(bg=CARD_BG, border=BORDER, pad=10))
+        story.append(unc_tbl)
+        story.append(Spacer(1, 10))
+
     def kpi_cell(title, value, sub, value_color=TEXT):
         # ReportLab <font color="..."> braucht einen String wie "#RRGGBB"
         def _c(x):
@@ -399,7 +693,7 @@ def build_pdf(
             f'<font size="28" color="{_c(value_color)}"><b>{value}</b></font>'
             f'<br/><br/>'
             f'<font size="10" color="{_c(MUTED_TXT)}">{sub}</font>',
-            ParagraphStyle("KPI_MIX", parent=CENTER, leading=18)
+            KPI_MIX
         )
 
     # KPI Blocks
@@ -417,35 +711,13 @@ def build_pdf(
 
     kpi_tbl = Table(
         [
-            [Paragraph("KEY METRICS", ParagraphStyle("KM", parent=BODY, textColor=MUTED_TXT, fontName="Helvetica-Bold", fontSize=9)), "", ""],
+            [_static("kpi_header"), "", ""],
             [pop_block, stations_block, density_block],
         ],
         colWidths=[55*mm, 55*mm, 52*mm],
     )
 
-    kpi_tbl.setStyle(TableStyle([
-        ("SPAN", (0,0), (-1,0)),
-        ("BACKGROUND", (0,0), (-1,0), CARD_BG_2),
-        ("TEXTCOLOR", (0,0), (-1,0), MUTED_TXT),
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("FONTSIZE", (0,0), (-1,0), 9),
-        ("ALIGN", (0,0), (-1,0), "LEFT"),
-        ("LEFTPADDING", (0,0), (-1,0), 12),
-        ("TOPPADDING", (0,0), (-1,0), 10),
-        ("BOTTOMPADDING", (0,0), (-1,0), 8),
-
-        ("BACKGROUND", (0,1), (-1,-1), CARD_BG),
-        ("TEXTCOLOR", (0,1), (-1,-1), TEXT),
-
-        ("BOX", (0,0), (-1,-1), 1, BORDER),
-        ("INNERGRID", (0,0), (-1,-1), 0, BORDER),
-
-        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-        ("LEFTPADDING", (0,1), (-1,-1), 12),
-        ("RIGHTPADDING", (0,1), (-1,-1), 12),
-        ("TOPPADDING", (0,1), (-1,-1), 14),
-        ("BOTTOMPADDING", (0,1), (-1,-1), 14),
-    ]))
+    kpi_tbl.setStyle(KPI_TABLE_STYLE)
 
     story.append(kpi_tbl)
     story.append(Spacer(1, 12))
@@ -453,7 +725,7 @@ def build_pdf(
     # -----------------------------
     # Warum diese Entscheidung?
     # -----------------------------
-    story.append(Paragraph("Warum diese Entscheidung?", H2))
+    story.append(_static("why_title"))
 
     why_lines = []
     try:
@@ -463,6 +735,11 @@ def build_pdf(
             why_lines.append("Begrenzte Nutzerbasis – Nachfragepotenzial eher niedrig.")
     except Exception:
         why_lines.append("Nutzerbasis konnte nicht sicher bewertet werden.")
+    if demand is not None and population:
+        why_lines.append(
+            f"Distanzgewichtete Nachfrage {_fmt_int(demand)} "
+            f"({_i(100 * _i(demand) / max(_i(population), 1))} % der Einwohner, Nähe zum Standort gewichtet)."
+        )
 
     if stations is None:
         why_lines.append("Wettbewerbsdaten konnten nicht zuverlässig geladen werden.")
@@ -478,20 +755,21 @@ def build_pdf(
         except Exception:
             why_lines.append("Wettbewerb konnte nicht eindeutig eingeordnet werden.")
 
+    nearest_m = competition.get("nearest_m")
+    if nearest_m is not None:
+        why_lines.append(
+            f"Nächster Ladepunkt {_fmt_int(nearest_m)} m Luftlinie entfernt "
+            f"(Wettbewerbsdruck {float(competition.get('pressure') or 0):.2f})."
+        )
+
     story.append(Paragraph("<br/>".join([f"• {l}" for l in why_lines]), BODY))
 
     # -----------------------------
     # Empfehlung
     # -----------------------------
     story.append(Spacer(1, 8))
-    story.append(Paragraph("Empfehlung (nächste Schritte)", H2))
-    story.append(Paragraph(
-        "• Netzanschluss & Leistungsprüfung<br/>"
-        "• Flächenverfügbarkeit vor Ort<br/>"
-        "• Genehmigungsfähigkeit prüfen<br/>"
-        "• Betreiber- und Partnerauswahl",
-        BODY,
-    ))
+    story.append(_static("next_steps_title"))
+    story.append(_static("next_steps"))
 
     # -----------------------------
     # Daten-Footer
@@ -511,43 +789,49 @@ def build_pdf(
 
     if compare_results:
         story.append(PageBreak())
-        story.append(Paragraph("Location Comparison", H1))
-        story.append(Paragraph("Ranked results for the selected locations.", MUTED))
+        story.append(_static("compare_title"))
+        story.append(_static("compare_sub"))
         story.append(Spacer(1, 8))
 
-        header = ["Rank", "Address", "Score", "Population", "Charging Points", "Decision"]
-        rows = [header]
-
         sorted_rows = sorted(compare_results, key=lambda r: _i(r.get("score"), 0), reverse=True)
 
-        for idx, r in enumerate(sorted_rows, start=1):
-            rows.append([
-                f"#{idx}",
-                _safe(r.get("address")),
-                f"{_i(r.get('score'))}/100",
-                _fmt_int(r.get("population")),
-                "-" if r.get("stations") is None else str(r.get("stations")),
-                _decision_label(_i(r.get("score"))),
-            ])
+        story.extend(_chunked_tables(
+            ["Rank", "Address", "Score", "Population", "Charging Points", "Decision"],
+            (
+                [
+                    f"#{idx}",
+                    _safe(r.get("address")),
+                    f"{_i(r.get('score'))}/100",
+                    _fmt_int(r.get("population")),
+                    "-" if r.get("stations") is None else str(r.get("stations")),
+                    _decision_label(_i(r.get("score"))),
+                ]
+                for idx, r in enumerate(sorted_rows, start=1)
+            ),
+            colWidths=[12*mm, 70*mm, 22*mm, 28*mm, 28*mm, 22*mm],
+        ))
 
-        t = Table(rows, colWidths=[12*mm, 70*mm, 22*mm, 28*mm, 28*mm, 22*mm])
-        t.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), CARD_BG_2),
-            ("TEXTCOLOR", (0,0), (-1,0), TEXT),
-            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-            ("BACKGROUND", (0,1), (-1,-1), CARD_BG),
-            ("TEXTCOLOR", (0,1), (-1,-1), TEXT),
-            ("BOX", (0,0), (-1,-1), 1, BORDER),
-            ("INNERGRID", (0,0), (-1,-1), 0, BORDER),
-            ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-            ("ALIGN", (0,0), (0,-1), "CENTER"),
-            ("ALIGN", (2,0), (-1,-1), "CENTER"),
-            ("LEFTPADDING", (0,0), (-1,-1), 8),
-            ("RIGHTPADDING", (0,0), (-1,-1), 8),
-            ("TOPPADDING", (0,0), (-1,-1), 6),
-            ("BOTTOMPADDING", (0,0), (-1,-1), 6),
-        ]))
-        story.append(t)
+        # Details je Standort (Datenqualität / Datenstand), ebenfalls seitenweise
+        if len(sorted_rows) > 1:
+            story.append(PageBreak())
+            story.append(_static("compare_details_title"))
+            story.append(Spacer(1, 8))
+            story.extend(_chunked_tables(
+                ["Rank", "Address", "Density", "Nearest (m)", "Score P5–P95 (Flip)", "Confidence", "OSM Datenstand"],
+                (
+                    [
+                        f"#{idx}",
+                        _safe(r.get("address")),
+                        _safe(r.get("density"), "-"),
+                        "-" if r.get("nearest_m") is None else _fmt_int(r.get("nearest_m")),
+                        _uncertainty_band(r.get("uncertainty")),
+                        _safe(r.get("confidence"), "-"),
+                        _safe((r.get("competition") or {}).get("osm_base"), "-"),
+                    ]
+                    for idx, r in enumerate(sorted_rows, start=1)
+                ),
+                colWidths=[12*mm, 46*mm, 18*mm, 20*mm, 30*mm, 18*mm, 28*mm],
+            ))
 
     
     # =====================================================
@@ -555,11 +839,8 @@ def build_pdf(
     # =====================================================
     if multi_results:
         story.append(PageBreak())
-        story.append(Paragraph("Multi-Time Vergleich", H1))
-        story.append(Paragraph(
-            "Wie robust ist der Standort bei unterschiedlichen Fahrzeiten?",
-            MUTED
-        ))
+        story.append(_static("multi_title"))
+        story.append(_static("multi_sub"))
         story.append(Spacer(1, 8))
 
         stability_pack = compute_customer_stability(
@@ -578,18 +859,18 @@ def build_pdf(
                 ]],
                 colWidths=[45 * mm, 117 * mm],
             )
-            amp.setStyle(TableStyle([
-                ("BOX", (0, 0), (-1, -1), 1, BORDER),
-                ("BACKGROUND", (0, 0), (0, 0), colors.HexColor(core["color"])),
-                ("TEXTCOLOR", (0, 0), (0, 0), colors.white),
-                ("LEFTPADDING", (0, 0), (-1, -1), 8),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-                ("TOPPADDING", (0, 0), (-1, -1), 7),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 7),
-            ]))
+            amp.setStyle(_ampel_table_style(core["color"]))
             story.append(amp)
             story.append(Spacer(1, 10))
 
+        # Minuten-Sweep: Kurve + Entscheidungswechsel statt nur 3 Stützstellen
+        curve = curve_summary(multi_results)
+        if curve:
+            story.append(_curve_chart(curve))
+            story.append(Spacer(1, 4))
+            story.append(Paragraph(curve["text"], BODY))
+            story.append(Spacer(1, 10))
+
         header = ["Fahrzeit", "Bevölkerung", "Ladepunkte", "Score", "Entscheidung"]
         rows = [header]
 
@@ -603,33 +884,20 @@ def build_pdf(
             ])
 
         t = Table(rows, colWidths=[25*mm, 40*mm, 30*mm, 25*mm, 44*mm])
-        t.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), CARD_BG_2),
-            ("TEXTCOLOR", (0,0), (-1,0), TEXT),
-            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-            ("BACKGROUND", (0,1), (-1,-1), CARD_BG),
-            ("TEXTCOLOR", (0,1), (-1,-1), TEXT),
-            ("BOX", (0,0), (-1,-1), 1, BORDER),
-            ("INNERGRID", (0,0), (-1,-1), 0, BORDER),
-            ("ALIGN", (0,0), (-1,-1), "CENTER"),
-        ]))
+        t.setStyle(MULTI_TABLE_STYLE)
         story.append(t)
 
     # =====================================================
     # PAGE 3 – DETAILS
     # =====================================================
     story.append(PageBreak())
-    story.append(Paragraph("Begründung & Details", H1))
-    story.append(Paragraph("Executive Summary", H2))
+    story.append(_static("details_title"))
+    story.append(_static("summary_title"))
     story.append(Paragraph(_safe((text or "").strip(), ""), BODY))
 
     story.append(Spacer(1, 10))
-    story.append(Paragraph("Hinweis", H2))
-    story.append(Paragraph(
-        "Die Analyse basiert auf öffentlich verfügbaren Daten (OSM, WorldPop) "
-        "und ersetzt keine technische oder rechtliche Vor-Ort-Prüfung.",
-        SMALL,
-    ))
+    story.append(_static("note_title"))
+    story.append(_static("note"))
 
     # -----------------------------
     # PDF BUILD (IMMER GANZ AM ENDE)
@@ -640,20 +908,17 @@ def build_pdf(
         onLaterPages=_draw_page_bg,
     )
 
-    if not path.exists():
-        raise RuntimeError(f"PDF was not created: {path}")
-    
-def build_compare_pdf(
-    path,
+
+def compare_report_inputs(
     compare_results: list[dict],
     minutes: int,
     vertical: str = "ev_charging",
     plan: str = "standard",
     profile: str | None = None,
     multi_time: bool = False,
-):
+) -> Dict:
     """
-    Baut einen Compare-PDF, indem build_pdf() mit compare_results befüllt wird.
+    Render-Eingaben für den Compare-PDF (build_pdf() mit compare_results befüllt).
     Nimmt als "Headline-KPIs" den besten Standort (Rank #1).
     """
     compare_results = compare_results or []
@@ -680,8 +945,7 @@ def build_compare_pdf(
         + (", Multi-Time: ja)" if multi_time else ")")
     )
 
-    return build_pdf(
-        path=path,
+    return report_inputs(
         address=f"COMPARE ({len(compare_results)} Standorte)",
         score=best_score,
         text=headline,
@@ -692,6 +956,12 @@ def build_compare_pdf(
         multi_results=None,
         confidence=best_confidence,
         geocode_meta=best_geocode_meta,  
+        demand=best.get("demand"),
+        uncertainty=best.get("uncertainty"),
     )
 
-   
\ No newline at end of file
+
+def build_compare_pdf(path, compare_results: list[dict], minutes: int, **kwargs):
+    """Baut einen Compare-PDF nach `path` (siehe compare_report_inputs)."""
+    data = render_pdf_cached(compare_report_inputs(compare_results, minutes, **kwargs))
+    write_pdf_atomic(path, data)
@@ -2,31 +2,236 @@
 from __future__ import annotations
 
 import json
+import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
+
+DB_NAME = "reports.sqlite"
+
+_INIT_LOCK = threading.Lock()
+_INITIALIZED: set = set()
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 def report_json_path(reports_dir: Path, report_id: str) -> Path:
+    # Legacy-Format (vor SQLite), nur noch für die Migration
     return reports_dir / f"{report_id}.json"
 
 def report_pdf_path(reports_dir: Path, report_id: str) -> Path:
     return reports_dir / f"{report_id}.pdf"
 
+def db_path(reports_dir: Path) -> Path:
+    return Path(reports_dir) / DB_NAME
+
+def get_conn(reports_dir: Path) -> sqlite3.Connection:
+    Path(reports_dir).mkdir(parents=True, exist_ok=True)
+    # isolation_level=None: Transaktionen steuern wir explizit (BEGIN IMMEDIATE)
+    conn = sqlite3.connect(str(db_path(reports_dir)), timeout=10, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 10000")
+    return conn
+
+def init_store(reports_dir: Path) -> None:
+    key = str(Path(reports_dir).resolve())
+    if key in _INITIALIZED:
+        return
+    with _INIT_LOCK:
+        if key in _INITIALIZED:
+            return
+        conn = get_conn(reports_dir)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                report_id TEXT PRIMARY KEY,
+                status TEXT,
+                plan TEXT,
+                kind TEXT,
+                created_at_utc TEXT,
+                updated_at_utc TEXT,
+                meta TEXT NOT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_reports_status ON reports(status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_reports_created_at ON reports(created_at_utc)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_reports_plan ON reports(plan)")
+            conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+            done = conn.execute("SELECT value FROM store_meta WHERE key = 'json_migrated_at'").fetchone()
+            if not done:
+                _migrate_json_reports(conn, reports_dir)
+                conn.execute(
+                    "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('json_migrated_at', ?)",
+                    (utc_now_iso(),),
+                )
+        finally:
+            conn.close()
+        _INITIALIZED.add(key)
+
+def _row_values(report_id: str, meta: Dict[str, Any]) -> tuple:
+    return (
+        report_id,
+        meta.get("status"),
+        meta.get("plan"),
+        meta.get("kind") or "single",
+        meta.get("created_at_utc"),
+        utc_now_iso(),
+        json.dumps(meta, ensure_ascii=False),
+    )
+
+def _migrate_json_reports(conn: sqlite3.Connection, reports_dir: Path) -> int:
+    """Importiert alte reports/*.json (bestehende Einträge in der DB gewinnen)."""
+    imported = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for p in sorted(Path(reports_dir).glob("*.json")):
+            try:
+                meta = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                print("[WARN] report migration: skipping unreadable", p)
+                continue
+            report_id = meta.get("report_id") or p.stem
+            cur = conn.execute(
+                """
+                INSERT OR IGNORE INTO reports
+                (report_id, status, plan, kind, created_at_utc, updated_at_utc, meta)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                _row_values(report_id, meta),
+            )
+            imported += cur.rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    if imported:
+        print(f"[REPORT STORE] migrated {imported} JSON report(s) into {DB_NAME}")
+    return imported
+
+def migrate_json_reports(reports_dir: Path) -> int:
+    """Manuell erneut ausführbar (z.B. nach dem Zurückspielen alter JSON-Dateien)."""
+    init_store(reports_dir)
+    conn = get_conn(reports_dir)
+    try:
+        return _migrate_json_reports(conn, reports_dir)
+    finally:
+        conn.close()
+
 def write_report_meta(reports_dir: Path, report_id: str, meta: Dict[str, Any]) -> None:
-    p = report_json_path(reports_dir, report_id)
-    p.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    init_store(reports_dir)
+    conn = get_conn(reports_dir)
+    try:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO reports
+            (report_id, status, plan, kind, created_at_utc, updated_at_utc, meta)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            _row_values(report_id, meta),
+        )
+    finally:
+        conn.close()
 
 def read_report_meta(reports_dir: Path, report_id: str) -> Optional[Dict[str, Any]]:
-    p = report_json_path(reports_dir, report_id)
-    if not p.exists():
-        return None
-    return json.loads(p.read_text(encoding="utf-8"))
+    init_store(reports_dir)
+    conn = get_conn(reports_dir)
+    try:
+        row = conn.execute("SELECT meta FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+def _update(
+    reports_dir: Path,
+    report_id: str,
+    patch: Dict[str, Any],
+    from_statuses: Optional[Iterable[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    init_store(reports_dir)
+    conn = get_conn(reports_dir)
+    try:
+        # BEGIN IMMEDIATE: Schreib-Lock vor dem Lesen -> kein Lost Update zwischen Webhook und get_report
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT meta FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+            meta = json.loads(row[0]) if row else {}
+
+            if from_statuses is not None and (not row or meta.get("status") not in set(from_statuses)):
+                conn.execute("ROLLBACK")
+                return None
+
+            meta.update(patch)
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO reports
+                (report_id, status, plan, kind, created_at_utc, updated_at_utc, meta)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                _row_values(report_id, meta),
+            )
+            conn.execute("COMMIT")
+            return meta
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
 
 def update_report_meta(reports_dir: Path, report_id: str, patch: Dict[str, Any]) -> Dict[str, Any]:
-    meta = read_report_meta(reports_dir, report_id) or {}
-    meta.update(patch)
-    write_report_meta(reports_dir, report_id, meta)
-    return meta
\ No newline at end of file
+    return _update(reports_dir, report_id, patch)
+
+def transition_report_status(
+    reports_dir: Path,
+    report_id: str,
+    from_statuses: Iterable[str],
+    to_status: str,
+    patch: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomarer Statuswechsel (z.B. created -> paid, paid -> delivered).
+    Gibt die neue Meta zurück, oder None wenn der Report fehlt bzw. nicht in from_statuses ist.
+    """
+    return _update(reports_dir, report_id, {**(patch or {}), "status": to_status}, from_statuses=from_statuses)
+
+def list_reports(
+    reports_dir: Path,
+    status: Optional[str] = None,
+    plan: Optional[str] = None,
+    created_after: Optional[str] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    init_store(reports_dir)
+    where, args = [], []
+    if status is not None:
+        where.append("status = ?"); args.append(status)
+    if plan is not None:
+        where.append("plan = ?"); args.append(plan)
+    if created_after is not None:
+        where.append("created_at_utc >= ?"); args.append(created_after)
+
+    sql = "SELECT meta FROM reports"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at_utc DESC LIMIT ?"
+    args.append(int(limit))
+
+    conn = get_conn(reports_dir)
+    try:
+        rows = conn.execute(sql, args).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(r[0]) for r in rows]
+
+def count_reports(reports_dir: Path) -> Dict[str, Dict[str, int]]:
+    """Aggregation über Indizes: {"status": {...}, "plan": {...}}."""
+    init_store(reports_dir)
+    conn = get_conn(reports_dir)
+    try:
+        by_status = dict(conn.execute("SELECT status, COUNT(*) FROM reports GROUP BY status").fetchall())
+        by_plan = dict(conn.execute("SELECT plan, COUNT(*) FROM reports GROUP BY plan").fetchall())
+    finally:
+        conn.close()
+    return {"status": by_status, "plan": by_plan}
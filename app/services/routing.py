@@ -0,0 +1,430 @@
+"""
+Lokales Routing für Isochronen (ohne ORS).
+
+Ein OSM-Extrakt wird einmal in ein kompaktes Straßennetz umgewandelt:
+  - Knoten-Koordinaten (lon/lat) als float64-Arrays
+  - Kanten als CSR-Adjazenz (indptr / indices / Fahrzeit in Sekunden, float32)
+und als .npz neben dem Extrakt gecacht. Eine Isochrone ist dann ein
+begrenzter Dijkstra ab dem nächstgelegenen Knoten + Hülle der erreichten Knoten.
+"""
+import os
+import threading
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pyproj
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+from shapely.geometry import mapping
+from shapely.ops import transform
+
+METRIC_CRS = "EPSG:3035"   # LAEA Europe (Meter)
+
+# Default-Geschwindigkeiten (km/h) je highway-Klasse; nicht gelistete Klassen sind nicht befahrbar
+HIGHWAY_SPEEDS_KMH: Dict[str, float] = {
+    "motorway": 110, "motorway_link": 60,
+    "trunk": 90, "trunk_link": 50,
+    "primary": 70, "primary_link": 45,
+    "secondary": 60, "secondary_link": 40,
+    "tertiary": 50, "tertiary_link": 35,
+    "unclassified": 40, "road": 30,
+    "residential": 30, "living_street": 10,
+    "service": 15,
+}
+IMPLIED_ONEWAY = {"motorway", "motorway_link"}
+
+MAX_SNAP_M = float(os.getenv("LOCAL_ROUTING_MAX_SNAP_M", "2000"))
+HULL_RATIO = float(os.getenv("LOCAL_ISO_HULL_RATIO", "0.3"))     # 0 = sehr konkav, 1 = konvex
+HULL_BUFFER_M = float(os.getenv("LOCAL_ISO_BUFFER_M", "250"))    # Straßen-Korridor um erreichte Knoten
+
+_TO_METRIC = pyproj.Transformer.from_crs("EPSG:4326", METRIC_CRS, always_xy=True)
+_TO_WGS84 = pyproj.Transformer.from_crs(METRIC_CRS, "EPSG:4326", always_xy=True)
+
+
+@dataclass
+class RoadGraph:
+    lon: np.ndarray        # (n,) float64
+    lat: np.ndarray        # (n,) float64
+    indptr: np.ndarray     # (n+1,) int64
+    indices: np.ndarray    # (m,) int32  Zielknoten
+    seconds: np.ndarray    # (m,) float32 Fahrzeit
+
+    _matrix: Optional[csr_matrix] = field(default=None, repr=False, compare=False)
+    _tree: Optional[cKDTree] = field(default=None, repr=False, compare=False)
+    _xy: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.lon)
+
+    @property
+    def matrix(self) -> csr_matrix:
+        if self._matrix is None:
+            self._matrix = csr_matrix((self.seconds, self.indices, self.indptr), shape=(self.n_nodes, self.n_nodes))
+        return self._matrix
+
+    @property
+    def xy(self) -> np.ndarray:
+        """Knoten in METRIC_CRS (n, 2)."""
+        if self._xy is None:
+            x, y = _TO_METRIC.transform(self.lon, self.lat)
+            self._xy = np.column_stack([x, y])
+        return self._xy
+
+    def snap(self, lon: float, lat: float) -> int:
+        """Index des nächstgelegenen Knotens (ValueError, wenn weiter als MAX_SNAP_M)."""
+        if self._tree is None:
+            self._tree = cKDTree(self.xy)
+        x, y = _TO_METRIC.transform(lon, lat)
+        dist, idx = self._tree.query([x, y])
+        if not np.isfinite(dist) or dist > MAX_SNAP_M:
+            raise ValueError(f"No road within {MAX_SNAP_M:.0f} m of ({lon}, {lat}).")
+        return int(idx)
+
+    def save(self, path) -> None:
+        np.savez_compressed(
+            path, lon=self.lon, lat=self.lat,
+            indptr=self.indptr, indices=self.indices, seconds=self.seconds,
+        )
+
+    @classmethod
+    def load_npz(cls, path) -> "RoadGraph":
+        with np.load(path) as z:
+            return cls(
+                lon=z["lon"], lat=z["lat"],
+                indptr=z["indptr"], indices=z["indices"], seconds=z["seconds"],
+            )
+
+
+# -----------------------------
+# OSM -> Graph
+# -----------------------------
+def _speed_kmh(tags: Dict[str, str]) -> Optional[float]:
+    base = HIGHWAY_SPEEDS_KMH.get(tags.get("highway", ""))
+    if base is None:
+        return None
+    if (tags.get("access") or "").lower() in {"private", "no"}:
+        return None
+    maxspeed = (tags.get("maxspeed") or "").strip().lower()
+    if maxspeed.isdigit():
+        # tatsächliche Geschwindigkeit liegt meist unter dem Limit
+        return max(5.0, min(float(maxspeed) * 0.9, base * 1.2))
+    return float(base)
+
+
+def _oneway(tags: Dict[str, str]) -> int:
+    """1 = nur vorwärts, -1 = nur rückwärts, 0 = beide Richtungen."""
+    v = (tags.get("oneway") or "").lower()
+    if v in {"yes", "true", "1"}:
+        return 1
+    if v == "-1":
+        return -1
+    if v == "no":
+        return 0
+    if tags.get("highway") in IMPLIED_ONEWAY or tags.get("junction") == "roundabout":
+        return 1
+    return 0
+
+
+def _haversine_m(lon1, lat1, lon2, lat2):
+    r = 6_371_000.0
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dp = p2 - p1
+    dl = np.radians(lon2 - lon1)
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * r * np.arcsin(np.sqrt(a))
+
+
+def _iter_osm_xml(path):
+    """(nodes: {id: (lon, lat)}, ways: [(node_refs, tags)]) aus .osm (XML)."""
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways = []
+    for _, el in ET.iterparse(str(path), events=("end",)):
+        if el.tag == "node":
+            nodes[int(el.get("id"))] = (float(el.get("lon")), float(el.get("lat")))
+            el.clear()
+        elif el.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in el.iter("tag")}
+            if tags.get("highway") in HIGHWAY_SPEEDS_KMH:
+                ways.append(([int(nd.get("ref")) for nd in el.iter("nd")], tags))
+            el.clear()
+        elif el.tag == "relation":
+            el.clear()
+    return nodes, ways
+
+
+def _iter_osm_pbf(path):
+    try:
+        import osmium  # optional: nur für .pbf nötig
+    except ImportError as e:
+        raise RuntimeError("Reading .osm.pbf requires the 'osmium' package (pip install osmium).") from e
+
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways = []
+    for obj in osmium.FileProcessor(str(path)):
+        if obj.is_node():
+            nodes[obj.id] = (obj.location.lon, obj.location.lat)
+        elif obj.is_way():
+            tags = {t.k: t.v for t in obj.tags}
+            if tags.get("highway") in HIGHWAY_SPEEDS_KMH:
+                ways.append(([n.ref for n in obj.nodes], tags))
+    return nodes, ways
+
+
+def build_graph_from_osm(path) -> RoadGraph:
+    path = Path(path)
+    if path.name.endswith(".pbf"):
+        nodes, ways = _iter_osm_pbf(path)
+    else:
+        nodes, ways = _iter_osm_xml(path)
+
+    src_ids, dst_ids, speeds = [], [], []
+    for refs, tags in ways:
+        speed = _speed_kmh(tags)
+        if speed is None:
+            continue
+        refs = [r for r in refs if r in nodes]
+        direction = _oneway(tags)
+        for a, b in zip(refs, refs[1:]):
+            if direction >= 0:
+                src_ids.append(a); dst_ids.append(b); speeds.append(speed)
+            if direction <= 0:
+                src_ids.append(b); dst_ids.append(a); speeds.append(speed)
+
+    if not src_ids:
+        raise ValueError(f"No routable ways found in {path}.")
+
+    # nur Knoten behalten, die im Netz vorkommen -> kompakte Indizes
+    osm_ids, inverse = np.unique(np.array(src_ids + dst_ids, dtype=np.int64), return_inverse=True)
+    m = len(src_ids)
+    src, dst = inverse[:m], inverse[m:]
+
+    coords = np.array([nodes[i] for i in osm_ids], dtype=np.float64)
+    lon, lat = coords[:, 0], coords[:, 1]
+
+    length_m = _haversine_m(lon[src], lat[src], lon[dst], lat[dst])
+    seconds = np.maximum(length_m / (np.array(speeds) / 3.6), 0.01)
+
+    # parallele Kanten: nur die schnellste behalten (csr_matrix würde sie addieren)
+    order = np.lexsort((seconds, dst, src))
+    src, dst, seconds = src[order], dst[order], seconds[order]
+    keep = np.ones(len(src), dtype=bool)
+    keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    src, dst, seconds = src[keep], dst[keep], seconds[keep]
+
+    n = len(osm_ids)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+    return RoadGraph(
+        lon=lon, lat=lat,
+        indptr=indptr,
+        indices=dst.astype(np.int32),
+        seconds=seconds.astype(np.float32),
+    )
+
+
+_GRAPH: Optional[RoadGraph] = None
+
+
+def load_graph(path=None) -> RoadGraph:
+    """
+    Lädt den Graph (einmal pro Prozess). path = .npz oder OSM-Extrakt (.osm/.osm.pbf);
+    bei Extrakten wird <extrakt>.graph.npz als Cache angelegt.
+    """
+    global _GRAPH
+    if _GRAPH is not None and path is None:
+        return _GRAPH
+
+    path = Path(path or os.getenv("LOCAL_ROUTING_GRAPH", "app/data/roads.osm.pbf"))
+    if path.suffix == ".npz":
+        graph = RoadGraph.load_npz(path)
+    else:
+        cache = path.with_name(path.name + ".graph.npz")
+        # nur der Cache deployt (ohne Extrakt) -> Cache verwenden
+        if cache.exists() and (not path.exists() or cache.stat().st_mtime >= path.stat().st_mtime):
+            graph = RoadGraph.load_npz(cache)
+        else:
+            if not path.exists():
+                raise FileNotFoundError(f"Missing road network extract: {path}")
+            graph = build_graph_from_osm(path)
+            graph.save(cache)
+
+    _GRAPH = graph
+    return graph
+
+
+# -----------------------------
+# Isochrone
+# -----------------------------
+# Obergrenze der Geschwindigkeit (inkl. maxspeed-Aufschlag) -> exakter Suchradius
+MAX_SPEED_MS = max(HIGHWAY_SPEEDS_KMH.values()) * 1.2 / 3.6
+RADIUS_MARGIN = 1.05       # LAEA-Distanz vs. Haversine
+ORIGIN_BATCH = int(os.getenv("LOCAL_ROUTING_ORIGIN_BATCH", "16"))
+
+
+class RoutingWorkspace:
+    """
+    Wiederverwendbarer Arbeitsspeicher für begrenzte Dijkstra-Läufe.
+
+    Statt über den ganzen Graph zu suchen (O(n) Initialisierung pro Origin),
+    wird der Teilgraph im Radius MAX_SPEED * max_seconds ausgeschnitten – weiter
+    kommt man in der Zeit nicht, das Ergebnis bleibt exakt. Die Abbildung
+    global -> lokal ist ein einmal allokiertes Arena-Array, das nach jedem Lauf
+    nur an den berührten Stellen zurückgesetzt wird. Mehrere Origins laufen in
+    einem einzigen Dijkstra-Aufruf über denselben Teilgraph.
+
+    Nicht thread-safe: eine Instanz pro Thread (siehe workspace()).
+    """
+
+    def __init__(self, graph: RoadGraph):
+        self.graph = graph
+        self._local = np.full(graph.n_nodes, -1, dtype=np.int64)
+
+    def _subgraph(self, nodes: np.ndarray) -> csr_matrix:
+        g = self.graph
+        self._local[nodes] = np.arange(len(nodes))
+        try:
+            starts = g.indptr[nodes]
+            counts = g.indptr[nodes + 1] - starts
+            total = int(counts.sum())
+            offsets = np.cumsum(counts) - counts
+            pos = np.arange(total) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+
+            dst = self._local[g.indices[pos]]
+            rows = np.repeat(np.arange(len(nodes)), counts)
+            keep = dst >= 0
+        finally:
+            # Arena nur an berührten Stellen zurücksetzen
+            self._local[nodes] = -1
+
+        return csr_matrix(
+            (g.seconds[pos][keep], (rows[keep], dst[keep])),
+            shape=(len(nodes), len(nodes)),
+        )
+
+    def travel_times(self, origins, max_seconds: float):
+        """
+        Begrenzter Dijkstra für mehrere Origins (Knotenindizes) in einem Aufruf.
+        Rückgabe: (nodes, dist) mit dist.shape == (len(origins), len(nodes));
+        inf = nicht erreichbar innerhalb max_seconds.
+        """
+        g = self.graph
+        origins = np.atleast_1d(np.asarray(origins, dtype=np.int64))
+        radius = MAX_SPEED_MS * max_seconds * RADIUS_MARGIN
+
+        if g._tree is None:
+            g._tree = cKDTree(g.xy)
+        balls = g._tree.query_ball_point(g.xy[origins], radius)
+        nodes = np.unique(np.concatenate([np.asarray(b, dtype=np.int64) for b in balls] + [origins]))
+
+        sub = self._subgraph(nodes)
+        local_origins = np.searchsorted(nodes, origins)
+        dist = dijkstra(sub, directed=True, indices=local_origins, limit=max_seconds)
+        return nodes, np.atleast_2d(dist)
+
+
+_WORKSPACES = threading.local()
+
+
+def workspace(graph: Optional[RoadGraph] = None) -> RoutingWorkspace:
+    """Pro Thread eine RoutingWorkspace (Arena wird über Requests hinweg wiederverwendet)."""
+    graph = graph or load_graph()
+    ws = getattr(_WORKSPACES, "ws", None)
+    if ws is None or ws.graph is not graph:
+        ws = RoutingWorkspace(graph)
+        _WORKSPACES.ws = ws
+    return ws
+
+
+def travel_times(graph: RoadGraph, origin: int, max_seconds: float) -> np.ndarray:
+    """Begrenzter Dijkstra: Fahrzeit je Knoten (inf = nicht erreichbar innerhalb max_seconds)."""
+    nodes, dist = workspace(graph).travel_times([origin], max_seconds)
+    full = np.full(graph.n_nodes, np.inf)
+    full[nodes] = dist[0]
+    return full
+
+
+def reachable_polygon(graph: RoadGraph, reached: np.ndarray):
+    """
+    Konkave Hülle + Korridor-Puffer um die erreichten Knoten (Polygon in EPSG:4326).
+    reached: Bool-Maske über alle Knoten oder Array von Knotenindizes.
+    """
+    xy = graph.xy[reached]
+    pts = shapely.multipoints(xy)
+    if len(xy) >= 3:
+        hull = shapely.concave_hull(pts, ratio=HULL_RATIO)
+    else:
+        hull = pts
+    poly_m = shapely.buffer(hull, HULL_BUFFER_M)
+    return transform(_TO_WGS84.transform, poly_m), float(poly_m.area)
+
+
+def _feature(poly, area_m2: float, seconds: float, center, group_index: int = 0) -> dict:
+    return {
+        "type": "Feature",
+        "properties": {
+            "group_index": group_index,
+            "value": seconds,
+            "center": list(center),
+            "area": area_m2,
+        },
+        "geometry": mapping(poly),
+    }
+
+
+def _rings(graph: RoadGraph, nodes: np.ndarray, dist: np.ndarray, ranges_s, center) -> dict:
+    """Alle Ringe aus EINEM Kürzeste-Wege-Baum (nur unterschiedlich abgeschnitten)."""
+    features = []
+    for max_s in ranges_s:
+        poly, area_m2 = reachable_polygon(graph, nodes[dist <= max_s])
+        features.append(_feature(poly, area_m2, max_s, center))
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "metadata": {"engine": "local", "range": list(ranges_s)},
+    }
+
+
+def local_isochrones(point, minutes_list, graph: Optional[RoadGraph] = None) -> dict:
+    """
+    Mehrere Isochronen-Ringe (z.B. 10/15/20 min) aus einer Traversierung bis zur
+    größten Fahrzeit. FeatureCollection mit einem Feature pro Ring (aufsteigend, wie ORS).
+    """
+    return local_isochrones_many([point], minutes_list, graph=graph)[0]
+
+
+def local_isochrones_many(points, minutes_list, graph: Optional[RoadGraph] = None) -> list:
+    """
+    Batch für viele Origins (Compare/Scan): Origins werden in Gruppen von
+    ORIGIN_BATCH über einen gemeinsamen Teilgraph in einem Dijkstra-Aufruf gerechnet.
+    Rückgabe: eine FeatureCollection pro Punkt (gleiche Reihenfolge).
+    """
+    graph = graph or load_graph()
+    ws = workspace(graph)
+    ranges_s = sorted({float(m) * 60.0 for m in minutes_list})
+    max_s = ranges_s[-1]
+
+    points = [tuple(p) for p in points]
+    origins = np.array([graph.snap(lon, lat) for lon, lat in points], dtype=np.int64)
+
+    # räumlich nahe Origins zusammen batchen -> kleiner gemeinsamer Teilgraph
+    order = np.lexsort((graph.lat[origins], np.floor(graph.lon[origins] * 10)))
+
+    out: list = [None] * len(points)
+    for start in range(0, len(order), max(1, ORIGIN_BATCH)):
+        chunk = order[start:start + ORIGIN_BATCH]
+        nodes, dist = ws.travel_times(origins[chunk], max_s)
+        for row, i in enumerate(chunk):
+            out[i] = _rings(graph, nodes, dist[row], ranges_s, points[i])
+    return out
+
+
+def local_isochrone(point, minutes: int, graph: Optional[RoadGraph] = None) -> dict:
+    """Isochrone als GeoJSON FeatureCollection (gleiche Form wie ORS)."""
+    return local_isochrones(point, [minutes], graph=graph)
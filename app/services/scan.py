@@ -0,0 +1,185 @@
+"""
+Region-Scan (Site Hunting): Kandidatenpunkte in einer Region erzeugen und alle
+in Batches bewerten.
+
+Statt pro Punkt ORS + Overpass abzufragen, wird
+  - die Isochrone lokal angenähert (Fahrzeit * Durchschnittsgeschwindigkeit / Umwegfaktor),
+  - die Bevölkerung per population_and_demand_in_areas() in einem Durchlauf je Batch berechnet,
+  - Overpass genau EINMAL für die gesamte Region abgefragt und pro Kreis gezählt,
+  - der Score über score_batch() vektorisiert berechnet.
+"""
+import heapq
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pyproj
+import shapely
+from shapely.geometry import box, shape, mapping
+from shapely.ops import transform
+
+from .competition import load_stations, count_stations_in_areas, density_bucket
+from .population import population_and_demand_in_areas
+from .scoring import score_batch, DEMAND_SCORING
+
+METRIC_CRS = "EPSG:3035"       # LAEA Europe: echte Meter für Raster & Radien
+APPROX_SPEED_KMH = 45.0        # mittlere Reisegeschwindigkeit (Mischverkehr)
+DETOUR_FACTOR = 1.35           # Straßennetz vs. Luftlinie
+BUFFER_RESOLUTION = 8          # Segmente pro Viertelkreis
+
+MAX_SCAN_POINTS = 5000
+BATCH_SIZE = 250
+
+
+# Transformer erst bei Bedarf anlegen (PROJ-Datenbank kostet ~100 ms beim Import)
+@lru_cache(maxsize=None)
+def _to_metric() -> pyproj.Transformer:
+    return pyproj.Transformer.from_crs("EPSG:4326", METRIC_CRS, always_xy=True)
+
+
+@lru_cache(maxsize=None)
+def _to_wgs84() -> pyproj.Transformer:
+    return pyproj.Transformer.from_crs(METRIC_CRS, "EPSG:4326", always_xy=True)
+
+
+def region_geometry(bbox: Optional[List[float]] = None, polygon: Optional[Dict[str, Any]] = None):
+    """bbox = [west, south, east, north] oder GeoJSON-Geometry (Polygon/MultiPolygon)."""
+    if polygon is not None:
+        geom = shape(polygon.get("geometry", polygon))
+    elif bbox is not None:
+        w, s, e, n = bbox
+        geom = box(w, s, e, n)
+    else:
+        raise ValueError("Either bbox or polygon is required.")
+
+    if geom.is_empty or geom.area <= 0:
+        raise ValueError("Scan region is empty.")
+    return geom
+
+
+def approx_radius_m(minutes: int) -> float:
+    return APPROX_SPEED_KMH * 1000.0 * (minutes / 60.0) / DETOUR_FACTOR
+
+
+def candidate_points(region, spacing_m: float) -> np.ndarray:
+    """Regelmäßiges Raster (metrisch) innerhalb der Region -> ndarray (n, 2) lon/lat."""
+    region_m = transform(_to_metric().transform, region)
+    minx, miny, maxx, maxy = region_m.bounds
+
+    xs = np.arange(minx + spacing_m / 2, maxx, spacing_m)
+    ys = np.arange(miny + spacing_m / 2, maxy, spacing_m)
+    gx, gy = np.meshgrid(xs, ys)
+    gx, gy = gx.ravel(), gy.ravel()
+
+    if len(gx) > MAX_SCAN_POINTS * 4:
+        raise ValueError(f"Too many candidate points ({len(gx)}); increase spacing_m.")
+
+    inside = shapely.contains_xy(region_m, gx, gy)
+    gx, gy = gx[inside], gy[inside]
+
+    if len(gx) > MAX_SCAN_POINTS:
+        raise ValueError(f"Too many candidate points ({len(gx)} > {MAX_SCAN_POINTS}); increase spacing_m.")
+
+    lon, lat = _to_wgs84().transform(gx, gy)
+    return np.column_stack([lon, lat])
+
+
+def approx_isochrones(points: np.ndarray, minutes: int):
+    """Kreis-Näherung der Isochrone je Punkt -> (Polygone in EPSG:4326, Flächen in km²)."""
+    radius = approx_radius_m(minutes)
+    x, y = _to_metric().transform(points[:, 0], points[:, 1])
+    circles_m = shapely.buffer(shapely.points(x, y), radius, quad_segs=BUFFER_RESOLUTION)
+    area_km2 = shapely.area(circles_m) / 1_000_000.0
+    circles = shapely.transform(circles_m, lambda c: np.column_stack(_to_wgs84().transform(c[:, 0], c[:, 1])))
+    return circles, area_km2
+
+
+def _region_competition(points: np.ndarray, minutes: int) -> Dict[str, Any]:
+    """Eine Ladepunkt-Abfrage für die gesamte Region (BBox + Isochronen- bzw. Kennzahlen-Radius)."""
+    from .competition_metrics import PRESSURE_RADIUS_M
+    radius = max(approx_radius_m(minutes), PRESSURE_RADIUS_M)
+    x, y = _to_metric().transform(points[:, 0], points[:, 1])
+    env_m = shapely.segmentize(box(x.min() - radius, y.min() - radius, x.max() + radius, y.max() + radius), radius)
+    w, s, e, n = transform(_to_wgs84().transform, env_m).bounds
+    try:
+        return load_stations(s, w, n, e, cached=False)
+    except RuntimeError as err:
+        print("[WARN] station source failed for scan region, stations=None. Last error:", err)
+        return {"points": None, "osm_base": None, "queried_at": None, "error": str(err)}
+
+
+def scan_region(region, spacing_m: float, minutes: int) -> Iterator[Dict[str, Any]]:
+    """
+    Bewertet alle Kandidatenpunkte der Region, batchweise.
+    Liefert pro Punkt ein Dict (lon, lat, score, decision, population, stations, ...).
+    """
+    from .competition_metrics import competition_metrics, metrics_row   # lazy (scipy)
+
+    points = candidate_points(region, spacing_m)
+    if len(points) == 0:
+        return
+
+    comp = _region_competition(points, minutes)
+
+    for start in range(0, len(points), BATCH_SIZE):
+        chunk = points[start:start + BATCH_SIZE]
+        circles, area_km2 = approx_isochrones(chunk, minutes)
+
+        population, demand = population_and_demand_in_areas(circles, chunk)
+        if comp["points"] is None:
+            stations = [None] * len(chunk)
+            dist = None
+        else:
+            stations = count_stations_in_areas(circles, comp["points"])
+            dist = competition_metrics(chunk, comp["points"])
+
+        scored = score_batch(population, stations, area_km2, None, demand if DEMAND_SCORING else None)
+
+        for i, (lon, lat) in enumerate(chunk):
+            st = None if stations[i] is None else int(stations[i])
+            yield {
+                "lon": float(lon),
+                "lat": float(lat),
+                "minutes": minutes,
+                "score": int(scored["score"][i]),
+                "decision": scored["decision"][i],
+                "confidence": scored["confidence"][i],
+                "population": int(population[i]),
+                "demand": int(demand[i]),
+                "stations": st,
+                "density": "unknown" if st is None else density_bucket(st),
+                **({"nearest_m": None, "knn_m": [], "pressure": None} if dist is None else metrics_row(dist, i)),
+                "area_km2": float(area_km2[i]),
+                "osm_base": comp.get("osm_base"),
+                "queried_at": comp.get("queried_at"),
+            }
+
+
+def to_feature(row: Dict[str, Any]) -> Dict[str, Any]:
+    props = {k: v for k, v in row.items() if k not in ("lon", "lat")}
+    return {
+        "type": "Feature",
+        "geometry": mapping(shapely.Point(row["lon"], row["lat"])),
+        "properties": props,
+    }
+
+
+class TopN:
+    """Hält nur die besten N Ergebnisse (Speicher bleibt flach)."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self._heap: list = []
+        self._seq = 0
+
+    def push(self, row: Dict[str, Any]) -> None:
+        self._seq += 1
+        item = (row["score"], row["population"], -self._seq, row)
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, item)
+        elif item[:3] > self._heap[0][:3]:
+            heapq.heapreplace(self._heap, item)
+
+    def ranked(self) -> List[Dict[str, Any]]:
+        items = sorted(self._heap, key=lambda t: t[:3], reverse=True)
+        return [{"rank": i, **t[3]} for i, t in enumerate(items, start=1)]
@@ -1,30 +1,142 @@
-def score_location(population, competition):
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .confidence import as_float_array, compute_confidence_batch
+
+# --- Gewichte / Schwellen (eine Quelle für Einzel- und Batch-Scoring) ---
+POP_SATURATION = 150_000           # 150k = sehr starkes urbanes Einzugsgebiet
+STATION_THRESHOLDS = (5, 15, 30)   # <=5 sehr wenig, <=15 moderat, <=30 hoch, sonst sehr hoch
+STATION_SCORES = (0.9, 0.75, 0.6, 0.45)
+UNKNOWN_STATIONS_SCORE = 0.5       # harte Unsicherheit → leicht negativ
+# Distanzgewichtete Nachfrage (population.DEMAND_DECAY_M = 5 km) statt Kopfzahl:
+# gleichmäßig verteilte 150k Personen im 15-min-Ring ergeben ~45k Nachfrage
+DEMAND_SATURATION = 45_000
+DEMAND_SCORING = os.getenv("DEMAND_SCORING", "0").strip().lower() in ("1", "true", "yes", "on")
+POP_WEIGHT = 0.6
+COMP_WEIGHT = 0.4
+
+GO_THRESHOLD = 70
+CHECK_THRESHOLD = 50
+
+
+@dataclass(frozen=True)
+class ScoringConfig:
+    """Gewichte eines Verticals (verticals.VerticalConfig.scoring); Schwellen GO/CHECK gelten global."""
+    pop_saturation: float = POP_SATURATION
+    station_thresholds: Tuple[float, float, float] = STATION_THRESHOLDS
+    station_scores: Tuple[float, float, float, float] = STATION_SCORES
+    unknown_stations_score: float = UNKNOWN_STATIONS_SCORE
+    pop_weight: float = POP_WEIGHT
+    comp_weight: float = COMP_WEIGHT
+    demand_saturation: float = DEMAND_SATURATION
+    use_demand: bool = DEMAND_SCORING   # Nachfrage statt Kopfzahl (wenn vorhanden)
+
+
+DEFAULT_SCORING = ScoringConfig()
+
+
+def _to_int(x, default=0) -> int:
+    try:
+        return int(x)
+    except Exception:
+        return default
+
+
+def score_batch_scores(population, stations, demand=None, cfg: Optional[ScoringConfig] = None) -> np.ndarray:
+    """
+    Vektorisierte Variante von score_location().
+    population: Personen im Einzugsgebiet (None/NaN zählt als 0),
+    stations: Ladepunkte (None/NaN = unbekannt),
+    demand: distanzgewichtete Nachfrage (optional; ersetzt population, wo vorhanden),
+    cfg: Gewichte (Default: DEFAULT_SCORING).
+    Gibt int64-Scores (0..100) zurück.
+    """
+    cfg = cfg or DEFAULT_SCORING
+    pop = np.nan_to_num(as_float_array(population), nan=0.0)
+    st = as_float_array(stations)
+
+    pop_score = np.minimum(pop / cfg.pop_saturation, 1.0)
+    if demand is not None:
+        dem = as_float_array(demand)
+        pop_score = np.where(np.isnan(dem), pop_score, np.minimum(dem / cfg.demand_saturation, 1.0))
+
+    t1, t2, t3 = cfg.station_thresholds
+    s1, s2, s3, s4 = cfg.station_scores
+    comp_score = np.select(
+        [np.isnan(st), st <= t1, st <= t2, st <= t3],
+        [cfg.unknown_stations_score, s1, s2, s3],
+        default=s4,
+    )
+
+    score = (cfg.pop_weight * pop_score + cfg.comp_weight * comp_score) * 100
+    # np.round == Python round() (beide "round half to even")
+    return np.round(score).astype(np.int64)
+
+
+def decision_labels(scores) -> np.ndarray:
+    """GO / CHECK / NO-GO für ein Array von Scores."""
+    s = np.asarray(scores, dtype=np.int64)
+    return np.select(
+        [s >= GO_THRESHOLD, s >= CHECK_THRESHOLD],
+        ["GO", "CHECK"],
+        default="NO-GO",
+    ).astype(object)
+
+
+def decision_label(score) -> str:
+    # Einzelwert ohne numpy (gleiche Schwellen wie decision_labels; wird in Schleifen genutzt)
+    s = _to_int(score, 0)
+    return "GO" if s >= GO_THRESHOLD else ("CHECK" if s >= CHECK_THRESHOLD else "NO-GO")
+
+
+def score_batch(population, stations, area_km2=None, fallback_used=None, demand=None,
+                cfg: Optional[ScoringConfig] = None) -> dict:
+    """
+    Batch-Scorer für große Kandidatenmengen (ein Aufruf statt N Einzelaufrufe).
+
+    Eingaben sind gleich lange Arrays/Listen:
+      - population:    Personen im Einzugsgebiet
+      - stations:      Ladepunkte (None/NaN = Overpass fehlgeschlagen)
+      - area_km2:      Fläche der Isochrone (optional, für Confidence)
+      - fallback_used: Geocode-Fallback-Flags (True/False/None, optional)
+      - demand:        distanzgewichtete Nachfrage (optional, siehe score_batch_scores)
+      - cfg:           Gewichte des Verticals (optional)
+
+    Rückgabe: {"score": int[], "decision": str[], "confidence": str[] | None}
+    """
+    pop = as_float_array(population)
+    st = as_float_array(stations)
+
+    scores = score_batch_scores(pop, st, demand, cfg)
+    out = {
+        "score": scores,
+        "decision": decision_labels(scores),
+        "confidence": None,
+    }
+
+    if area_km2 is not None:
+        area = as_float_array(area_km2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            density = np.where(area > 0, pop / area, np.nan)
+        out["confidence"] = compute_confidence_batch(area, density, st, fallback_used)
+
+    return out
+
+
+def score_location(population, competition, demand=None, cfg: Optional[ScoringConfig] = None):
     """
     Scoring-Logik (heuristisch, nachvollziehbar):
     - Population: Sättigung ab ~150.000 Personen
     - Wettbewerb: basiert auf öffentlich zugänglichen Ladepunkten
       innerhalb der Isochrone (Polygon-gefiltert)
-    """
 
-    # --- Population score ---
-    # 150k = sehr starkes urbanes Einzugsgebiet
-    pop_score = min(population / 150_000, 1.0)
+    - demand (optional): distanzgewichtete Nachfrage statt Kopfzahl
+    - cfg (optional): Gewichte des Verticals
 
-    # --- Competition score ---
+    Dünner Wrapper um score_batch_scores() – identische Ergebnisse.
+    """
     stations = competition.get("stations")
-
-    if stations is None:
-        # harte Unsicherheit → leicht negativ
-        comp_score = 0.5
-    elif stations <= 5:
-        comp_score = 0.9     # sehr wenig Wettbewerb
-    elif stations <= 15:
-        comp_score = 0.75    # moderat
-    elif stations <= 30:
-        comp_score = 0.6     # hoch
-    else:
-        comp_score = 0.45    # sehr hoch
-
-    # --- Final weighted score ---
-    score = (0.6 * pop_score + 0.4 * comp_score) * 100
-    return round(score)
+    return int(score_batch_scores([population], [stations], None if demand is None else [demand], cfg)[0])
@@ -1,5 +1,9 @@
 from typing import Dict, List, Optional
 
+from .scoring import decision_label as _decision_label
+
+CURVE_MIN_POINTS = 4   # darunter (z.B. Multi-Time 10/15/20) keine Kurven-Auswertung
+
 
 # -----------------------------
 # Helpers
@@ -11,15 +15,6 @@ def _i(x, default=0) -> int:
         return default
 
 
-def _decision_label(score: int) -> str:
-    score = _i(score, 0)
-    if score >= 70:
-        return "GO"
-    if score >= 50:
-        return "CHECK"
-    return "NO-GO"
-
-
 def _ampel_from_swing(core_ok: bool, swing: int, core_is_go: bool) -> Dict[str, str]:
     """
     Ampel ist bewusst auf den Kernbereich (z.B. 15→20) bezogen:
@@ -48,6 +43,53 @@ def _best_available_minute(target: int, available: List[int]) -> int:
     return min(available, key=lambda m: abs(m - target))
 
 
+def curve_summary(multi_results: Optional[List[Dict]]) -> Optional[Dict]:
+    """
+    Auswertung einer Score-Kurve (Minuten-Sweep):
+      - breakpoints: Fahrzeiten, an denen die Entscheidung wechselt
+      - bands:       zusammenhängende Bereiche gleicher Entscheidung
+      - best:        Fahrzeit mit dem höchsten Score (kleinste bei Gleichstand)
+      - steepest:    stärkste Änderung pro Minute (Vorzeichen = Richtung)
+    """
+    rs = sorted(multi_results or [], key=lambda r: _i(r.get("minutes", 0), 0))
+    if len(rs) < CURVE_MIN_POINTS:
+        return None
+
+    mins = [_i(r.get("minutes"), 0) for r in rs]
+    scores = [_i(r.get("score"), 0) for r in rs]
+    decisions = [_decision_label(s) for s in scores]
+
+    breakpoints = []
+    bands = [{"from": mins[0], "to": mins[0], "decision": decisions[0]}]
+    for k in range(1, len(rs)):
+        if decisions[k] != decisions[k - 1]:
+            breakpoints.append({"minutes": mins[k], "from": decisions[k - 1], "to": decisions[k]})
+            bands.append({"from": mins[k], "to": mins[k], "decision": decisions[k]})
+        else:
+            bands[-1]["to"] = mins[k]
+
+    slopes = [(scores[k] - scores[k - 1]) / max(mins[k] - mins[k - 1], 1) for k in range(1, len(rs))]
+    k_steep = max(range(len(slopes)), key=lambda k: abs(slopes[k]))
+    k_best = max(range(len(rs)), key=lambda k: (scores[k], -k))
+
+    if breakpoints:
+        changes = ", ".join(f"{b['minutes']} min ({b['from']}→{b['to']})" for b in breakpoints)
+        text = f"Die Entscheidung wechselt bei {changes}."
+    else:
+        text = f"Die Entscheidung bleibt über {mins[0]}–{mins[-1]} min unverändert <b>{decisions[0]}</b>."
+    text += f" Höchster Score {scores[k_best]}/100 bei {mins[k_best]} min."
+
+    return {
+        "minutes": mins,
+        "scores": scores,
+        "breakpoints": breakpoints,
+        "bands": bands,
+        "best": {"minutes": mins[k_best], "score": scores[k_best]},
+        "steepest": {"minutes": mins[k_steep + 1], "per_min": round(slopes[k_steep], 2)},
+        "text": text,
+    }
+
+
 # -----------------------------
 # Public API (used by main.py)
 # -----------------------------
@@ -211,4 +253,5 @@ def compute_stability(
         "recommendation_text": recommendation_text,
         "baseline_minutes": base_m,
         "far_minutes": far_m,
+        "curve": curve_summary(rs),
     }
\ No newline at end of file
@@ -0,0 +1,504 @@
+"""
+Lokaler Ladepunkt-Index (SQLite + R*-Tree) als Alternative zu Overpass.
+
+- import_extract(): Vollimport aus einem OSM-Extrakt (.osm/.osm.gz/.osm.bz2, .pbf mit osmium)
+  in eine neue Datei, danach per Backup-API in einer Transaktion übernommen
+- apply_diffs():    OSM-Change-Dateien (.osc/.osc.gz) aus einem Verzeichnis inkrementell
+  anwenden (Anlegen, Verschieben, Löschen, Tag-/access-Änderungen), je Datei eine Transaktion;
+  Änderungen bis osm_base (z.B. Diffs von vor einem Neuimport) werden übersprungen,
+  osm_base bewegt sich nur vorwärts
+- stations_in_bbox(): gleiche Rückgabe wie competition.fetch_stations()
+
+WAL-Modus: Leser (API) sehen während eines Updates den letzten konsistenten Stand.
+Ways werden wie bei Overpass "out center" über die BBox-Mitte ihrer Knoten verortet;
+dafür werden die Koordinaten der Knoten von Ladepunkt-Ways mitgeführt.
+"""
+import bz2
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parents[1]          # .../app
+DB_PATH = Path(os.getenv("STATION_INDEX_PATH", str(BASE_DIR / "data" / "station_index.sqlite")))
+EXCLUDED_ACCESS = {"private", "no"}                      # wie der Overpass-Filter
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS stations (
+        rid INTEGER PRIMARY KEY,
+        osm_type TEXT NOT NULL,
+        osm_id INTEGER NOT NULL,
+        lon REAL NOT NULL,
+        lat REAL NOT NULL,
+        access TEXT,
+        tags TEXT,
+        UNIQUE (osm_type, osm_id)
+    )
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS stations_rtree USING rtree(rid, min_lon, max_lon, min_lat, max_lat)",
+    # Knoten der Ladepunkt-Ways (für Mittelpunkt und verschobene Knoten)
+    "CREATE TABLE IF NOT EXISTS way_nodes (way_id INTEGER NOT NULL, seq INTEGER NOT NULL, node_id INTEGER NOT NULL, PRIMARY KEY (way_id, seq))",
+    "CREATE INDEX IF NOT EXISTS ix_way_nodes_node ON way_nodes(node_id)",
+    "CREATE TABLE IF NOT EXISTS node_coords (node_id INTEGER PRIMARY KEY, lon REAL NOT NULL, lat REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+_INIT_LOCK = threading.Lock()
+_INITIALIZED: Set[str] = set()
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_conn(path=None) -> sqlite3.Connection:
+    path = Path(path or DB_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+
+def init_index(path=None) -> None:
+    key = str(Path(path or DB_PATH).resolve())
+    if key in _INITIALIZED:
+        return
+    with _INIT_LOCK:
+        conn = get_conn(path)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+        finally:
+            conn.close()
+        _INITIALIZED.add(key)
+
+
+def exists(path=None) -> bool:
+    return Path(path or DB_PATH).exists()
+
+
+def get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value) -> None:
+    conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)", (key, None if value is None else str(value)))
+
+
+# -----------------------------
+# OSM lesen
+# -----------------------------
+def _open(path):
+    path = str(path)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def _is_station(tags: Dict[str, str]) -> bool:
+    return tags.get("amenity") == "charging_station"
+
+
+def _access(tags: Dict[str, str]) -> str:
+    return (tags.get("access") or "").lower()
+
+
+def _iter_changes(path) -> Iterator[Tuple[str, ET.Element]]:
+    """(action, element) für node/way aus .osc; action = create | modify | delete."""
+    action = None
+    with _open(path) as f:
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if el.tag in ("create", "modify", "delete"):
+                    action = el.tag
+                continue
+            if el.tag in ("node", "way") and action is not None:
+                yield action, el
+                el.clear()
+            elif el.tag == "relation":
+                el.clear()
+
+
+def _tags(el: ET.Element) -> Dict[str, str]:
+    return {t.get("k"): t.get("v") for t in el.iter("tag")}
+
+
+# -----------------------------
+# Schreiben
+# -----------------------------
+def _upsert_station(conn, osm_type: str, osm_id: int, lon: float, lat: float, tags: Dict[str, str]) -> None:
+    row = conn.execute("SELECT rid FROM stations WHERE osm_type = ? AND osm_id = ?", (osm_type, osm_id)).fetchone()
+    if row:
+        rid = row[0]
+        conn.execute(
+            "UPDATE stations SET lon = ?, lat = ?, access = ?, tags = ? WHERE rid = ?",
+            (lon, lat, _access(tags), json.dumps(tags, ensure_ascii=False), rid),
+        )
+        conn.execute("UPDATE stations_rtree SET min_lon = ?, max_lon = ?, min_lat = ?, max_lat = ? WHERE rid = ?", (lon, lon, lat, lat, rid))
+    else:
+        cur = conn.execute(
+            "INSERT INTO stations (osm_type, osm_id, lon, lat, access, tags) VALUES (?, ?, ?, ?, ?, ?)",
+            (osm_type, osm_id, lon, lat, _access(tags), json.dumps(tags, ensure_ascii=False)),
+        )
+        conn.execute("INSERT INTO stations_rtree (rid, min_lon, max_lon, min_lat, max_lat) VALUES (?, ?, ?, ?, ?)", (cur.lastrowid, lon, lon, lat, lat))
+
+
+def _delete_station(conn, osm_type: str, osm_id: int) -> bool:
+    row = conn.execute("SELECT rid FROM stations WHERE osm_type = ? AND osm_id = ?", (osm_type, osm_id)).fetchone()
+    if not row:
+        return False
+    conn.execute("DELETE FROM stations WHERE rid = ?", (row[0],))
+    conn.execute("DELETE FROM stations_rtree WHERE rid = ?", (row[0],))
+    return True
+
+
+def _delete_way(conn, way_id: int) -> bool:
+    conn.execute("DELETE FROM way_nodes WHERE way_id = ?", (way_id,))
+    return _delete_station(conn, "way", way_id)
+
+
+def _way_center(conn, way_id: int) -> Optional[Tuple[float, float]]:
+    row = conn.execute(
+        """
+        SELECT MIN(c.lon), MAX(c.lon), MIN(c.lat), MAX(c.lat)
+        FROM way_nodes w JOIN node_coords c ON c.node_id = w.node_id
+        WHERE w.way_id = ?
+        """,
+        (way_id,),
+    ).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return (row[0] + row[1]) / 2.0, (row[2] + row[3]) / 2.0
+
+
+def _set_way(conn, way_id: int, refs: List[int], tags: Dict[str, str], coords: Dict[int, Tuple[float, float]]) -> bool:
+    conn.execute("DELETE FROM way_nodes WHERE way_id = ?", (way_id,))
+    conn.executemany("INSERT INTO way_nodes (way_id, seq, node_id) VALUES (?, ?, ?)", [(way_id, i, r) for i, r in enumerate(refs)])
+    conn.executemany(
+        "INSERT OR REPLACE INTO node_coords (node_id, lon, lat) VALUES (?, ?, ?)",
+        [(r, *coords[r]) for r in refs if r in coords],
+    )
+    center = _way_center(conn, way_id)
+    if center is None:
+        return False
+    _upsert_station(conn, "way", way_id, center[0], center[1], tags)
+    return True
+
+
+def _recenter_ways(conn, way_ids) -> None:
+    for way_id in way_ids:
+        row = conn.execute("SELECT tags FROM stations WHERE osm_type = 'way' AND osm_id = ?", (way_id,)).fetchone()
+        center = _way_center(conn, way_id)
+        if row and center:
+            _upsert_station(conn, "way", way_id, center[0], center[1], json.loads(row[0] or "{}"))
+
+
+# -----------------------------
+# Vollimport
+# -----------------------------
+def _scan_extract_xml(path):
+    """Pass 1: Ladepunkt-Knoten und -Ways; Pass 2: Koordinaten der Way-Knoten."""
+    nodes, ways = [], []
+    for _, el in ET.iterparse(_open(path), events=("end",)):
+        if el.tag == "node":
+            tags = _tags(el)
+            if _is_station(tags):
+                nodes.append((int(el.get("id")), float(el.get("lon")), float(el.get("lat")), tags))
+            el.clear()
+        elif el.tag == "way":
+            tags = _tags(el)
+            if _is_station(tags):
+                ways.append((int(el.get("id")), [int(nd.get("ref")) for nd in el.iter("nd")], tags))
+            el.clear()
+        elif el.tag == "relation":
+            el.clear()
+
+    needed = {r for _, refs, _ in ways for r in refs}
+    coords = {}
+    if needed:
+        for _, el in ET.iterparse(_open(path), events=("end",)):
+            if el.tag == "node":
+                nid = int(el.get("id"))
+                if nid in needed:
+                    coords[nid] = (float(el.get("lon")), float(el.get("lat")))
+            if el.tag in ("node", "way", "relation"):
+                el.clear()
+    return nodes, ways, coords
+
+
+def _scan_extract_pbf(path):
+    try:
+        import osmium  # optional: nur für .pbf nötig
+    except ImportError as e:
+        raise RuntimeError("Reading .osm.pbf requires the 'osmium' package (pip install osmium).") from e
+
+    nodes, ways = [], []
+    for obj in osmium.FileProcessor(str(path)):
+        if not (obj.is_node() or obj.is_way()):
+            continue
+        tags = {t.k: t.v for t in obj.tags}
+        if not _is_station(tags):
+            continue
+        if obj.is_node():
+            nodes.append((obj.id, obj.location.lon, obj.location.lat, tags))
+        else:
+            ways.append((obj.id, [n.ref for n in obj.nodes], tags))
+
+    needed = {r for _, refs, _ in ways for r in refs}
+    coords = {}
+    if needed:
+        for obj in osmium.FileProcessor(str(path), osmium.osm.NODE):
+            if obj.id in needed:
+                coords[obj.id] = (obj.location.lon, obj.location.lat)
+    return nodes, ways, coords
+
+
+def _swap_into(src_path: Path, target: Path) -> None:
+    """
+    Neuen Index über die SQLite-Backup-API in die laufende Datei kopieren: eine Schreib-
+    Transaktion im WAL, offene Leser sehen bis zu ihrem Ende den alten Stand. Dateien
+    (inkl. -wal/-shm) werden nicht ersetzt, SQLite verwaltet sie selbst.
+    """
+    src = get_conn(src_path)
+    dst = get_conn(target)
+    try:
+        src.backup(dst)
+        dst.execute("PRAGMA journal_mode = WAL")
+        dst.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    finally:
+        dst.close()
+        src.close()
+
+
+def import_extract(extract, osm_base: Optional[str] = None, path=None) -> Dict[str, int]:
+    """Baut den Index komplett neu (tmp-Datei, danach als eine Transaktion übernommen)."""
+    target = Path(path or DB_PATH)
+    extract = Path(extract)
+    nodes, ways, coords = (_scan_extract_pbf if extract.name.endswith(".pbf") else _scan_extract_xml)(extract)
+
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    conn = get_conn(tmp)
+    try:
+        for stmt in _SCHEMA:
+            conn.execute(stmt)
+        conn.execute("BEGIN")
+        for osm_id, lon, lat, tags in nodes:
+            _upsert_station(conn, "node", osm_id, lon, lat, tags)
+        unresolved = 0
+        for way_id, refs, tags in ways:
+            unresolved += not _set_way(conn, way_id, refs, tags, coords)
+        _set_meta(conn, "osm_base", osm_base or datetime.fromtimestamp(extract.stat().st_mtime, timezone.utc).isoformat())
+        _set_meta(conn, "imported_from", extract.name)
+        _set_meta(conn, "imported_at", utc_now_iso())
+        _set_meta(conn, "last_diff", None)
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+
+    if target.exists():
+        _swap_into(tmp, target)
+        tmp.unlink(missing_ok=True)
+    else:
+        os.replace(tmp, target)   # noch keine Leser
+    _INITIALIZED.discard(str(target.resolve()))
+    return {"nodes": len(nodes), "ways": len(ways) - unresolved, "unresolved_ways": unresolved}
+
+
+# -----------------------------
+# Diffs
+# -----------------------------
+_STATE_TS = re.compile(r"^timestamp=(.+)$", re.MULTILINE)
+
+
+def _state_timestamp(diff_path: Path) -> Optional[str]:
+    """Replikations-Layout: 123.osc.gz + 123.state.txt (timestamp=2026-01-01T00\\:00\\:00Z)."""
+    name = diff_path.name.split(".")[0]
+    state = diff_path.with_name(f"{name}.state.txt")
+    if not state.exists():
+        return None
+    m = _STATE_TS.search(state.read_text(encoding="utf-8"))
+    return m.group(1).replace("\\", "").strip() if m else None
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    """OSM-/ISO-Zeitstempel (auch nur Datum) -> aware datetime (UTC); ungültig -> None."""
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def _advance_osm_base(conn: sqlite3.Connection, candidate: Optional[str]) -> None:
+    """osm_base nur vorwärts bewegen (ältere Diffs setzen den Stand nie zurück)."""
+    new = _parse_ts(candidate)
+    if new is None:
+        return
+    current = _parse_ts(get_meta(conn, "osm_base"))
+    if current is None or new > current:
+        _set_meta(conn, "osm_base", candidate)
+
+
+def apply_diff(conn: sqlite3.Connection, diff_path) -> Dict[str, int]:
+    """
+    Eine .osc-Datei in einer Transaktion anwenden (Aufrufer hält BEGIN IMMEDIATE).
+    Elemente mit timestamp <= osm_base sind im Index schon enthalten (z.B. Diffs von vor
+    einem Neuimport) und werden übersprungen.
+    """
+    stats = {"created": 0, "updated": 0, "deleted": 0, "moved_way_nodes": 0, "unresolved_ways": 0, "skipped_stale": 0}
+    diff_coords: Dict[int, Tuple[float, float]] = {}
+    dirty_ways: Set[int] = set()
+    base = _parse_ts(get_meta(conn, "osm_base"))
+    max_ts = None
+
+    for action, el in _iter_changes(diff_path):
+        osm_id = int(el.get("id"))
+        ts = _parse_ts(el.get("timestamp"))
+        if ts is not None and base is not None and ts <= base:
+            if el.tag == "node" and action != "delete":
+                diff_coords[osm_id] = (float(el.get("lon")), float(el.get("lat")))   # für neuere Ways
+            stats["skipped_stale"] += 1
+            continue
+        if ts is not None and (max_ts is None or ts > max_ts):
+            max_ts = ts
+
+        if el.tag == "node":
+            if action == "delete":
+                stats["deleted"] += _delete_station(conn, "node", osm_id)
+                continue
+            lon, lat = float(el.get("lon")), float(el.get("lat"))
+            diff_coords[osm_id] = (lon, lat)
+            tags = _tags(el)
+            if _is_station(tags):
+                existed = conn.execute("SELECT 1 FROM stations WHERE osm_type = 'node' AND osm_id = ?", (osm_id,)).fetchone()
+                _upsert_station(conn, "node", osm_id, lon, lat, tags)
+                stats["updated" if existed else "created"] += 1
+            else:
+                stats["deleted"] += _delete_station(conn, "node", osm_id)   # Tag entfernt
+            # Knoten eines Ladepunkt-Ways verschoben?
+            if conn.execute("UPDATE node_coords SET lon = ?, lat = ? WHERE node_id = ?", (lon, lat, osm_id)).rowcount:
+                stats["moved_way_nodes"] += 1
+                dirty_ways.update(r[0] for r in conn.execute("SELECT way_id FROM way_nodes WHERE node_id = ?", (osm_id,)))
+            continue
+
+        # way
+        if action == "delete":
+            stats["deleted"] += _delete_way(conn, osm_id)
+            dirty_ways.discard(osm_id)
+            continue
+        tags = _tags(el)
+        if not _is_station(tags):
+            stats["deleted"] += _delete_way(conn, osm_id)
+            dirty_ways.discard(osm_id)
+            continue
+        existed = conn.execute("SELECT 1 FROM stations WHERE osm_type = 'way' AND osm_id = ?", (osm_id,)).fetchone()
+        if _set_way(conn, osm_id, [int(nd.get("ref")) for nd in el.iter("nd")], tags, diff_coords):
+            stats["updated" if existed else "created"] += 1
+        else:
+            stats["unresolved_ways"] += 1   # Knoten weder im Diff noch im Index bekannt
+        dirty_ways.discard(osm_id)
+
+    _recenter_ways(conn, dirty_ways)
+    _advance_osm_base(conn, _state_timestamp(Path(diff_path)) or (max_ts.isoformat() if max_ts else None))
+    return stats
+
+
+def pending_diffs(diff_dir, last_applied: Optional[str]) -> List[Tuple[str, Path]]:
+    """Alle .osc/.osc.gz unterhalb diff_dir, sortiert nach relativem Pfad, neuer als last_applied."""
+    diff_dir = Path(diff_dir)
+    files = sorted(
+        (p.relative_to(diff_dir).as_posix(), p)
+        for p in diff_dir.rglob("*")
+        if p.is_file() and (p.name.endswith(".osc") or p.name.endswith(".osc.gz"))
+    )
+    return [(rel, p) for rel, p in files if last_applied is None or rel > last_applied]
+
+
+def apply_diffs(diff_dir, path=None) -> Dict[str, int]:
+    """Wendet alle neuen Diffs an (je Datei eine Transaktion, Fortschritt in index_meta)."""
+    init_index(path)
+    conn = get_conn(path)
+    totals = {
+        "files": 0, "skipped_files": 0, "created": 0, "updated": 0, "deleted": 0,
+        "moved_way_nodes": 0, "unresolved_ways": 0, "skipped_stale": 0,
+    }
+    try:
+        for rel, diff_path in pending_diffs(diff_dir, get_meta(conn, "last_diff")):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                state_ts = _parse_ts(_state_timestamp(diff_path))
+                base = _parse_ts(get_meta(conn, "osm_base"))
+                if state_ts is not None and base is not None and state_ts <= base:
+                    # vollständig im Extrakt enthalten: nicht parsen, nur Fortschritt merken
+                    _set_meta(conn, "last_diff", rel)
+                    conn.execute("COMMIT")
+                    totals["skipped_files"] += 1
+                    continue
+                stats = apply_diff(conn, diff_path)
+                _set_meta(conn, "last_diff", rel)
+                _set_meta(conn, "updated_at", utc_now_iso())
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            totals["files"] += 1
+            for k, v in stats.items():
+                totals[k] += v
+    finally:
+        conn.close()
+    return totals
+
+
+# -----------------------------
+# Lesen
+# -----------------------------
+def stations_in_bbox(s, w, n, e, path=None) -> Dict:
+    """Wie competition.fetch_stations(): {"points": ndarray (n, 2), "osm_base", "queried_at"}."""
+    if not exists(path):
+        raise RuntimeError(f"Station index {path or DB_PATH} not found. Build it with: python -m app.cli.stations import <extract>")
+    conn = get_conn(path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT s.lon, s.lat, s.access FROM stations_rtree r JOIN stations s ON s.rid = r.rid
+            WHERE r.min_lon <= ? AND r.max_lon >= ? AND r.min_lat <= ? AND r.max_lat >= ?
+            """,
+            (e, w, n, s),
+        ).fetchall()
+        osm_base = get_meta(conn, "osm_base")
+    finally:
+        conn.close()
+    coords = [(lon, lat) for lon, lat, access in rows if access not in EXCLUDED_ACCESS]
+    return {
+        "points": np.array(coords, dtype=np.float64).reshape(-1, 2),
+        "osm_base": osm_base or "unknown",
+        "queried_at": utc_now_iso(),
+    }
+
+
+def index_stats(path=None) -> Dict:
+    init_index(path)
+    conn = get_conn(path)
+    try:
+        by_type = dict(conn.execute("SELECT osm_type, COUNT(*) FROM stations GROUP BY osm_type").fetchall())
+        meta = dict(conn.execute("SELECT key, value FROM index_meta").fetchall())
+    finally:
+        conn.close()
+    return {"stations": by_type, **meta}
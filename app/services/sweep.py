@@ -0,0 +1,106 @@
+"""
+Minuten-Sweep: Score-Kurve über viele Fahrzeiten (Default 5–30 min, 1-min-Schritte).
+
+Statt jeden Ring komplett neu auszuwerten, wird nur der jeweils hinzugekommene
+Kreisring (Annulus = Ring_k − Ring_k-1) gegen Bevölkerungsraster und Ladepunkte
+gerechnet; Ring_k ergibt sich als kumulierte Summe. Alle Annuli laufen in einem
+population_and_demand_in_areas()-Aufruf, die Ladepunkte kommen aus EINER Abfrage
+für die BBox des größten Rings. Jede Rasterzelle wird so einmal statt bis zu
+26-mal betrachtet.
+
+Nicht exakt verschachtelte Ringe (Provider-Artefakte) zählen als Vereinigung
+der Ringe bis k. Ergebnis hat die Form der Multi-Time-Zeilen (pipeline.multi_time_rows()) (eine Zeile
+je Minute) und wird von stability / report unverändert verarbeitet.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import shapely
+
+from .competition import count_stations_in_areas, density_bucket, load_stations
+from .isochrone import as_isochrone
+from .population import population_and_demand_in_areas
+from .scoring import DEFAULT_SCORING, ScoringConfig, score_batch_scores
+
+SWEEP_MIN_MINUTES = int(os.getenv("SWEEP_MIN_MINUTES", "5"))
+SWEEP_MAX_MINUTES = int(os.getenv("SWEEP_MAX_MINUTES", "30"))
+SWEEP_STEP_MINUTES = int(os.getenv("SWEEP_STEP_MINUTES", "1"))
+
+
+def sweep_minutes() -> List[int]:
+    return list(range(SWEEP_MIN_MINUTES, SWEEP_MAX_MINUTES + 1, max(1, SWEEP_STEP_MINUTES)))
+
+
+def annuli(geoms) -> np.ndarray:
+    """
+    Ring_0, Ring_1 − Ring_0, ... für aufsteigend sortierte Ringe. Ragt ein kleinerer
+    Ring über den nächsten hinaus, wird gegen die Vereinigung der kleineren Ringe
+    gerechnet, sonst würde der Überstand mehrfach gezählt.
+    """
+    geoms = list(geoms)
+    if len(geoms) < 2:
+        return np.asarray(geoms, dtype=object)
+    nested = [geoms[0]]
+    for g in geoms[1:]:
+        prev = nested[-1]
+        nested.append(g if shapely.contains(g, prev) else shapely.union(g, prev))
+    nested = np.asarray(nested, dtype=object)
+    return np.concatenate([nested[:1], shapely.difference(nested[1:], nested[:-1])])
+
+
+def sweep_features(point, isochrones: Dict[int, Any]) -> List[Dict[str, Any]]:
+    """Bevölkerung/Nachfrage/Ladepunkte je Minute (ohne Score, Vertical-unabhängig)."""
+    minutes = sorted(isochrones)
+    if not minutes:
+        return []
+    rings = [as_isochrone(isochrones[m]).analysis_geom for m in minutes]
+    parts = annuli(rings)
+
+    pop_parts, demand_parts = population_and_demand_in_areas(parts, [point] * len(parts), rounded=False)
+    population = np.rint(np.cumsum(pop_parts))
+    demand = np.rint(np.cumsum(demand_parts))
+
+    minx, miny, maxx, maxy = shapely.total_bounds(rings)
+    error = None
+    try:
+        fetched = load_stations(miny, minx, maxy, maxx)
+        stations = np.cumsum(count_stations_in_areas(parts, fetched["points"]))
+    except RuntimeError as err:
+        print("[WARN] station source failed for minute sweep, stations=None. Last error:", err)
+        fetched, error = {}, str(err)
+        stations = np.full(len(minutes), np.nan)
+
+    rows = []
+    for i, m in enumerate(minutes):
+        st = None if np.isnan(stations[i]) else int(stations[i])
+        rows.append({
+            "minutes": m,
+            "population": int(population[i]),
+            "demand": int(demand[i]),
+            "stations": st,
+            "density": "unknown" if st is None else density_bucket(st),
+            "osm_base": fetched.get("osm_base"),
+            "queried_at": fetched.get("queried_at"),
+            "error": error,
+        })
+    return rows
+
+
+def score_sweep(rows: List[Dict[str, Any]], cfg: Optional[ScoringConfig] = None) -> List[Dict[str, Any]]:
+    """Score je Minute in einem vektorisierten Aufruf (cfg: Gewichte des Verticals)."""
+    if not rows:
+        return []
+    cfg = cfg or DEFAULT_SCORING
+    scores = score_batch_scores(
+        [r["population"] for r in rows],
+        [r["stations"] for r in rows],
+        [r["demand"] for r in rows] if cfg.use_demand else None,
+        cfg,
+    )
+    return [{**r, "score": int(sc)} for r, sc in zip(rows, scores)]
+
+
+def sweep_curve(point, isochrones: Dict[int, Any], cfg: Optional[ScoringConfig] = None) -> List[Dict[str, Any]]:
+    """Score-Kurve über alle übergebenen Ringe (Minuten -> Isochrone)."""
+    return score_sweep(sweep_features(point, isochrones), cfg)
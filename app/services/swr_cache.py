@@ -0,0 +1,202 @@
+"""
+Stale-While-Revalidate-Cache (SQLite) für Upstream-Daten (Isochronen, Ladepunkte).
+
+Alter eines Eintrags:
+  < soft_ttl             frisch -> direkt ausliefern
+  soft_ttl .. hard_ttl   veraltet -> sofort ausliefern, Refresh läuft im Hintergrund
+  >= hard_ttl / fehlt    synchron holen; scheitert der Upstream, wird ein vorhandener
+                         (abgelaufener) Eintrag trotzdem geliefert (stale-if-error)
+
+Die Werte enthalten ihre eigenen Datenstände (osm_base, queried_at), ausgeliefert
+wird also immer der Stand der gecachten Daten.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import cache_event
+
+BASE_DIR = Path(__file__).resolve().parents[1]          # .../app
+DB_PATH = Path(os.getenv("SWR_CACHE_PATH", str(BASE_DIR / "data" / "swr_cache.sqlite")))
+ENABLED = os.getenv("SWR_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+REFRESH_WORKERS = int(os.getenv("SWR_REFRESH_WORKERS", "2"))
+
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=max(1, REFRESH_WORKERS), thread_name_prefix="swr-refresh")
+_IN_FLIGHT: set = set()
+_IN_FLIGHT_LOCK = threading.Lock()
+_INIT_LOCK = threading.Lock()
+_INITIALIZED = False
+
+
+@dataclass
+class Entry:
+    value: Any
+    fetched_at: float
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.fetched_at
+
+
+def get_conn() -> sqlite3.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(DB_PATH), timeout=10)
+    conn.execute("PRAGMA busy_timeout = 10000")
+    return conn
+
+
+def init_cache() -> None:
+    global _INITIALIZED
+    if _INITIALIZED:
+        return
+    with _INIT_LOCK:
+        if _INITIALIZED:
+            return
+        with get_conn() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS swr_cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """)
+            conn.commit()
+        _INITIALIZED = True
+
+
+def lookup(namespace: str, key: str) -> Optional[Entry]:
+    if not ENABLED:
+        return None
+    init_cache()
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT value, fetched_at FROM swr_cache WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+    return Entry(json.loads(row[0]), row[1]) if row else None
+
+
+def lookup_many(namespace: str, keys: List[str]) -> Dict[str, Optional[Entry]]:
+    """Mehrere Schlüssel in einer Abfrage (z.B. Ladepunkt-Kacheln einer BBox)."""
+    out: Dict[str, Optional[Entry]] = {k: None for k in keys}
+    if not ENABLED or not keys:
+        return out
+    init_cache()
+    with get_conn() as conn:
+        for i in range(0, len(keys), 500):   # SQLite-Limit für Platzhalter
+            chunk = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, value, fetched_at FROM swr_cache WHERE namespace = ? AND key IN ({','.join('?' * len(chunk))})",
+                (namespace, *chunk),
+            ).fetchall()
+            for key, value, fetched_at in rows:
+                out[key] = Entry(json.loads(value), fetched_at)
+    return out
+
+
+def store(namespace: str, key: str, value: Any, fetched_at: Optional[float] = None) -> None:
+    if not ENABLED:
+        return
+    init_cache()
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO swr_cache (namespace, key, value, fetched_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False), time.time() if fetched_at is None else fetched_at),
+        )
+        conn.commit()
+
+
+def store_many(namespace: str, items: Dict[str, Any], fetched_at: Optional[float] = None) -> None:
+    """Mehrere Einträge in einer Transaktion."""
+    if not ENABLED or not items:
+        return
+    init_cache()
+    ts = time.time() if fetched_at is None else fetched_at
+    with get_conn() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO swr_cache (namespace, key, value, fetched_at) VALUES (?, ?, ?, ?)",
+            [(namespace, k, json.dumps(v, ensure_ascii=False), ts) for k, v in items.items()],
+        )
+        conn.commit()
+
+
+def purge_other_keys(namespace: str, keep_prefix: str) -> int:
+    """Löscht Einträge des Namespace, deren Schlüssel nicht mit keep_prefix beginnt (altes Schlüsselformat)."""
+    if not ENABLED:
+        return 0
+    init_cache()
+    with get_conn() as conn:
+        n = conn.execute(
+            "DELETE FROM swr_cache WHERE namespace = ? AND substr(key, 1, ?) != ?",
+            (namespace, len(keep_prefix), keep_prefix),
+        ).rowcount
+        conn.commit()
+    return n
+
+
+def refresh_async(namespace: str, key: str, refresh: Callable[[], None]) -> bool:
+    """Startet refresh() im Hintergrund, höchstens einmal gleichzeitig pro (namespace, key)."""
+    token = (namespace, key)
+    with _IN_FLIGHT_LOCK:
+        if token in _IN_FLIGHT:
+            return False
+        _IN_FLIGHT.add(token)
+
+    def run():
+        try:
+            refresh()
+        except Exception as e:
+            print(f"[WARN] background refresh failed ({namespace}): {e}")
+        finally:
+            with _IN_FLIGHT_LOCK:
+                _IN_FLIGHT.discard(token)
+
+    _REFRESH_POOL.submit(run)
+    return True
+
+
+def classify(entry: Optional[Entry], soft_ttl_s: float, hard_ttl_s: float) -> str:
+    """fresh | stale | expired | missing"""
+    if entry is None:
+        return "missing"
+    age = entry.age_s
+    if age < soft_ttl_s:
+        return "fresh"
+    if age < hard_ttl_s:
+        return "stale"
+    return "expired"
+
+
+def swr(namespace: str, key: str, fetch: Callable[[], Any], soft_ttl_s: float, hard_ttl_s: float) -> Any:
+    """Ein Schlüssel, ein Upstream-Aufruf (siehe Modul-Docstring)."""
+    entry = lookup(namespace, key)
+    state = classify(entry, soft_ttl_s, hard_ttl_s)
+
+    if state == "fresh":
+        cache_event(namespace, True)
+        return entry.value
+
+    if state == "stale":
+        cache_event(namespace, True, stale=True)
+        refresh_async(namespace, key, lambda: store(namespace, key, fetch()))
+        return entry.value
+
+    cache_event(namespace, False)
+    try:
+        value = fetch()
+    except Exception as e:
+        if entry is None:
+            raise
+        print(f"[WARN] {namespace} upstream failed, serving expired cache entry ({entry.age_s:.0f}s old): {e}")
+        return entry.value
+    store(namespace, key, value)
+    return value
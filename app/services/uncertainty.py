@@ -0,0 +1,147 @@
+"""
+Monte-Carlo-Unsicherheit des Scores (ergänzt das LOW/MEDIUM/HIGH aus confidence.py).
+
+Je Ziehung werden die Eingaben gestört und alle Ziehungen in EINEM
+score_batch_scores()-Aufruf bewertet:
+
+  Fahrzeit     Minuten · (1 + N(0, MC_MINUTES_SIGMA)) – Bevölkerung/Ladepunkte aus der
+               Multi-Time/Sweep-Kurve interpoliert, sonst ∝ Fläche ∝ Minuten²
+  Geocoding    Bevölkerung · LogN(0, σ), σ größer bei Fallback-Geocoding. Vereinfachung:
+               der Versatz wirkt nur als Faktor auf Bevölkerung/Nachfrage, die Ladepunkte
+               im verschobenen Einzugsgebiet werden nicht gestört
+  Raster       Bevölkerung · LogN(0, MC_POP_GRID_SIGMA) (Fehler des Bevölkerungsrasters)
+  OSM          Ladepunkte ~ Poisson(n · (1 + Fehlquote)), Fehlquote wächst mit dem Alter
+               von osm_base zum Abfragezeitpunkt der Ladepunkte (as_of = queried_at);
+               unbekannte Ladepunkte bleiben unbekannt
+
+Der Zufallsgenerator ist aus den Eingaben geseedet und die Datenalter beziehen sich
+auf as_of statt auf die aktuelle Uhrzeit: gleiche Analyse, gleiches Ergebnis
+(wichtig für Render-Cache und reproduzierbare Reports).
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .scoring import DEFAULT_SCORING, ScoringConfig, decision_labels, score_batch_scores
+
+MC_DRAWS = int(os.getenv("MC_DRAWS", "4000"))
+MC_MINUTES_SIGMA = float(os.getenv("MC_MINUTES_SIGMA", "0.10"))     # Verkehr / Routing-Modell
+MC_GEOCODE_SIGMA = float(os.getenv("MC_GEOCODE_SIGMA", "0.03"))
+MC_GEOCODE_FALLBACK_SIGMA = float(os.getenv("MC_GEOCODE_FALLBACK_SIGMA", "0.12"))
+MC_POP_GRID_SIGMA = float(os.getenv("MC_POP_GRID_SIGMA", "0.10"))
+MC_OSM_MISSING_RATE = float(os.getenv("MC_OSM_MISSING_RATE", "0.05"))         # fehlende Ladepunkte in OSM
+MC_OSM_MISSING_PER_YEAR = float(os.getenv("MC_OSM_MISSING_PER_YEAR", "0.10"))  # + je Jahr Alter von osm_base
+PERCENTILES = (5, 25, 50, 75, 95)
+DECISIONS = ("GO", "CHECK", "NO-GO")
+
+
+def _seed(*inputs) -> int:
+    payload = json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(payload).digest()[:8], "little")
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    try:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def _osm_age_years(osm_base: Optional[str], as_of: Optional[str] = None) -> float:
+    """Alter von osm_base zum Zeitpunkt as_of (queried_at); ohne as_of: jetzt."""
+    ts = _parse_ts(osm_base)
+    if ts is None:
+        return 0.0
+    ref = _parse_ts(as_of) if as_of is not None else None
+    ref = ref or datetime.now(timezone.utc)
+    return max((ref - ts).total_seconds() / (365.25 * 86400), 0.0)
+
+
+def _curve(multi_results: Optional[List[Dict]], key: str):
+    """(minutes[], values[]) aus Multi-Time/Sweep-Zeilen mit Wert, sonst None."""
+    rows = sorted(
+        (r for r in multi_results or [] if r.get(key) is not None and r.get("minutes") is not None),
+        key=lambda r: r["minutes"],
+    )
+    if len(rows) < 2:
+        return None
+    return np.array([r["minutes"] for r in rows], dtype=np.float64), np.array([r[key] for r in rows], dtype=np.float64)
+
+
+def _at_minutes(base: float, minutes: float, draws_min: np.ndarray, curve) -> np.ndarray:
+    """Wert bei gestörter Fahrzeit: Kurve (linear, Ränder per Minuten²-Skalierung) oder base · (t / t0)²."""
+    if curve is None:
+        return base * (draws_min / minutes) ** 2
+    xs, ys = curve
+    # Kurve auf base normieren (base gehört zum tatsächlich gewählten Ring)
+    at_base = np.interp(minutes, xs, ys)
+    scale = base / at_base if at_base > 0 else 1.0
+    inner = np.interp(draws_min, xs, ys) * scale
+    lo = draws_min < xs[0]
+    hi = draws_min > xs[-1]
+    inner[lo] = ys[0] * scale * (draws_min[lo] / xs[0]) ** 2
+    inner[hi] = ys[-1] * scale * (draws_min[hi] / xs[-1]) ** 2
+    return inner
+
+
+def score_uncertainty(
+    population,
+    stations,
+    minutes: int,
+    demand=None,
+    multi_results: Optional[List[Dict]] = None,
+    geocode_meta: Optional[Dict] = None,
+    osm_base: Optional[str] = None,
+    as_of: Optional[str] = None,
+    draws: int = MC_DRAWS,
+    cfg: Optional[ScoringConfig] = None,
+) -> Dict[str, Any]:
+    """
+    Score-Verteilung über `draws` gestörte Eingaben.
+    Rückgabe: Perzentile, Mittelwert, Entscheidungs-Wahrscheinlichkeiten und
+    flip_probability (Anteil der Ziehungen mit anderer Entscheidung als der Punktschätzung).
+    as_of: Bezugszeit für das Alter von osm_base (queried_at der Ladepunkte).
+    """
+    fallback = (geocode_meta or {}).get("fallback_used") is True
+    seed_inputs = (population, stations, demand, minutes, fallback, osm_base, multi_results, draws)
+    if cfg is not None and cfg != DEFAULT_SCORING:
+        seed_inputs += (cfg,)   # Default-Gewichte: gleicher Seed wie ohne cfg
+    rng = np.random.default_rng(_seed(*seed_inputs))
+
+    base_pop = float(population or 0)
+    draws_min = minutes * np.clip(1.0 + rng.normal(0.0, MC_MINUTES_SIGMA, draws), 0.3, None)
+
+    geo_sigma = MC_GEOCODE_FALLBACK_SIGMA if fallback else MC_GEOCODE_SIGMA
+    pop_factor = np.exp(rng.normal(0.0, geo_sigma, draws) + rng.normal(0.0, MC_POP_GRID_SIGMA, draws))
+    pop = _at_minutes(base_pop, minutes, draws_min, _curve(multi_results, "population")) * pop_factor
+
+    dem = None
+    if demand is not None:
+        dem = _at_minutes(float(demand), minutes, draws_min, _curve(multi_results, "demand")) * pop_factor
+
+    if stations is None:
+        st = np.full(draws, np.nan)
+    else:
+        st_at = _at_minutes(float(stations), minutes, draws_min, _curve(multi_results, "stations"))
+        missing = MC_OSM_MISSING_RATE + MC_OSM_MISSING_PER_YEAR * _osm_age_years(osm_base, as_of)
+        st = rng.poisson(np.maximum(st_at, 0.0) * (1.0 + missing)).astype(np.float64)
+
+    base_score = int(score_batch_scores([base_pop], [stations], None if demand is None else [demand], cfg)[0])
+    scores = score_batch_scores(pop, st, dem, cfg)
+    decisions = decision_labels(scores)
+    base_decision = decision_labels([base_score])[0]
+
+    pct = np.percentile(scores, PERCENTILES)
+    return {
+        "draws": int(draws),
+        "score": base_score,
+        "mean": round(float(scores.mean()), 1),
+        "percentiles": {f"p{p}": int(round(v)) for p, v in zip(PERCENTILES, pct)},
+        "decision_probabilities": {d: round(float(np.mean(decisions == d)), 3) for d in DECISIONS},
+        "flip_probability": round(float(np.mean(decisions != base_decision)), 3),
+    }
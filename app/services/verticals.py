@@ -1,8 +1,18 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Literal
 
+from .scoring import DEFAULT_SCORING, ScoringConfig
+
 Vertical = Literal["ev_charging"]
 
+# Fahrprofile -> Minuten (gilt für alle Verticals)
+PROFILE_MINUTES: Dict[str, int] = {
+    "urban": 8,
+    "daily": 15,
+    "destination": 25,
+    "rural": 30,
+}
+
 @dataclass(frozen=True)
 class VerticalConfig:
     key: str
@@ -11,6 +21,8 @@ class VerticalConfig:
     pdf_subtitle: str
     default_profile: str
     allow_multi_time_plans: set
+    # Gewichte fürs Scoring; Features (Bevölkerung, Wettbewerb, ...) sind Vertical-unabhängig
+    scoring: ScoringConfig = field(default=DEFAULT_SCORING)
 
 VERTICALS: Dict[str, VerticalConfig] = {
     "ev_charging": VerticalConfig(
@@ -24,4 +36,4 @@ VERTICALS: Dict[str, VerticalConfig] = {
 }
 
 def get_vertical_config(vertical: str) -> VerticalConfig:
-    return VERTICALS.get(vertical, VERTICALS["ev_charging"])
\ No newline at end of file
+    return VERTICALS.get(vertical, VERTICALS["ev_charging"])
@@ -0,0 +1,92 @@
+"""
+Warmup beim Start: lädt nur, was der Deployment-Modus braucht (WARMUP_MODE).
+
+  none    nichts (Default; alles wird beim ersten Request lazy geladen)
+  api     Projektionen, Bevölkerungsraster + Spatial Index, lokaler Routing-Graph, KD-Tree (scipy)
+  render  reportlab + Render-Worker-Prozesse
+  full    api + render + stripe
+
+Fehler einzelner Schritte werden gemeldet, brechen den Start aber nicht ab.
+"""
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+
+def _warm_projections() -> None:
+    from .competition_metrics import _to_metric as _competition_metric
+    from .isochrone import _to_web_mercator
+    from .scan import _to_metric, _to_wgs84
+    _to_web_mercator(), _to_metric(), _to_wgs84(), _competition_metric()
+
+
+def _warm_population() -> None:
+    from .population import _cell_areas, _cell_xy, _load_grid, _to_distance_crs
+    _load_grid().sindex   # Spatial Index wird sonst beim ersten Query gebaut
+    _cell_areas(), _cell_xy(), _to_distance_crs()
+
+
+def _warm_routing() -> None:
+    from .isochrone import get_provider
+    if get_provider().key != "local":
+        return
+    from .routing import load_graph
+    graph = load_graph()
+    graph.matrix
+    graph.snap(float(graph.lon[0]), float(graph.lat[0]))   # baut KD-Tree + metrische Koordinaten
+
+
+def _warm_kdtree() -> None:
+    from scipy.spatial import cKDTree  # noqa: F401  (Wettbewerbskennzahlen, competition_metrics.py)
+
+
+def _warm_report() -> None:
+    from . import report  # noqa: F401  (Styles/Fonts)
+
+
+def _warm_render_pool() -> None:
+    from .render import warm_pool
+    warm_pool()
+
+
+def _warm_stripe() -> None:
+    import stripe  # noqa: F401
+
+
+STEPS: Dict[str, Callable[[], None]] = {
+    "projections": _warm_projections,
+    "population": _warm_population,
+    "routing": _warm_routing,
+    "kdtree": _warm_kdtree,
+    "report": _warm_report,
+    "render_pool": _warm_render_pool,
+    "stripe": _warm_stripe,
+}
+
+WARMUP_MODES: Dict[str, Tuple[str, ...]] = {
+    "none": (),
+    "api": ("projections", "population", "routing", "kdtree"),
+    "render": ("report", "render_pool"),
+    "full": ("projections", "population", "routing", "kdtree", "report", "render_pool", "stripe"),
+}
+
+
+def run_warmup(mode: Optional[str] = None) -> Dict[str, float]:
+    """Führt die Schritte des Modus aus; Rückgabe: Sekunden je Schritt."""
+    mode = (mode or os.getenv("WARMUP_MODE", "none")).strip().lower()
+    if mode not in WARMUP_MODES:
+        print(f"[WARN] unknown WARMUP_MODE={mode!r}, skipping warmup (available: {sorted(WARMUP_MODES)})")
+        return {}
+
+    timings = {}
+    for name in WARMUP_MODES[mode]:
+        t0 = time.perf_counter()
+        try:
+            STEPS[name]()
+        except Exception as e:
+            print(f"[WARN] warmup step {name} failed: {e}")
+        timings[name] = round(time.perf_counter() - t0, 3)
+
+    if timings:
+        print(f"[WARMUP] mode={mode} " + " ".join(f"{k}={v}s" for k, v in timings.items()))
+    return timings
@@ -0,0 +1,42 @@
+"""
+Benchmark: Renderzeit des Compare-PDFs in Abhängigkeit der Standortanzahl.
+
+    python -m bench.compare_pdf [N ...]
+
+Erwartung: Zeit pro Zeile bleibt (annähernd) konstant -> lineare Skalierung.
+"""
+import sys
+import time
+
+from app.services.report import compare_report_inputs, render_pdf_bytes
+
+DEFAULT_SIZES = [50, 250, 500, 1000, 2000, 4000]
+
+
+def synthetic_results(n: int) -> list[dict]:
+    return [
+        {
+            "address": f"Musterstraße {i}, 80331 München",
+            "score": (i * 37) % 100,
+            "population": 1000 + i * 137,
+            "stations": i % 23,
+            "density": "medium",
+            "confidence": "high",
+            "competition": {"osm_base": "2026-01-01T00:00:00Z"},
+        }
+        for i in range(n)
+    ]
+
+
+def run(sizes) -> None:
+    print(f"{'n':>6} {'seconds':>9} {'ms/row':>8} {'kB':>8}")
+    for n in sizes:
+        inputs = compare_report_inputs(synthetic_results(n), 15)
+        t0 = time.perf_counter()
+        pdf = render_pdf_bytes(inputs)
+        dt = time.perf_counter() - t0
+        print(f"{n:>6} {dt:>9.3f} {1000 * dt / n:>8.3f} {len(pdf) / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,146 @@
+"""
+Upstream-Fixtures (ORS, Overpass, Nominatim) aufzeichnen und abspielen.
+
+Alle Services rufen `requests.get/post` auf; diese landen in
+HTTPAdapter.send(). Dort hängt sich der Fixture-Transport ein:
+
+  - record: echter Request, Antwort wird unter fixtures/<key>.json abgelegt
+  - replay: Antwort kommt aus der Fixture, kein Netzwerk (fehlt sie -> FixtureMissing)
+
+key = sha256(method, url ohne api_key, body). Header (Authorization) gehen nicht ein.
+"""
+import base64
+import hashlib
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_DIR = Path(__file__).resolve().parent / "fixtures"
+_SECRET_PARAMS = {"api_key", "key", "token"}
+
+
+class FixtureMissing(RuntimeError):
+    pass
+
+
+def _normalized_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in _SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def fixture_key(request: requests.PreparedRequest) -> str:
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    h = hashlib.sha256()
+    h.update(request.method.encode("ascii"))
+    h.update(b"\0" + _normalized_url(request.url).encode("utf-8") + b"\0")
+    h.update(body)
+    return h.hexdigest()
+
+
+def _upstream_name(url: str) -> str:
+    host = urlsplit(url).netloc
+    if "openrouteservice" in host:
+        return "ors"
+    if "overpass" in host:
+        return "overpass"
+    if "nominatim" in host:
+        return "nominatim"
+    return host
+
+
+def _to_fixture(request: requests.PreparedRequest, resp: requests.Response, elapsed_s: float) -> dict:
+    return {
+        "upstream": _upstream_name(request.url),
+        "method": request.method,
+        "url": _normalized_url(request.url),
+        "status": resp.status_code,
+        "headers": {k: v for k, v in resp.headers.items() if k.lower() in ("content-type", "content-encoding")},
+        "body_b64": base64.b64encode(resp.content).decode("ascii"),
+        "elapsed_s": round(elapsed_s, 4),
+    }
+
+
+def _from_fixture(request: requests.PreparedRequest, fx: dict) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = fx["status"]
+    resp.headers = CaseInsensitiveDict(fx.get("headers") or {})
+    resp.headers.pop("content-encoding", None)   # Body liegt bereits dekodiert vor
+    resp._content = base64.b64decode(fx["body_b64"])
+    resp.url = request.url
+    resp.request = request
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    return resp
+
+
+class FixtureTransport:
+    def __init__(self, directory=DEFAULT_DIR, mode: str = "replay", latency: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown fixture mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency = latency          # replay: aufgezeichnete Upstream-Latenz nachbilden
+        self.hits = 0
+        self.recorded = 0
+        self._orig_send = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def send(self, adapter: HTTPAdapter, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        path = self._path(fixture_key(request))
+
+        if self.mode == "replay":
+            if not path.exists():
+                raise FixtureMissing(f"No fixture for {request.method} {_normalized_url(request.url)} ({path.name})")
+            fx = json.loads(path.read_text(encoding="utf-8"))
+            if self.latency:
+                time.sleep(fx.get("elapsed_s", 0.0))
+            self.hits += 1
+            return _from_fixture(request, fx)
+
+        t0 = time.perf_counter()
+        resp = self._orig_send(adapter, request, **kwargs)
+        elapsed = time.perf_counter() - t0
+        fx = _to_fixture(request, resp, elapsed)   # resp.content liest den Body vollständig
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(fx, ensure_ascii=False), encoding="utf-8")
+        self.recorded += 1
+        return resp
+
+    def install(self) -> None:
+        self._orig_send = HTTPAdapter.send
+        transport = self
+
+        def send(adapter, request, **kwargs):
+            return transport.send(adapter, request, **kwargs)
+
+        HTTPAdapter.send = send
+
+    def uninstall(self) -> None:
+        if self._orig_send is not None:
+            HTTPAdapter.send = self._orig_send
+            self._orig_send = None
+
+
+@contextmanager
+def fixtures(directory=DEFAULT_DIR, mode: str = "replay", latency: bool = False) -> Iterator[Optional[FixtureTransport]]:
+    """mode: record | replay | live (live = kein Eingriff)."""
+    if mode == "live":
+        yield None
+        return
+    transport = FixtureTransport(directory, mode, latency)
+    transport.install()
+    try:
+        yield transport
+    finally:
+        transport.uninstall()
@@ -0,0 +1,183 @@
+"""
+Offline-Benchmark der Analyse-Pipeline.
+
+    # 1) einmalig live aufzeichnen (ORS_API_KEY nötig)
+    python -m bench.run --mode record --scenarios analyze compare
+    # 2) reproduzierbar ohne Netzwerk abspielen
+    python -m bench.run --mode replay --repeat 50
+
+Szenarien:
+  analyze     run_analysis() je Adresse
+  compare     analyze_many_for_compare() mit --compare-n Adressen
+  population  population_in_area() für Isochronen verschiedener Größe (--minutes)
+  pdf         render_pdf_bytes() eines Einzelreports (ohne Render-Cache)
+
+Bevölkerung: --grid <gpkg> oder ein synthetisches Raster (bench.synthetic, --cell-deg).
+Caches: Geocode-, SWR- und Render-Cache liegen je Lauf in einem Temp-Verzeichnis, der
+Feature-Speicher ist aus, der Feature-Cache wird vor jedem Szenario geleert.
+Ausgabe: Latenz-Perzentile (ms) und Durchsatz je Szenario, optional als JSON (--json).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from .fixtures import DEFAULT_DIR, fixtures
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_ADDRESSES = BENCH_DIR / "addresses.txt"
+SCENARIOS = ("analyze", "compare", "population", "pdf")
+PERCENTILES = (50, 90, 95, 99)
+
+
+def load_addresses(path) -> List[str]:
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [a.strip() for a in lines if a.strip() and not a.lstrip().startswith("#")]
+
+
+def measure(fn: Callable[[int], None], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    t_start = time.perf_counter()
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - t_start
+
+    ms = np.array(samples) * 1000.0
+    stats = {"n": repeat, "mean_ms": float(ms.mean()), "max_ms": float(ms.max())}
+    for p in PERCENTILES:
+        stats[f"p{p}_ms"] = float(np.percentile(ms, p))
+    stats["ops_per_s"] = repeat / wall if wall > 0 else float("inf")
+    return stats
+
+
+def _bench_analyze(main, addresses, args):
+    def op(i):
+        main.run_analysis(main.LocationRequest(address=addresses[i % len(addresses)], minutes=args.minutes[0]))
+    return {"analyze": measure(op, args.repeat)}
+
+
+def _bench_compare(main, addresses, args):
+    picked = [addresses[i % len(addresses)] for i in range(max(2, args.compare_n))]
+    req = main.CompareRequest(addresses=picked, minutes=args.minutes[0])
+
+    def op(i):
+        main.analyze_many_for_compare(req.addresses, req)
+    return {f"compare[n={len(picked)}]": measure(op, max(1, args.repeat // 5))}
+
+
+def _bench_population(main, addresses, args):
+    from app.services.population import _load_grid, population_in_areas
+    from app.services.scan import approx_isochrones
+
+    minx, miny, maxx, maxy = _load_grid().total_bounds
+    centre = np.array([[(minx + maxx) / 2, (miny + maxy) / 2]])
+
+    out = {}
+    for minutes in args.minutes:
+        circles, _ = approx_isochrones(centre, minutes)
+        out[f"population[{minutes}min]"] = measure(lambda i: population_in_areas(circles), args.repeat)
+    return out
+
+
+def _bench_pdf(main, addresses, args):
+    from app.services.report import render_pdf_bytes, report_inputs
+
+    multi = [
+        {"minutes": m, "population": 40_000 * k, "stations": 4 * k, "density": "low", "score": 50 + 5 * k}
+        for k, m in enumerate((10, 15, 20), start=1)
+    ]
+    inputs = report_inputs(
+        "Marienplatz 1, 80331 München", 72, "Benchmark-Report.", 120_000,
+        {"stations": 12, "density": "medium", "osm_base": "2026-01-01T00:00:00Z", "queried_at": None},
+        15, multi_results=multi, confidence="HIGH",
+        geocode_meta={"matched_query": "Marienplatz 1", "fallback_used": False},
+    )
+    return {"pdf": measure(lambda i: render_pdf_bytes(inputs), args.repeat)}
+
+
+RUNNERS = {
+    "analyze": _bench_analyze,
+    "compare": _bench_compare,
+    "population": _bench_population,
+    "pdf": _bench_pdf,
+}
+
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    cols = ["n", "mean_ms"] + [f"p{p}_ms" for p in PERCENTILES] + ["max_ms", "ops_per_s"]
+    width = max(len(k) for k in results) if results else 10
+    print(f"{'scenario':<{width}} " + " ".join(f"{c:>10}" for c in cols))
+    for name, stats in results.items():
+        cells = [f"{stats[c]:>10.0f}" if c == "n" else f"{stats[c]:>10.2f}" for c in cols]
+        print(f"{name:<{width}} " + " ".join(cells))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Offline-Benchmark (Fixtures statt Live-Upstreams).")
+    ap.add_argument("--mode", choices=("replay", "record", "live"), default="replay")
+    ap.add_argument("--fixtures", default=str(DEFAULT_DIR))
+    ap.add_argument("--latency", action="store_true", help="replay: aufgezeichnete Upstream-Latenz nachbilden")
+    ap.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    ap.add_argument("--addresses", default=str(DEFAULT_ADDRESSES))
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--compare-n", type=int, default=10)
+    ap.add_argument("--minutes", nargs="+", type=int, default=[15, 5, 10, 20, 30])
+    ap.add_argument("--grid", help="Bevölkerungsraster (GPKG); sonst synthetisch")
+    ap.add_argument("--cell-deg", type=float, default=0.01, help="Zellgröße des synthetischen Rasters")
+    ap.add_argument("--provider", choices=("ors", "local"), help="Isochronen-Provider (ISOCHRONE_PROVIDER)")
+    ap.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_"))
+    if args.grid:
+        os.environ["POPULATION_GPKG"] = args.grid
+    else:
+        from .synthetic import make_grid
+        grid_path = tmp / "population_grid.gpkg"
+        cells = make_grid(grid_path, cell_deg=args.cell_deg)
+        os.environ["POPULATION_GPKG"] = str(grid_path)
+        print(f"[bench] synthetic grid: {cells} cells")
+    if args.provider:
+        os.environ["ISOCHRONE_PROVIDER"] = args.provider
+    os.environ.setdefault("STRIPE_SECRET_KEY", "sk_bench_dummy")
+    os.environ.setdefault("PDF_RENDER_CACHE_DIR", str(tmp / "render_cache"))
+    os.environ["SWR_CACHE_PATH"] = str(tmp / "swr_cache.sqlite")   # nicht den Cache des Entwicklers
+    os.environ["FEATURE_STORE"] = "0"
+
+    # erst nach den Env-Variablen importieren (Module lesen sie beim Import)
+    from app import main as app_main
+    from app.services import feature_store, geocode_cache, pipeline, population, swr_cache
+    population.DATA_GPKG = os.environ["POPULATION_GPKG"]   # falls population schon importiert war
+    geocode_cache.DB_PATH = tmp / "geocode_cache.sqlite"   # kalter Geocode-Cache je Lauf
+    swr_cache.DB_PATH = Path(os.environ["SWR_CACHE_PATH"])  # dito, falls schon importiert
+    swr_cache._INITIALIZED = False
+    feature_store.FEATURE_STORE = False
+
+    addresses = load_addresses(args.addresses)
+    results: Dict[str, Dict[str, float]] = {}
+    with fixtures(args.fixtures, args.mode, args.latency) as transport:
+        for name in args.scenarios:
+            print(f"[bench] {name} ...", file=sys.stderr)
+            pipeline._CACHE.clear()   # Szenarien unabhängig voneinander
+            results.update(RUNNERS[name](app_main, addresses, args))
+        if transport is not None:
+            print(f"[bench] fixtures: {transport.hits} replayed, {transport.recorded} recorded", file=sys.stderr)
+
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
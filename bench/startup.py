@@ -0,0 +1,90 @@
+"""
+Startzeit der API messen (frischer Interpreter je Lauf).
+
+    python -m bench.startup [--runs 5] [--modes none api render full]
+
+Misst je WARMUP_MODE die Zeit für `import app.main` + run_warmup() und listet
+die teuersten Importe (python -X importtime).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from app.services.warmup import run_warmup
+run_warmup({mode!r})
+t2 = time.perf_counter()
+print("RESULT", t1 - t0, t2 - t1)
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("STRIPE_SECRET_KEY", "sk_startup_bench")
+    env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure(mode: str, runs: int):
+    imports, warmups = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _SNIPPET.format(mode=mode)],
+            cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+        ).stdout
+        line = next(l for l in out.splitlines() if l.startswith("RESULT"))
+        _, t_import, t_warm = line.split()
+        imports.append(float(t_import))
+        warmups.append(float(t_warm))
+    return statistics.median(imports), statistics.median(warmups)
+
+
+def top_imports(n: int = 15):
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue   # Kopfzeile
+        name = parts[2].rstrip()[1:]          # führendes Leerzeichen nach "|"
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:                        # direkte Importe von app.main
+            rows.append((cumulative, name.strip()))
+    rows.sort(reverse=True)
+    return rows[:n]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Startzeit (Import + Warmup) je WARMUP_MODE")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--modes", nargs="+", default=["none", "api", "render", "full"])
+    args = ap.parse_args()
+
+    print(f"{'mode':<8} {'import_s':>9} {'warmup_s':>9} {'total_s':>8}")
+    for mode in args.modes:
+        t_import, t_warm = measure(mode, args.runs)
+        print(f"{mode:<8} {t_import:>9.3f} {t_warm:>9.3f} {t_import + t_warm:>8.3f}")
+
+    print("\nteuerste Importe (kumulativ, ms):")
+    for us, name in top_imports():
+        print(f"  {us / 1000:>8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Synthetisches Bevölkerungsraster (gleiches Schema wie gdal_polygonize: Layer
+"population", Spalte "pop", EPSG:4326) für reproduzierbare Benchmarks.
+
+    python -m bench.synthetic out.gpkg --bbox 11.0 47.8 12.2 48.5 --cell-deg 0.01
+"""
+import argparse
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from app.services.population import LAYER_NAME, POP_COL
+
+DEFAULT_BBOX = (11.0, 47.8, 12.2, 48.5)   # Großraum München
+
+
+def make_grid(path, bbox=DEFAULT_BBOX, cell_deg: float = 0.01, seed: int = 0) -> int:
+    """Schreibt das Raster nach `path`, gibt die Zellanzahl zurück."""
+    w, s, e, n = bbox
+    xs = np.arange(w, e, cell_deg)
+    ys = np.arange(s, n, cell_deg)
+    gx, gy = np.meshgrid(xs, ys)
+    gx, gy = gx.ravel(), gy.ravel()
+
+    # Dichte fällt vom Zentrum ab (grob städtisch), plus Rauschen
+    cx, cy = (w + e) / 2, (s + n) / 2
+    dist = np.hypot((gx - cx) / (e - w), (gy - cy) / (n - s))
+    rng = np.random.default_rng(seed)
+    pop = np.maximum(0.0, 400.0 * np.exp(-6.0 * dist) + rng.normal(0.0, 20.0, len(gx))).round()
+
+    grid = gpd.GeoDataFrame(
+        {POP_COL: pop},
+        geometry=shapely.box(gx, gy, gx + cell_deg, gy + cell_deg),
+        crs="EPSG:4326",
+    )
+    grid.to_file(path, layer=LAYER_NAME)
+    return len(grid)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("path")
+    ap.add_argument("--bbox", nargs=4, type=float, default=DEFAULT_BBOX, metavar=("W", "S", "E", "N"))
+    ap.add_argument("--cell-deg", type=float, default=0.01)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    cells = make_grid(args.path, tuple(args.bbox), args.cell_deg, args.seed)
+    print(f"{args.path}: {cells} cells")
+
+
+if __name__ == "__main__":
+    main()
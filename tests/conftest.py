@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests ohne Installation direkt aus dem Repo ausführen (pytest tests/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,98 @@
+import csv
+
+import pytest
+
+from app.cli import batch
+
+ROWS = [("1", "Marienplatz 1, München"), ("2", "Kaputt 0"), ("3", "Odeonsplatz, München")]
+OPTIONS = {"vertical": "ev_charging", "minutes": 10, "plan": "standard"}
+
+
+@pytest.fixture
+def failing():
+    return {"Kaputt 0"}
+
+
+@pytest.fixture
+def calls(monkeypatch, failing):
+    """geocode/run_analysis ersetzen; liefert die Liste der analysierten Adressen."""
+    seen = []
+
+    def fake_geocode(address):
+        if address in failing:
+            raise ValueError("address not found")
+        return (11.5, 48.1)
+
+    def fake_run_analysis(req, point=None):
+        seen.append(req.address)
+        return {"minutes": req.minutes, "score": 72, "confidence": "HIGH", "population": 1000.0,
+                "competition": {"stations": 3, "density": "LOW", "osm_base": "2026-01-01T00:00:00Z"}}
+
+    monkeypatch.setattr(batch, "geocode", fake_geocode)
+    monkeypatch.setattr(batch, "run_analysis", fake_run_analysis)
+    return seen
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_resume_skips_done_rows(tmp_path, calls):
+    out = tmp_path / "out.csv"
+    ckpt = batch.Checkpoint(tmp_path / "ckpt.sqlite", "key")
+    # Abbruch nach Zeile 3 simulieren: Zeile 3 ist schon im Checkpoint
+    ckpt.save(2, batch.analyze_row("3", ROWS[2][1], OPTIONS))
+    calls.clear()
+
+    result = batch.run_batch(ROWS, OPTIONS, out, ckpt, workers=2)
+    ckpt.close()
+    assert result["resumed"] == 1 and result["analysed_now"] == 2
+    assert result["complete"] and result["errors"] == 1
+    assert calls == [ROWS[0][1]]                           # Zeile 2 scheitert schon beim Geocoding
+    rows = read_csv(out)
+    assert rows[0]["row_id"] == "3"                        # Checkpoint-Zeilen zuerst, neu geschrieben
+    assert {r["row_id"]: r["status"] for r in rows} == {"1": "ok", "2": "error", "3": "ok"}
+
+
+def test_retry_errors(tmp_path, calls, failing):
+    out = tmp_path / "out.csv"
+    path = tmp_path / "ckpt.sqlite"
+    ckpt = batch.Checkpoint(path, "key")
+    batch.run_batch(ROWS, OPTIONS, out, ckpt, workers=1)
+    ckpt.close()
+
+    # ohne --retry-errors: nichts mehr zu tun
+    calls.clear()
+    ckpt = batch.Checkpoint(path, "key")
+    assert batch.run_batch(ROWS, OPTIONS, out, ckpt, workers=1)["analysed_now"] == 0
+    ckpt.close()
+    assert calls == []
+
+    failing.clear()
+    ckpt = batch.Checkpoint(path, "key")
+    result = batch.run_batch(ROWS, OPTIONS, out, ckpt, workers=1, retry_errors=True)
+    ckpt.close()
+    assert result["analysed_now"] == 1 and result["errors"] == 0
+    assert calls == [ROWS[1][1]]
+    assert [r["row_id"] for r in read_csv(out)] == ["1", "3", "2"]
+    assert all(r["status"] == "ok" for r in read_csv(out))
+
+
+def test_run_key_mismatch_and_restart(tmp_path):
+    path = tmp_path / "ckpt.sqlite"
+    ckpt = batch.Checkpoint(path, "key-a")
+    ckpt.save(0, {"row_id": "1", "status": "ok"})
+    ckpt.close()
+
+    with pytest.raises(SystemExit):
+        batch.Checkpoint(path, "key-b")
+
+    ckpt = batch.Checkpoint(path, "key-b", restart=True)
+    assert ckpt.done() == {}
+    ckpt.close()
+
+
+def test_unsupported_output_before_checkpoint(tmp_path):
+    with pytest.raises(SystemExit):
+        batch.check_output(tmp_path / "out.xlsx")
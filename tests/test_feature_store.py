@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services import feature_store
+from app.services.scoring import score_batch_scores
+
+
+def analysis(population, stations, rings=()):
+    return {
+        "minutes": 10, "score": 50, "population": population, "area_km2": 12.5,
+        "competition": {"stations": stations, "osm_base": "2026-01-01T00:00:00Z"},
+        "geocode_meta": {"fallback_used": False},
+        "multi_results": [{"minutes": m, "population": p, "stations": s} for m, p, s in rings],
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(feature_store, "FEATURE_STORE", True)
+    path = tmp_path / "features"
+    req = {"address": "Marienplatz 1", "vertical": "ev_charging"}
+    ids = [
+        feature_store.record_analysis(req, analysis(1000, 2, [(5, 300, 1), (10, 1000, 2), (15, 2200, 4)]), (11.5, 48.1), path=path),
+        feature_store.record_analysis(req, analysis(5000, None), (11.6, 48.2), path=path),
+        feature_store.record_analysis(req, analysis(800, 0, [(10, 800, 0), (20, None, None)]), None, path=path),
+    ]
+    assert all(ids)
+    return path, ids
+
+
+def test_compact_keeps_columns_and_rings(store):
+    path, ids = store
+    before = feature_store.load_columns(path)
+    result = feature_store.compact(path)
+    assert result["compacted"] == 3 and result["segment"].startswith("seg-")
+    assert feature_store.compact(path) == {"compacted": 0, "segment": None}
+
+    after = feature_store.load_columns(path)
+    assert list(after["id"]) == ids
+    for c in before:
+        np.testing.assert_array_equal(after[c], before[c])
+    assert list(after["ring_offsets"]) == [0, 3, 3, 5]
+    assert np.isnan(after["stations"][1]) and np.isnan(after["lon"][2])
+    assert feature_store.store_stats(path)["pending"] == 0
+
+
+def test_segments_and_pending_concatenate(store):
+    path, ids = store
+    feature_store.compact(path)
+    extra = feature_store.record_analysis({"address": "x"}, analysis(100, 1, [(5, 50, 0), (10, 100, 1)]), (11.0, 48.0), path=path)
+
+    cols = feature_store.load_columns(path)
+    assert list(cols["id"]) == ids + [extra]
+    assert list(cols["ring_offsets"]) == [0, 3, 3, 5, 7]
+    assert list(cols["ring_minutes"][5:]) == [5, 10]
+    assert len(feature_store.load_columns(path, include_pending=False)["id"]) == 3
+
+
+def test_duplicates_after_interrupted_compact(store):
+    """Abbruch zwischen Segment-Rename und DELETE: Zeilen stehen doppelt, die erste Kopie gilt."""
+    path, ids = store
+    conn = feature_store._conn(path)
+    payloads = [p for (p,) in conn.execute("SELECT payload FROM pending ORDER BY seq")]
+    conn.close()
+    feature_store.compact(path)
+    conn = feature_store._conn(path)
+    conn.executemany("INSERT INTO pending (payload) VALUES (?)", [(p,) for p in payloads])
+    conn.close()
+
+    cols = feature_store.load_columns(path)
+    assert list(cols["id"]) == ids
+    assert list(cols["ring_offsets"]) == [0, 3, 3, 5]
+    assert list(cols["ring_minutes"]) == [json.loads(payloads[0])["rings"][i][0] for i in range(3)] + [10, 20]
+
+
+def test_rescore_matches_batch_scoring(store):
+    path, _ = store
+    feature_store.compact(path)
+    cols = feature_store.load_columns(path)
+    new = feature_store.rescore(cols)
+    np.testing.assert_array_equal(new["score"], score_batch_scores(cols["population"], cols["stations"]))
+    assert new["ring_score"][4] == 0                       # Ring ohne Bevölkerung
+    assert new["stability"][1] == ""                       # keine Kurve
+    summary = feature_store.rescore_summary(cols, new)
+    assert summary["analyses"] == 3
@@ -0,0 +1,234 @@
+import gzip
+
+import pytest
+
+from app.services import station_index
+
+BASE = "2026-01-10T00:00:00Z"
+
+EXTRACT = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="48.10" lon="11.50" timestamp="2026-01-05T00:00:00Z">
+    <tag k="amenity" v="charging_station"/>
+  </node>
+  <node id="2" lat="48.20" lon="11.60" timestamp="2026-01-05T00:00:00Z">
+    <tag k="amenity" v="charging_station"/>
+  </node>
+  <node id="3" lat="48.30" lon="11.70" timestamp="2026-01-05T00:00:00Z">
+    <tag k="amenity" v="charging_station"/>
+    <tag k="access" v="yes"/>
+  </node>
+  <node id="10" lat="48.00" lon="11.00" timestamp="2026-01-05T00:00:00Z"/>
+  <node id="11" lat="48.02" lon="11.02" timestamp="2026-01-05T00:00:00Z"/>
+  <node id="20" lat="47.90" lon="11.90" timestamp="2026-01-05T00:00:00Z"/>
+  <way id="100" timestamp="2026-01-05T00:00:00Z">
+    <nd ref="10"/>
+    <nd ref="11"/>
+    <tag k="amenity" v="charging_station"/>
+  </way>
+</osm>
+"""
+
+
+def osc(body: str) -> str:
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<osmChange version="0.6">\n{body}\n</osmChange>\n'
+
+
+def station(idx, osm_type, osm_id):
+    conn = station_index.get_conn(idx)
+    try:
+        return conn.execute(
+            "SELECT lon, lat, access FROM stations WHERE osm_type = ? AND osm_id = ?", (osm_type, osm_id)
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def meta(idx, key):
+    conn = station_index.get_conn(idx)
+    try:
+        return station_index.get_meta(conn, key)
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def idx(tmp_path):
+    extract = tmp_path / "extract.osm"
+    extract.write_text(EXTRACT, encoding="utf-8")
+    path = tmp_path / "index.sqlite"
+    result = station_index.import_extract(extract, osm_base=BASE, path=path)
+    assert result == {"nodes": 3, "ways": 1, "unresolved_ways": 0}
+    return path
+
+
+@pytest.fixture
+def diffs(tmp_path):
+    d = tmp_path / "diffs"
+    d.mkdir()
+    return d
+
+
+def test_import(idx):
+    assert station(idx, "node", 1)[:2] == (11.50, 48.10)
+    assert station(idx, "way", 100)[:2] == pytest.approx((11.01, 48.01))
+    assert meta(idx, "osm_base") == BASE
+    assert meta(idx, "last_diff") is None
+
+
+def test_create_move_delete_access(idx, diffs):
+    (diffs / "001.osc").write_text(osc("""
+  <create>
+    <node id="4" lat="48.40" lon="11.80" timestamp="2026-01-11T00:00:00Z">
+      <tag k="amenity" v="charging_station"/>
+    </node>
+  </create>
+  <modify>
+    <node id="1" lat="48.15" lon="11.55" timestamp="2026-01-11T00:00:00Z">
+      <tag k="amenity" v="charging_station"/>
+    </node>
+    <node id="3" lat="48.30" lon="11.70" timestamp="2026-01-11T00:00:00Z">
+      <tag k="amenity" v="charging_station"/>
+      <tag k="access" v="private"/>
+    </node>
+  </modify>
+  <delete>
+    <node id="2" lat="48.20" lon="11.60" timestamp="2026-01-11T00:00:00Z"/>
+  </delete>"""), encoding="utf-8")
+
+    totals = station_index.apply_diffs(diffs, path=idx)
+    assert totals["files"] == 1
+    assert (totals["created"], totals["updated"], totals["deleted"]) == (1, 2, 1)
+    assert station(idx, "node", 4)[:2] == (11.80, 48.40)
+    assert station(idx, "node", 1)[:2] == (11.55, 48.15)
+    assert station(idx, "node", 2) is None
+    assert station(idx, "node", 3)[2] == "private"
+
+    points = {tuple(p) for p in station_index.stations_in_bbox(47, 10, 49, 12, path=idx)["points"].round(2)}
+    assert points == {(11.55, 48.15), (11.80, 48.40), (11.01, 48.01)}      # access=private ausgeblendet
+    assert meta(idx, "osm_base") == "2026-01-11T00:00:00+00:00"
+
+
+def test_tag_removed(idx, diffs):
+    (diffs / "001.osc").write_text(osc("""
+  <modify>
+    <node id="1" lat="48.10" lon="11.50" timestamp="2026-01-11T00:00:00Z">
+      <tag k="amenity" v="parking"/>
+    </node>
+  </modify>"""), encoding="utf-8")
+    assert station_index.apply_diffs(diffs, path=idx)["deleted"] == 1
+    assert station(idx, "node", 1) is None
+
+
+def test_way_node_move_recenters_way(idx, diffs):
+    (diffs / "001.osc.gz").write_bytes(gzip.compress(osc("""
+  <modify>
+    <node id="11" lat="48.06" lon="11.06" timestamp="2026-01-11T00:00:00Z"/>
+  </modify>""").encode("utf-8")))
+    totals = station_index.apply_diffs(diffs, path=idx)
+    assert totals["moved_way_nodes"] == 1
+    assert station(idx, "way", 100)[:2] == pytest.approx((11.03, 48.03))
+
+
+def test_way_new_node_from_diff(idx, diffs):
+    (diffs / "001.osc").write_text(osc("""
+  <create>
+    <node id="12" lat="48.10" lon="11.10" timestamp="2026-01-11T00:00:00Z"/>
+  </create>
+  <modify>
+    <way id="100" timestamp="2026-01-11T00:00:00Z">
+      <nd ref="10"/>
+      <nd ref="12"/>
+      <tag k="amenity" v="charging_station"/>
+    </way>
+  </modify>"""), encoding="utf-8")
+    totals = station_index.apply_diffs(diffs, path=idx)
+    assert totals["updated"] == 1 and totals["unresolved_ways"] == 0
+    assert station(idx, "way", 100)[:2] == pytest.approx((11.05, 48.05))
+
+
+def test_resume_from_last_diff(idx, diffs):
+    (diffs / "001.osc").write_text(osc("""
+  <delete>
+    <node id="1" lat="48.10" lon="11.50" timestamp="2026-01-11T00:00:00Z"/>
+  </delete>"""), encoding="utf-8")
+    assert station_index.apply_diffs(diffs, path=idx)["files"] == 1
+    assert meta(idx, "last_diff") == "001.osc"
+
+    (diffs / "002.osc").write_text(osc("""
+  <create>
+    <node id="1" lat="48.12" lon="11.52" timestamp="2026-01-12T00:00:00Z">
+      <tag k="amenity" v="charging_station"/>
+    </node>
+  </create>"""), encoding="utf-8")
+    totals = station_index.apply_diffs(diffs, path=idx)
+    assert totals["files"] == 1 and totals["created"] == 1   # 001 nicht erneut angewendet
+    assert meta(idx, "last_diff") == "002.osc"
+    assert station_index.apply_diffs(diffs, path=idx)["files"] == 0
+
+
+def test_failed_diff_rolls_back(idx, diffs):
+    (diffs / "001.osc").write_text(osc("""
+  <delete>
+    <node id="1" lat="48.10" lon="11.50" timestamp="2026-01-11T00:00:00Z"/>
+  </delete>
+  <modify>
+    <node id="2" timestamp="2026-01-11T00:00:00Z"/>
+  </modify>"""), encoding="utf-8")     # ohne lat/lon -> Fehler
+    with pytest.raises(TypeError):
+        station_index.apply_diffs(diffs, path=idx)
+    assert station(idx, "node", 1) is not None
+    assert meta(idx, "last_diff") is None
+
+
+def test_reimport_then_stale_diff(tmp_path, idx, diffs):
+    """Nach einem Neuimport dürfen ältere Diffs den neueren Stand nicht überschreiben."""
+    (diffs / "001.osc").write_text(osc("""
+  <delete>
+    <node id="1" lat="48.10" lon="11.50" timestamp="2026-01-11T00:00:00Z"/>
+  </delete>"""), encoding="utf-8")
+    (diffs / "002.osc").write_text(osc("""
+  <modify>
+    <node id="2" lat="48.25" lon="11.65" timestamp="2026-01-12T00:00:00Z">
+      <tag k="amenity" v="charging_station"/>
+    </node>
+  </modify>"""), encoding="utf-8")
+    (diffs / "002.state.txt").write_text("sequenceNumber=2\ntimestamp=2026-01-12T00\\:00\\:00Z\n", encoding="utf-8")
+    (diffs / "003.osc").write_text(osc("""
+  <modify>
+    <node id="3" lat="48.35" lon="11.75" timestamp="2026-01-19T00:00:00Z">
+      <tag k="amenity" v="charging_station"/>
+    </node>
+    <node id="1" lat="48.00" lon="11.40" timestamp="2026-01-14T00:00:00Z">
+      <tag k="amenity" v="charging_station"/>
+    </node>
+  </modify>"""), encoding="utf-8")
+
+    # neuer Extrakt vom 15.01.: Knoten 1 wurde inzwischen wieder angelegt
+    newer = tmp_path / "newer.osm"
+    newer.write_text(EXTRACT.replace('lat="48.10" lon="11.50"', 'lat="48.11" lon="11.51"'), encoding="utf-8")
+    station_index.import_extract(newer, osm_base="2026-01-15T00:00:00Z", path=idx)
+
+    totals = station_index.apply_diffs(diffs, path=idx)
+    assert totals["skipped_files"] == 1           # 002 laut state.txt im Extrakt enthalten
+    assert totals["skipped_stale"] == 2           # 001 und Knoten 1 aus 003
+    assert totals["deleted"] == 0 and totals["updated"] == 1
+    assert station(idx, "node", 1)[:2] == (11.51, 48.11)
+    assert station(idx, "node", 2)[:2] == (11.60, 48.20)
+    assert station(idx, "node", 3)[:2] == (11.75, 48.35)
+    assert meta(idx, "osm_base") == "2026-01-19T00:00:00+00:00"
+    assert meta(idx, "last_diff") == "003.osc"
+
+
+def test_osm_base_never_moves_backwards(idx, diffs):
+    (diffs / "001.osc").write_text(osc(""), encoding="utf-8")
+    (diffs / "001.state.txt").write_text("timestamp=2026-01-20T00\\:00\\:00Z\n", encoding="utf-8")
+    (diffs / "002.osc").write_text(osc("""
+  <create>
+    <node id="5" lat="48.50" lon="11.90" timestamp="2026-01-18T00:00:00Z">
+      <tag k="amenity" v="charging_station"/>
+    </node>
+  </create>"""), encoding="utf-8")
+    station_index.apply_diffs(diffs, path=idx)
+    assert meta(idx, "osm_base") == "2026-01-20T00:00:00Z"
+    assert station(idx, "node", 5) is None        # älter als osm_base nach 001